@@ -1,23 +1,79 @@
+import os
+import time
+_import_started = time.perf_counter()
+
+# eventlet's green DNS pulls in dnspython (~150 ms of import time) for the
+# few lookups the backend makes (the model's API host)
+os.environ.setdefault("EVENTLET_NO_GREENDNS", "yes")
+
+# Load .env before anything reads MAFAI_* settings at import time
+from dotenv import load_dotenv
+load_dotenv()
+
+# threading (default): Werkzeug dev server, one OS thread per connection.
+# eventlet: green threads, for thousands of sockets per worker (see serve.py).
+# The mailbox, timer wheel and narration pools are ordinary threads; monkey
+# patching turns them green so their emits go through eventlet's hub. It has
+# to happen before anything else imports socket or threading.
+ASYNC_MODE = os.getenv("MAFAI_ASYNC_MODE", "threading")
+if ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+
 from flask import Flask
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from routes.game_routes import game_bp
+from routes.metrics_routes import metrics_bp
 from sockets import init_socketio   # import your socket handlers
+from game.state_machine import THEMES
+from game.story_pool import story_pool
+from game.wire import wire_json
+from game.message_queue import create_client_manager
 
 # app = Flask(__name__)
 app = Flask(__name__, static_url_path='/static', static_folder='static')
 app.config['SECRET_KEY'] = 'mafai-secret'
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-# Create socketio instance
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Engine.IO transports clients may use ("websocket" alone refuses long-polling)
+# and the heartbeat: a client that misses a ping for PING_INTERVAL +
+# PING_TIMEOUT seconds is dropped, which is how dead sockets get freed.
+TRANSPORTS = os.getenv("MAFAI_TRANSPORTS", "polling,websocket").split(",")
+PING_INTERVAL = int(os.getenv("MAFAI_PING_INTERVAL", 25))
+PING_TIMEOUT = int(os.getenv("MAFAI_PING_TIMEOUT", 20))
+
+# Create socketio instance; wire_json sends cached per-player views without re-encoding them.
+# With several workers, MAFAI_MESSAGE_QUEUE carries broadcasts between them.
+socketio_options = {}
+client_manager = create_client_manager()
+if client_manager:
+    socketio_options["client_manager"] = client_manager
+socketio = SocketIO(app, cors_allowed_origins="*", json=wire_json, async_mode=ASYNC_MODE,
+                    transports=TRANSPORTS, ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT,
+                    **socketio_options)
 
 # Register HTTP routes
 app.register_blueprint(game_bp, url_prefix="/api")
+app.register_blueprint(metrics_bp)  # /metrics, see game/metrics.py
 
 # Register socket.io handlers
 init_socketio(socketio)
 
+# Pre-generate background stories so game start doesn't wait on the model
+story_pool.warm(THEMES)
+
+startup_ms = (time.perf_counter() - _import_started) * 1000
+print(f"Backend ready in {startup_ms:.0f} ms (run startup_profile.py for a per-module breakdown)")
+
 if __name__ == "__main__":
-    socketio.run(app, host="0.0.0.0", port=5001, debug=True)
+    if ASYNC_MODE == "eventlet":
+        from serve import serve
+        serve(app, host="0.0.0.0", port=int(os.getenv("MAFAI_PORT", 5001)))
+    else:
+        # The Werkzeug server (and its debugger) is only for local development:
+        # MAFAI_DEBUG=1, or MAFAI_ALLOW_WERKZEUG=1 for the simulator's local servers
+        debug = os.getenv("MAFAI_DEBUG", "0") == "1"
+        socketio.run(app, host="0.0.0.0", port=int(os.getenv("MAFAI_PORT", 5001)), debug=debug,
+                     allow_unsafe_werkzeug=debug or os.getenv("MAFAI_ALLOW_WERKZEUG", "0") == "1")
     
\ No newline at end of file
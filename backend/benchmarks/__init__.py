@@ -0,0 +1,8 @@
+"""
+Micro-benchmarks for the state machine, view serialization and prompt
+building hot paths, swept over player counts and story log sizes. Results are
+saved as JSON baselines and later runs are compared against them to catch
+regressions. See __main__.py for the CLI.
+"""
+from .cases import CASES, make_game
+from .timing import compare, measure
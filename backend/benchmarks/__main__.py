@@ -0,0 +1,155 @@
+"""
+Benchmarks for the game hot paths.
+
+    # Run every case over the default sweep and save a baseline
+    python -m benchmarks run --out baseline.json
+
+    # Later: run again and compare, exiting 1 if anything got >15% slower
+    python -m benchmarks run --out current.json --compare baseline.json
+    python -m benchmarks compare baseline.json current.json --threshold 0.15
+
+    # Bytes per event type as JSON and deflated (see benchmarks/wire.py)
+    python -m benchmarks wire --players 6,20,100
+
+Cases are named case[players=N,log=M], where log is the story log length.
+--only picks cases by name, --quick is a short sweep for a fast check.
+Narration uses the offline narrator, so nothing goes over the network.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("MAFAI_NARRATOR", "offline")
+os.environ.setdefault("MAFAI_STORY_POOL_DEPTH", "0")
+os.environ.setdefault("MAFAI_SNAPSHOT_EVERY", "1000000")  # keep snapshots out of the timed calls
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cases import CASES, LOG_INDEPENDENT, fork, make_game  # noqa: E402
+from benchmarks.timing import compare, format_comparison, measure  # noqa: E402
+from benchmarks.wire import format_events, measure_events  # noqa: E402
+
+
+def _ints(text):
+    return [int(v) for v in text.split(",") if v]
+
+
+def run(options):
+    """Runs the sweep and returns {"meta", "results"}."""
+    names = [n for n in CASES if not options.only or n in options.only]
+    results = {}
+    for players in options.players:
+        for log_size in options.log_sizes:
+            base = make_game(players, log_size)
+            for name in names:
+                if name in LOG_INDEPENDENT and log_size != options.log_sizes[0]:
+                    continue
+                # Cases get a fork so state one case leaves behind (e.g. a
+                # snapshot or cached views) can't speed up the next
+                timed, setup = CASES[name](fork(base))
+                key = f"{name}[players={players},log={log_size}]"
+                results[key] = measure(timed, setup, repeat=options.repeat, min_time=options.min_time)
+                print(f"{key:<44} {results[key]['median_us']:>11.2f}us  (min {results[key]['min_us']:.2f}us, "
+                      f"{results[key]['loops']} loops)", flush=True)
+    meta = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "players": options.players,
+        "log_sizes": options.log_sizes,
+    }
+    return {"meta": meta, "results": results}
+
+
+def wire(options):
+    """Prints the bytes per event for each game size; returns {"meta", "results"}."""
+    results = {}
+    for players in options.players:
+        rows = measure_events(players, options.log_size)
+        print(format_events(players, options.log_size, rows) + "\n", flush=True)
+        for event, row in rows.items():
+            results[f"{event}[players={players},log={options.log_size}]"] = row
+    meta = {"python": platform.python_version(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "players": options.players, "log_size": options.log_size}
+    return {"meta": meta, "results": results}
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _report(baseline, current, threshold):
+    rows = compare(baseline, current, threshold)
+    print(format_comparison(rows))
+    regressed = [row[0] for row in rows if row[4] == "regressed"]
+    if regressed:
+        print(f"\n{len(regressed)} benchmark(s) regressed by more than {threshold:.0%}")
+        return 1
+    print(f"\nNo regressions beyond {threshold:.0%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--players", type=_ints, default=[6, 20, 100], help="comma separated")
+    run_parser.add_argument("--log-sizes", type=_ints, default=[10, 200, 2000], help="comma separated")
+    run_parser.add_argument("--only", type=lambda s: s.split(","), default=None,
+                            help=f"comma separated, from: {', '.join(CASES)}")
+    run_parser.add_argument("--repeat", type=int, default=7, help="samples per case (the median is kept)")
+    run_parser.add_argument("--min-time", type=float, default=0.05, help="seconds per sample")
+    run_parser.add_argument("--quick", action="store_true", help="6 and 20 players, logs of 10 and 200, 3 samples")
+    run_parser.add_argument("--out", default=None, help="write the results here (a baseline)")
+    run_parser.add_argument("--compare", dest="baseline", default=None, help="compare against this baseline")
+    run_parser.add_argument("--threshold", type=float, default=0.15, help="slowdown that counts as a regression")
+
+    compare_parser = sub.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="slowdown that counts as a regression")
+    wire_parser = sub.add_parser("wire", help="bytes per event type, as JSON and deflated")
+    wire_parser.add_argument("--players", type=_ints, default=[6, 20, 100], help="comma separated")
+    wire_parser.add_argument("--log-size", type=int, default=10, help="story log length")
+    wire_parser.add_argument("--out", default=None, help="also write the results here")
+    options = parser.parse_args()
+
+    if options.command == "compare":
+        return _report(_load(options.baseline), _load(options.current), options.threshold)
+    if options.command == "wire":
+        if min(options.players) < 4:
+            parser.error("--players must be at least 4")
+        sizes = wire(options)
+        if options.out:
+            with open(options.out, "w") as f:
+                json.dump(sizes, f, indent=2)
+            print(f"Wrote {options.out}")
+        return 0
+
+    if options.only:
+        unknown = set(options.only) - set(CASES)
+        if unknown:
+            parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+    if options.quick:
+        options.players, options.log_sizes, options.repeat = [6, 20], [10, 200], 3
+    if min(options.players) < 4:
+        parser.error("--players must be at least 4")
+
+    current = run(options)
+    if options.out:
+        with open(options.out, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Wrote {options.out}")
+    if options.baseline:
+        print()
+        return _report(_load(options.baseline), current, options.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
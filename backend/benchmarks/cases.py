@@ -0,0 +1,180 @@
+import json
+import random
+from game.ai import generate_vote_results
+from game.model import Player
+from game.prompts import background_prompt, mafia_story_prompt, vote_results_prompt
+from game.state_machine import MafiaGame
+
+STORY = ("The fog rolled in from the harbour before midnight and the lamps along "
+         "the square went out one by one. ") * 3  # about the size of a real day story
+
+
+def make_game(players, log_size, seed=0):
+    """
+    A started game with players seats (a quarter of them mafia) in its first
+    night, its story log padded to log_size entries with day stories the way
+    a long game grows it.
+    """
+    random.seed(seed)
+    game = MafiaGame(Player("host", "p0"), "Medieval Village", game_id="bench")
+    for seat in range(1, players):
+        game.add_player(Player(f"player-{seat}", f"p{seat}"))
+    game.update_settings(game.host_id, {"mafia": max(1, (players - 1) // 4)})
+    game.assign_roles()
+    game.start_game(narrate=False)
+    game.start_night()
+    for i in range(max(0, log_size - len(game.story_log))):
+        game.record_day_story(STORY, i // 4 + 1)
+    return game
+
+
+def fork(game):
+    """An independent copy of game, for cases that change it."""
+    return MafiaGame.restore(json.dumps(game.to_snapshot()))
+
+
+def night_actions(game):
+    """(player_id, action) for every night actor, everyone piling onto one victim."""
+    villagers = game.alive_by_role("villager")
+    victim = villagers[0]
+    actions = []
+    for pid in game.alive_players():
+        role = game.players[pid].role
+        if role == "mafia":
+            actions.append((pid, {"type": "kill", "target": victim, "activity": "Walked the docks."}))
+        elif role == "doctor":
+            actions.append((pid, {"type": "save", "target": villagers[-1], "activity": "Stayed home."}))
+        elif role == "detective":
+            actions.append((pid, {"type": "investigate", "target": victim, "activity": "Read old letters."}))
+    return actions
+
+
+def day_game(game):
+    """A fork of game after the night, in DISCUSSION with every alive player's vote in."""
+    day = fork(game)
+    for pid, action in night_actions(day):
+        day.record_action(pid, action)
+    day.resolve_night()
+    day.start_day(narrate=False)
+    alive = day.alive_players()
+    for i, pid in enumerate(alive):
+        day.record_vote(pid, alive[i % 3] if i % 5 else "skip")
+    return day
+
+
+def lobby_game(game):
+    """A fork of game's players back in the lobby, ready for assign_roles()."""
+    lobby = MafiaGame(Player("host", "p0"), game.theme, game_id="bench")
+    for pid, player in game.players.items():
+        if pid != "p0":
+            lobby.add_player(Player(player.name, pid))
+    lobby.update_settings(lobby.host_id, {"mafia": game.settings["mafia"]})
+    return lobby
+
+
+# ------------------- Cases -------------------
+#
+# Each case takes a prepared game and returns (run, setup): run(state) is the
+# timed call and setup() makes its state; setup is None when run only reads
+# the game, so the same game is reused.
+
+def case_get_state(game):
+    return (lambda _: game.get_state()), None
+
+
+def case_serializable_players(game):
+    return (lambda _: game._serializable_players()), None
+
+
+def case_get_view(game):
+    viewer = game.alive_by_role("mafia")[0]
+    return (lambda _: game.get_view(viewer)), None
+
+
+def case_view_json(game):
+    # What every broadcast pays once per viewer: a fresh version, then encoding
+    def run(_):
+        game._views_version = -1
+        return game.view_json("p0")
+    return run, None
+
+
+def case_snapshot(game):
+    return (lambda _: game.take_snapshot()), None
+
+
+def case_night(game):
+    def setup():
+        night = fork(game)
+        return night, night_actions(night)
+
+    def run(state):
+        night, actions = state
+        for pid, action in actions:
+            night.record_action(pid, action)
+        return night.resolve_night()
+    return run, setup
+
+
+def case_resolve_votes(game):
+    return (lambda day: day.resolve_votes(narrate=False)), lambda: day_game(game)
+
+
+def case_assign_roles(game):
+    return (lambda lobby: lobby.assign_roles()), lambda: lobby_game(game)
+
+
+def case_mafia_story_prompt(game):
+    night = fork(game)
+    for pid, action in night_actions(night):
+        night.record_action(pid, action)
+    activities = night.night_activities()
+    special = {"deaths": [night.players[night.alive_by_role("villager")[0]].name], "revivals": []}
+    return (lambda _: mafia_story_prompt(activities, special, night.round, night.theme)), None
+
+
+def case_vote_results_prompt(game):
+    day = day_game(game)
+    day.resolve_votes(narrate=False)
+    summary, players, round_number, theme = day.vote_story_inputs()
+    votes_cast = [f"{players[v].name} voted against {players[t].name}" if t in players
+                  else f"{players[v].name} chose to skip voting"
+                  for v, t in summary["votes"].items()]
+
+    def run(_):
+        return vote_results_prompt(votes_cast, players[summary["eliminated"]].name
+                                   if summary["eliminated"] else None, round_number, theme)
+    return run, None
+
+
+def case_vote_narration(game):
+    # generate_vote_results() end to end with the offline narrator: input
+    # formatting, cache key and lookup (the first call fills the cache)
+    day = day_game(game)
+    day.resolve_votes(narrate=False)
+    inputs = day.vote_story_inputs()
+    return (lambda _: generate_vote_results(*inputs)), None
+
+
+def case_background_prompt(game):
+    return (lambda _: background_prompt(game.theme)), None
+
+
+CASES = {
+    "get_state": case_get_state,
+    "serializable_players": case_serializable_players,
+    "get_view": case_get_view,
+    "view_json": case_view_json,
+    "snapshot": case_snapshot,
+    "night": case_night,
+    "resolve_votes": case_resolve_votes,
+    "assign_roles": case_assign_roles,
+    "mafia_story_prompt": case_mafia_story_prompt,
+    "vote_results_prompt": case_vote_results_prompt,
+    "vote_narration": case_vote_narration,
+    "background_prompt": case_background_prompt,
+}
+
+# Cases whose cost doesn't depend on the story log only run at the smallest size
+LOG_INDEPENDENT = {"serializable_players", "assign_roles", "mafia_story_prompt",
+                   "vote_results_prompt", "vote_narration", "background_prompt"}
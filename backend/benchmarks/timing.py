@@ -0,0 +1,90 @@
+import gc
+import statistics
+import time
+
+
+def measure(run, setup=None, repeat=7, min_time=0.05):
+    """
+    Times run(state) and returns {"median_us", "min_us", "loops"} per call.
+
+    Each of the repeat samples loops until it has taken at least min_time, so
+    fast calls are averaged over many loops. setup() (if given) makes a fresh
+    state before every call and is left out of the time. GC is paused while
+    timing, like timeit.
+    """
+    loops = _calibrate(run, setup, min_time)
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            samples.append(_sample(run, setup, loops) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        "median_us": round(statistics.median(samples) * 1e6, 3),
+        "min_us": round(min(samples) * 1e6, 3),
+        "loops": loops,
+    }
+
+
+def _sample(run, setup, loops):
+    if setup is None:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run(None)
+        return time.perf_counter() - start
+
+    total = 0.0
+    for _ in range(loops):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        total += time.perf_counter() - start
+    return total
+
+
+def _calibrate(run, setup, min_time):
+    # Setup can cost far more than the call, so those cases loop less
+    limit = 200 if setup else 1_000_000
+    loops = 1
+    while True:
+        if _sample(run, setup, loops) >= min_time or loops >= limit:
+            return min(loops, limit)
+        loops *= 2 if setup else 10
+
+
+def compare(baseline, current, threshold):
+    """
+    Compares two result files ({"results": {name: measurement}}) by median.
+
+    Returns rows of (name, baseline_us, current_us, change, status) where
+    change is current / baseline - 1 and status is "regressed" beyond
+    +threshold, "improved" beyond -threshold, "ok", or "new"/"missing" for
+    benchmarks only one side has.
+    """
+    rows = []
+    old, new = baseline["results"], current["results"]
+    for name in list(old) + [n for n in new if n not in old]:
+        if name not in new:
+            rows.append((name, old[name]["median_us"], None, None, "missing"))
+            continue
+        if name not in old:
+            rows.append((name, None, new[name]["median_us"], None, "new"))
+            continue
+        before, after = old[name]["median_us"], new[name]["median_us"]
+        change = after / before - 1 if before else 0.0
+        status = "regressed" if change > threshold else "improved" if change < -threshold else "ok"
+        rows.append((name, before, after, change, status))
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'benchmark':<44} {'baseline':>11} {'current':>11} {'change':>8}"]
+    for name, before, after, change, status in rows:
+        cells = [f"{v:>9.2f}us" if v is not None else f"{'-':>11}" for v in (before, after)]
+        pct = f"{change:+8.1%}" if change is not None else f"{'':>8}"
+        flag = "" if status == "ok" else f"  {status.upper()}"
+        lines.append(f"{name:<44} {cells[0]} {cells[1]} {pct}{flag}")
+    return "\n".join(lines)
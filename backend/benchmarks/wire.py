@@ -0,0 +1,104 @@
+"""
+Bytes on the wire per Socket.IO event: plain JSON, the deflate encoding
+clients can ask for at join (game/wire.py), and for comparison what a
+WebSocket with permessage-deflate sends for the same events in a row (one
+compression context per connection, so later events can point back at
+earlier ones).
+
+Payloads are built from real game states the way sockets.py builds them,
+as seen by a full-state client sitting in seat p1.
+"""
+import zlib
+from benchmarks.cases import STORY, day_game, fork, lobby_game, make_game, night_actions
+from benchmarks.timing import measure
+from game.wire import RawJSON, WIRE_DEFLATE_LEVEL, WIRE_DEFLATE_MIN, encode_payload, wire_json
+
+VIEWER = "p1"
+
+
+def _views(game, state_key=None, players_key=None):
+    game.commit_state()
+    payload = {}
+    if state_key:
+        payload[state_key] = RawJSON(game.view_json(VIEWER))
+    if players_key:
+        payload[players_key] = RawJSON(game.view_json(VIEWER, "players"))
+    return payload
+
+
+def event_payloads(players, log_size):
+    """[(event, payload)] in the order one game sends them to the client."""
+    base = make_game(players, log_size)
+    events = []
+
+    lobby = lobby_game(base)
+    events.append(("state_update", {"msg": f"{VIEWER} joined game bench",
+                                    **_views(lobby, "state", "players")}))
+    lobby.set_ready(VIEWER)
+    events.append(("state_update", {"msg": f"{VIEWER} ready: True", **_views(lobby, players_key="players")}))
+    leaving = f"p{players - 1}"
+    lobby.remove_player(leaving)
+    events.append(("player_left", {"player_id": leaving, "new_host_id": lobby.host_id,
+                                   **_views(lobby, "game_state", "players")}))
+    lobby.assign_roles()
+    events.append(("role_assigned", _views(lobby, players_key="players")))
+
+    night = fork(base)
+    events.append(("game_started", {"background_story": STORY, "narration_job": "job-1",
+                                    **_views(night, "game_state")}))
+    night.commit_state()
+    events.append(("state_snapshot", {"game_id": night.id, "version": night.version,
+                                      "state": RawJSON(night.view_json())}))
+    pid, action = night_actions(night)[0]
+    night.record_action(pid, action)
+    events.append(("state_patch", night.commit_state()))
+    for pid, action in night_actions(night)[1:]:
+        night.record_action(pid, action)
+    result = night.resolve_night()
+    public_result = {k: v for k, v in result.items() if k != "detective_results"}
+    events.append(("night_resolved", {"result": public_result, "story": result.get("story") or STORY,
+                                      **_views(night, "game_state")}))
+    night.start_day(narrate=False)
+    events.append(("day_started", {"story": STORY, "narration_job": "job-2", **_views(night, "game_state")}))
+
+    day = day_game(base)
+    result = day.resolve_votes(narrate=False)
+    events.append(("votes_resolved", {"result": result, "round_number": day.round, "story": STORY,
+                                       **_views(day, "game_state")}))
+    return events
+
+
+def measure_events(players, log_size, repeat=5, min_time=0.02):
+    """Returns {event: {"json", "deflate", "websocket", "encode_us"}}; repeated events keep their largest."""
+    stream = zlib.compressobj(WIRE_DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    rows = {}
+    for event, payload in event_payloads(players, log_size):
+        text = wire_json.encode(payload, separators=(",", ":")).encode("utf-8")
+        deflated = zlib.compress(text, WIRE_DEFLATE_LEVEL)
+        # permessage-deflate: raw deflate with a sync flush, minus the 00 00 ff ff tail
+        websocket = stream.compress(text) + stream.flush(zlib.Z_SYNC_FLUSH)
+        timing = measure(lambda _, e=event, p=payload: encode_payload(e, p, "deflate"),
+                         repeat=repeat, min_time=min_time)
+        row = {
+            "json": len(text),
+            "deflate": len(deflated) if len(text) >= WIRE_DEFLATE_MIN else len(text),
+            "websocket": len(websocket) - 4,
+            "encode_us": timing["median_us"],
+        }
+        if row["json"] >= rows.get(event, {}).get("json", 0):
+            rows[event] = row
+    return rows
+
+
+def format_events(players, log_size, rows):
+    lines = [f"players={players} log={log_size}  (deflate applies from {WIRE_DEFLATE_MIN} bytes)",
+             f"{'event':<18}{'json B':>9}{'deflate B':>11}{'saved':>8}{'ws deflate B':>14}{'encode us':>11}"]
+    for event, row in rows.items():
+        saved = 1 - row["deflate"] / row["json"] if row["json"] else 0.0
+        lines.append(f"{event:<18}{row['json']:>9}{row['deflate']:>11}{saved:>8.0%}"
+                     f"{row['websocket']:>14}{row['encode_us']:>11.1f}")
+    total_json = sum(r["json"] for r in rows.values())
+    total_deflate = sum(r["deflate"] for r in rows.values())
+    lines.append(f"{'all of the above':<18}{total_json:>9}{total_deflate:>11}"
+                 f"{1 - total_deflate / total_json:>8.0%}{sum(r['websocket'] for r in rows.values()):>14}")
+    return "\n".join(lines)
@@ -1,43 +1,70 @@
-import warnings
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import time
+from .cache import narration_cache
+from .governor import LLMUnavailable, PRIORITY_DAY, PRIORITY_INTRO, PRIORITY_PREFETCH, PRIORITY_SPECULATIVE
+from .metrics import llm_call_seconds
+from .tracing import tracer
+from .narrators import get_narrator
 
-load_dotenv()
-my_api_key = os.getenv('GEMINI_API_KEY')
-
-if not my_api_key:
-    raise ValueError("GEMINI_API_KEY not found in .env")
-
-genai.configure(api_key=my_api_key)
-model = genai.GenerativeModel("gemini-2.5-flash")
 
+def _cached(kind: str, inputs: dict, produce, store: bool = True):
+    """
+    Returns the cached narration for inputs, or calls produce(narrator) and caches it.
 
-def generate_background_story(theme: str):
+    The key also covers the narrator's config, so offline and Gemini text
+    never mix. Misses are timed in mafai_llm_call_seconds.
+    """
+    narrator = get_narrator()
+    key = narration_cache.key(kind, inputs, narrator.cache_config())
+    cached = narration_cache.get(key) if store else None
+    if cached is not None:
+        return cached
+
+    start, outcome = time.perf_counter(), "error"
+    try:
+        with tracer.span("narrator:" + kind, narrator=narrator.name):
+            text = produce(narrator)
+        outcome = "ok"
+    except LLMUnavailable:
+        outcome = "unavailable"
+        raise
+    finally:
+        llm_call_seconds.observe(time.perf_counter() - start, kind, narrator.name, outcome)
+    if store:
+        narration_cache.put(key, text, kind)
+    return text
+
+
+def generate_background_story(theme: str, game_id: str = None, on_chunk=None):
     """
     Generate a background story for the Mafia game based on the theme.
 
     Args:
         theme: Theme of the game
+        game_id: If given, the story is cached for this game so a retried start
+            returns the same intro, and it falls back to a fixed intro when the
+            model fails or is unavailable. Without it every call gets a fresh
+            story at prefetch priority and the error is raised instead.
+        on_chunk: Optional callback that receives the text as it streams in
     """
-    prompt = f"""Given the {theme}:
-                - briefly and explicitly welcome the players
-                - write a background narrative for a Mafia game
-                - keep it engaging, but don't use too many adjectives or any complicated vocabulary
-                - briefly and explicitly wish the players good luck
-                - keep it concise (2-3 sentences)"""
-    response = model.generate_content(
-        prompt,
-        generation_config={
-            "temperature": 0.7,
-            "top_p": 0.9
-        }
-    )
-    print(response.text.strip()[:20])
-    return response.text.strip()
-
-
-def generate_mafia_story(night_actions: dict, special_actions: dict, round_number: int, theme: str = None):
+    try:
+        text = _cached(
+            "background", {"theme": theme, "game_id": game_id},
+            lambda narrator: narrator.background_story(
+                theme, PRIORITY_INTRO if game_id else PRIORITY_PREFETCH, on_chunk
+            ),
+            store=bool(game_id),
+        )
+    except Exception as e:
+        if not game_id:
+            raise
+        print(f"Background story failed, using the fallback: {e}")
+        return fallback_background_story(theme)
+    print(text[:20])
+    return text
+
+
+def generate_mafia_story(night_actions: dict, special_actions: dict, round_number: int, theme: str = None,
+                         on_chunk=None, priority: int = PRIORITY_DAY):
     """
     Generate a story for the Mafia game based on night actions and special events.
 
@@ -57,58 +84,35 @@ def generate_mafia_story(night_actions: dict, special_actions: dict, round_numbe
                 }
         round_number: Current round number
         theme: Optional theme for story flavor
+        on_chunk: Optional callback that receives the text as it streams in
+        priority: Governor priority. Below PRIORITY_DAY (speculation) errors are
+            raised instead of returning the fallback story.
 
     Returns:
         str: Generated story text
     """
-    theme_text = f"Theme: {theme}.\n" if theme else ""
-
-    # Build a readable description of night actions
-    actions_text = ""
-    for player, act in night_actions.items():
-        role = act.get("role", "unknown")
-        action = act.get("action", "")
-        actions_text += f"- {role} {player} performed {action}\n"
-
-    # Include deaths and revivals
-    deaths = special_actions.get("deaths", [])
-    revivals = special_actions.get("revivals", [])
-    special_text = ""
-    if deaths:
-        special_text += "Deaths occurred: " + ", ".join(deaths) + ".\n"
-    if revivals:
-        special_text += "Players revived: " + ", ".join(revivals) + ".\n"
-
-    prompt = f"""
-        You are a creative storyteller narrating a Mafia game.
-        {theme_text}
-        It was Night {round_number}. Players performed the following actions:
-        {actions_text}
-        {special_text}
-        Write a narrative that:
-        - Story should not reveal the exact roles and names of the players when describing actions
-        - The story should not hint at the roles of players who are still alive
-        - The only players mentioned by name should be those who died or were revived
-        - If there was a revival, the doctor's action should not be mentioned. Just briefly mention the revival in the story.
-        - Summarizes the night in an engaging way without complicating the story 
-        - If there are deaths, describe them and include a hint about what the murderer was doing during their nighttime actions, but add one or two subtle random twists to mislead players (i.e. hint at another player's action)
-        - Leaves hints for alive players to discuss during the day
-        - Mentions deaths if any, but keeps suspense
-        - Don't use overly complicated vocabulary or too much adjectives, but keep it suspenseful
-        Return the story in one paragraph maximum suitable for all players.
-    """
-
-    response = model.generate_content(
-        prompt,
-        generation_config={
-            "temperature": 0.7,
-            "top_p": 0.9
-        }
-    )
-
-    return response.text.strip()
-
-def generate_vote_results(vote_summary: dict, players: dict, round_number: int, theme: str = None):
+    inputs = {
+        "theme": theme,
+        "round": round_number,
+        "actions": night_actions,
+        "deaths": sorted(special_actions.get("deaths", [])),
+        "revivals": sorted(special_actions.get("revivals", [])),
+    }
+    try:
+        return _cached(
+            "night", inputs,
+            lambda narrator: narrator.mafia_story(
+                night_actions, special_actions, round_number, theme, priority, on_chunk
+            ),
+        )
+    except Exception as e:
+        if priority != PRIORITY_DAY:
+            raise
+        print(f"Night story failed, using the fallback: {e}")
+        return fallback_mafia_story(special_actions, round_number)
+
+def generate_vote_results(vote_summary: dict, players: dict, round_number: int, theme: str = None,
+                          on_chunk=None):
     """
     Generate a narrative summary of the daytime voting results.
 
@@ -120,56 +124,68 @@ def generate_vote_results(vote_summary: dict, players: dict, round_number: int,
                 "votes": {"Alice": "Bob", "Charlie": "Bob", "David": "skip"},
                 "game_over": bool
             }
-        players: Dict of player_id -> {"name": str, "role": str, "alive": bool}
+        players: Dict of player_id -> Player (MafiaGame.players)
         round_number: Current round number
         theme: Optional theme for story flavor
+        on_chunk: Optional callback that receives the text as it streams in
 
     Returns:
         str: Generated story text
     """
-    theme_text = f"Theme: {theme}.\n" if theme else ""
-
     # Format vote data into readable text
     votes_cast = []
     for voter, target in vote_summary.get("votes", {}).items():
-        voter_name = players[voter]["name"] if voter in players else voter
+        voter_name = players[voter].name if voter in players else voter
         if target == "skip":
             votes_cast.append(f"{voter_name} chose to skip voting")
         else:
-            target_name = players[target]["name"] if target in players else target
+            target_name = players[target].name if target in players else target
             votes_cast.append(f"{voter_name} voted against {target_name}")
-    votes_text = "\n".join(f"- {line}" for line in votes_cast)
 
     eliminated_name = None
     if vote_summary.get("outcome") == "player_eliminated":
         eliminated_id = vote_summary.get("eliminated")
-        eliminated_name = players[eliminated_id]["name"] if eliminated_id in players else "Unknown"
-
-    prompt = f"""
-        You are narrating the Mafia game's daytime events.
-        {theme_text}
-        It was Day {round_number}. The town gathered to vote.
-        Voting summary:
-        {votes_text}
-        Outcome: {"No elimination" if not eliminated_name else f"{eliminated_name} was voted out"}.
-
-        Write a short narrative that:
-        - Describe the voting outcome very briefly and don't add extra, unnecessary details
-        - Does NOT mention any player roles
-        - Only mention names of players who were eliminated (if any) but do not mention their roles at all 
-        - Keep it concise and suspenseful, no more than 3 sentences
-        - Keep vocabulary simple, avoid excessive adjectives
-    """
+        eliminated_name = players[eliminated_id].name if eliminated_id in players else "Unknown"
+
+    # Key on names rather than the raw players dict so ids and order don't matter
+    inputs = {
+        "theme": theme,
+        "round": round_number,
+        "votes": sorted(votes_cast),
+        "eliminated": eliminated_name,
+    }
+    try:
+        return _cached(
+            "votes", inputs,
+            lambda narrator: narrator.vote_results(
+                votes_cast, eliminated_name, round_number, theme, PRIORITY_DAY, on_chunk
+            ),
+        )
+    except Exception as e:
+        print(f"Vote results story failed, using the fallback: {e}")
+        return fallback_vote_results(vote_summary.get("outcome"), eliminated_name)
+
+
+def fallback_background_story(theme: str):
+    """Deterministic intro used when the model is slow or unavailable."""
+    setting = theme.split(":")[0] if theme else "the town"
+    return f"Welcome to {setting}. Someone among you is not who they claim to be. Good luck!"
+
+
+def fallback_mafia_story(special_actions: dict, round_number: int):
+    """Deterministic night summary used when the model is slow or unavailable."""
+    deaths = special_actions.get("deaths", [])
+    if deaths:
+        verb = "was" if len(deaths) == 1 else "were"
+        return f"Night {round_number} passed. By morning, {', '.join(deaths)} {verb} found dead."
+    return f"Night {round_number} passed quietly. Everyone woke up safe, but the danger is not over."
 
-    response = model.generate_content(
-        prompt,
-        generation_config={
-            "temperature": 0.7,
-            "top_p": 0.9
-        }
-    )
 
-    return response.text.strip()
+def fallback_vote_results(outcome: str, eliminated_name: str = None):
+    """Deterministic voting summary used when the model is slow or unavailable."""
+    if outcome == "player_eliminated" and eliminated_name:
+        return f"The town voted, and {eliminated_name} was eliminated."
+    return "The town voted, but no one was eliminated."
 
 
 # if __name__ == "__main__":
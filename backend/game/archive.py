@@ -0,0 +1,74 @@
+import gzip
+import json
+import os
+import re
+import threading
+
+ARCHIVE_DIR = os.getenv("MAFAI_ARCHIVE_DIR", "mafai_archive")
+ARCHIVE_LEVEL = int(os.getenv("MAFAI_ARCHIVE_LEVEL", 6))  # gzip compression level
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class GameArchive:
+    """
+    Finished games, kept on disk after they leave memory.
+
+    Each game is its final compact snapshot (MafiaGame.to_snapshot()) as a
+    gzip-compressed JSON file, <directory>/<game_id>.json.gz, so it can be
+    restored with MafiaGame.restore() to look at how it ended.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR, level=ARCHIVE_LEVEL):
+        self.directory = directory
+        self.level = level
+        self._lock = threading.Lock()
+        self._counts = {"archived": 0, "raw_bytes": 0, "compressed_bytes": 0, "loaded": 0}
+
+    def _path(self, game_id):
+        if not game_id or not _SAFE_ID.match(game_id):
+            raise ValueError(f"Invalid game id: {game_id!r}")
+        return os.path.join(self.directory, f"{game_id}.json.gz")
+
+    def put(self, game):
+        """Writes the game's archive and returns its compressed size in bytes."""
+        raw = json.dumps(game.to_snapshot(), separators=(",", ":")).encode("utf-8")
+        data = gzip.compress(raw, compresslevel=self.level)
+
+        path = self._path(game.id)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._counts["archived"] += 1
+            self._counts["raw_bytes"] += len(raw)
+            self._counts["compressed_bytes"] += len(data)
+        return len(data)
+
+    def get(self, game_id):
+        """Returns the archived game restored as a MafiaGame, or None."""
+        from .state_machine import MafiaGame
+
+        try:
+            with open(self._path(game_id), "rb") as f:
+                snapshot = gzip.decompress(f.read()).decode("utf-8")
+        except (FileNotFoundError, ValueError):
+            return None
+        with self._lock:
+            self._counts["loaded"] += 1
+        return MafiaGame.restore(snapshot)
+
+    def stats(self):
+        with self._lock:
+            raw = self._counts["raw_bytes"]
+            return {
+                "directory": self.directory,
+                **self._counts,
+                "ratio": round(self._counts["compressed_bytes"] / raw, 3) if raw else None,
+            }
+
+
+game_archive = GameArchive()
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+NARRATION_CACHE_SIZE = int(os.getenv("MAFAI_NARRATION_CACHE_SIZE", 512))
+NARRATION_CACHE_DB = os.getenv("MAFAI_NARRATION_CACHE_DB")  # unset = memory only
+
+
+class NarrationCache:
+    """
+    Content-addressed cache for generated narration.
+
+    Keys are a hash of the canonical (sorted-key JSON) prompt inputs plus the
+    model and generation config, so the same round or a retried socket event
+    maps to the same entry regardless of dict ordering. Entries live in a
+    size-bounded in-memory LRU and, if db_path is set, in a SQLite file that
+    survives restarts.
+    """
+
+    def __init__(self, max_entries=NARRATION_CACHE_SIZE, db_path=NARRATION_CACHE_DB):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._lock = threading.Lock()     # memory tier and counters
+        self._db_lock = threading.Lock()  # SQLite connection, so memory hits never wait on disk I/O
+        self._memory = OrderedDict()
+        self._db = None
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if db_path:
+            import sqlite3
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS narration_cache ("
+                "key TEXT PRIMARY KEY, kind TEXT, text TEXT NOT NULL, created_at REAL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(kind, inputs, config):
+        """Returns the hex digest identifying a generation request."""
+        canonical = json.dumps({"kind": kind, "inputs": inputs, "config": config},
+                               sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self._counts["memory_hits"] += 1
+                return text
+
+        row = None
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute("SELECT text FROM narration_cache WHERE key = ?", (key,)).fetchone()
+
+        with self._lock:
+            if row:
+                self._counts["disk_hits"] += 1
+                self._remember(key, row[0])
+                return row[0]
+            self._counts["misses"] += 1
+            return None
+
+    def put(self, key, text, kind=None):
+        with self._lock:
+            self._remember(key, text)
+            self._counts["stores"] += 1
+
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO narration_cache (key, kind, text, created_at) VALUES (?, ?, ?, ?)",
+                    (key, kind, text, time.time()),
+                )
+                self._db.commit()
+
+    def _remember(self, key, text):
+        """Adds to the memory tier, evicting least recently used entries. Caller holds the lock."""
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counts["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM narration_cache")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counts["memory_hits"] + self._counts["disk_hits"] + self._counts["misses"]
+            hits = lookups - self._counts["misses"]
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk": bool(self._db),
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                **self._counts,
+            }
+
+
+narration_cache = NarrationCache()
@@ -0,0 +1,183 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+LLM_CONCURRENCY = int(os.getenv("MAFAI_LLM_CONCURRENCY", 4))
+LLM_RATE = float(os.getenv("MAFAI_LLM_RATE", 2))          # calls per second, 0 = unlimited
+LLM_BURST = int(os.getenv("MAFAI_LLM_BURST", 4))
+LLM_QUEUE_TIMEOUT = float(os.getenv("MAFAI_LLM_QUEUE_TIMEOUT", 20))
+LLM_FAILURE_THRESHOLD = int(os.getenv("MAFAI_LLM_FAILURE_THRESHOLD", 3))
+LLM_COOLDOWN = float(os.getenv("MAFAI_LLM_COOLDOWN", 30))
+
+# Lower runs first
+PRIORITY_DAY = 0         # night/day stories and vote results for a game in progress
+PRIORITY_INTRO = 1       # intro for a game that is starting right now
+PRIORITY_PREFETCH = 2    # story pool refills
+PRIORITY_SPECULATIVE = 3 # candidate night stories that are usually thrown away
+
+
+class LLMUnavailable(Exception):
+    """Raised instead of calling the model when the circuit is open or the queue is too slow."""
+
+
+class LLMGovernor:
+    """
+    Process-wide gate in front of every model call.
+
+    Limits concurrent calls, hands free slots to the highest priority waiter,
+    paces calls with a token bucket and trips a circuit breaker after repeated
+    failures so callers switch to fallback narration instead of piling on.
+    """
+
+    def __init__(self, max_concurrency=LLM_CONCURRENCY, rate=LLM_RATE, burst=LLM_BURST,
+                 queue_timeout=LLM_QUEUE_TIMEOUT, failure_threshold=LLM_FAILURE_THRESHOLD,
+                 cooldown=LLM_COOLDOWN):
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.queue_timeout = queue_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self._cond = threading.Condition()
+        self._waiting = []               # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._active = 0
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+
+        self._circuit = "closed"         # closed -> open -> half_open -> closed
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+        self._counts = {"calls": 0, "failures": 0, "rejected": 0, "queue_timeouts": 0, "circuit_trips": 0}
+
+    def call(self, fn, priority=PRIORITY_DAY):
+        """Runs fn() under the governor; raises LLMUnavailable if it should not run."""
+        trial = self._check_circuit()
+        try:
+            self._acquire(priority)
+        except LLMUnavailable:
+            # A queue that stops draining is as much a sign of trouble as failing calls.
+            # Prefetches and speculation wait behind everything else, so their
+            # timeouts only mean the governor is busy.
+            self._record(False, trial, called=False, counts=trial or priority <= PRIORITY_INTRO)
+            raise
+
+        try:
+            result = fn()
+        except Exception:
+            self._record(False, trial)
+            raise
+        else:
+            self._record(True, trial)
+            return result
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    # ------------------- Circuit Breaker -------------------
+
+    def _check_circuit(self):
+        """Returns True if this call is the half-open trial call."""
+        with self._cond:
+            if self._circuit == "open":
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    self._counts["rejected"] += 1
+                    raise LLMUnavailable("LLM circuit open")
+                self._circuit = "half_open"
+
+            if self._circuit == "half_open":
+                if self._trial_running:
+                    self._counts["rejected"] += 1
+                    raise LLMUnavailable("LLM circuit half-open, trial in progress")
+                self._trial_running = True
+                return True
+            return False
+
+    def _record(self, ok, trial, called=True, counts=True):
+        """
+        Updates the breaker with a call's outcome. called=False is a call that
+        timed out in the queue; counts=False leaves the breaker as it is.
+        """
+        with self._cond:
+            if called:
+                self._counts["calls"] += 1
+            if trial:
+                self._trial_running = False
+
+            if ok:
+                self._failures = 0
+                self._circuit = "closed"
+                return
+
+            if called:
+                self._counts["failures"] += 1
+            if not counts:
+                return
+            self._failures += 1
+            if trial or self._failures >= self.failure_threshold:
+                if self._circuit != "open":
+                    self._counts["circuit_trips"] += 1
+                    print(f"LLM circuit opened after {self._failures} failures")
+                self._circuit = "open"
+                self._opened_at = time.monotonic()
+
+    # ------------------- Slots & Rate Limit -------------------
+
+    def _token_wait(self, now):
+        """Refills the bucket and returns how long until a token is available."""
+        if self.rate <= 0:
+            return 0
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    def _acquire(self, priority):
+        with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiting, entry)
+            deadline = time.monotonic() + self.queue_timeout
+
+            while True:
+                now = time.monotonic()
+                wait = None
+                if self._waiting[0] == entry and self._active < self.max_concurrency:
+                    wait = self._token_wait(now)
+                    if wait <= 0:
+                        heapq.heappop(self._waiting)
+                        self._active += 1
+                        if self.rate > 0:
+                            self._tokens -= 1
+                        # the next waiter may be able to go too
+                        self._cond.notify_all()
+                        return
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._counts["queue_timeouts"] += 1
+                    self._cond.notify_all()
+                    raise LLMUnavailable("Timed out waiting for an LLM slot")
+                self._cond.wait(min(remaining, wait) if wait else remaining)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "circuit": self._circuit,
+                "active": self._active,
+                "waiting": len(self._waiting),
+                "max_concurrency": self.max_concurrency,
+                "consecutive_failures": self._failures,
+                **self._counts,
+            }
+
+
+governor = LLMGovernor()
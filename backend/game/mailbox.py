@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+MAILBOX_WORKERS = int(os.getenv("MAFAI_MAILBOX_WORKERS", 8))
+MAILBOX_BATCH = int(os.getenv("MAFAI_MAILBOX_BATCH", 32))  # commands per turn before yielding the worker
+
+
+class GameMailboxes:
+    """
+    Runs each game's commands one at a time, in the order they arrive.
+
+    Every game gets a mailbox (a queue of commands). At most one worker drains
+    a given mailbox at a time, so all changes to a game come from a single
+    writer, while different games run in parallel on the pool. A worker runs
+    up to MAILBOX_BATCH commands and then goes to the back of the pool queue,
+    so one busy game can't hold a worker forever.
+    """
+
+    def __init__(self, workers=MAILBOX_WORKERS, batch=MAILBOX_BATCH):
+        self.batch = batch
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mailbox")
+        self._lock = threading.Lock()
+        self._boxes = {}          # game_id -> deque of (fn, args, kwargs, future, queued_at)
+        self._scheduled = set()   # games with a drain queued or running
+        self._local = threading.local()
+        self._counts = {"commands": 0, "failed": 0, "max_queue": 0, "wait_ms_total": 0.0}
+
+    def submit(self, game_id, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs) on the game's mailbox; returns a Future."""
+        future = Future()
+        with self._lock:
+            box = self._boxes.setdefault(game_id, deque())
+            box.append((fn, args, kwargs, future, time.monotonic()))
+            self._counts["max_queue"] = max(self._counts["max_queue"], len(box))
+            if game_id not in self._scheduled:
+                self._scheduled.add(game_id)
+                self._executor.submit(self._drain, game_id)
+        return future
+
+    def run(self, game_id, fn, *args, **kwargs):
+        """
+        Runs fn on the game's mailbox and waits for its result. Called from the
+        game's own writer (a command calling another), fn runs right away.
+        """
+        if getattr(self._local, "game_id", None) == game_id:
+            return fn(*args, **kwargs)
+        return self.submit(game_id, fn, *args, **kwargs).result()
+
+    def _drain(self, game_id):
+        self._local.game_id = game_id
+        try:
+            for _ in range(self.batch):
+                with self._lock:
+                    box = self._boxes.get(game_id)
+                    if not box:
+                        self._boxes.pop(game_id, None)
+                        self._scheduled.discard(game_id)
+                        return
+                    fn, args, kwargs, future, queued_at = box.popleft()
+                    self._counts["commands"] += 1
+                    self._counts["wait_ms_total"] += (time.monotonic() - queued_at) * 1000
+
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    self._counts["failed"] += 1
+                    print(f"Command {getattr(fn, '__name__', fn)} for game {game_id} failed: {e}")
+                    future.set_exception(e)
+
+            # Batch used up: let other games have this worker, then carry on
+            self._executor.submit(self._drain, game_id)
+        finally:
+            self._local.game_id = None
+
+    def queue_length(self, game_id):
+        with self._lock:
+            return len(self._boxes.get(game_id, ()))
+
+    def stats(self):
+        with self._lock:
+            queues = {game_id: len(box) for game_id, box in self._boxes.items() if box}
+            commands = self._counts["commands"]
+            return {
+                "active_games": len(self._scheduled),
+                "queued": sum(queues.values()),
+                "queue_lengths": queues,
+                "commands": commands,
+                "failed": self._counts["failed"],
+                "max_queue": self._counts["max_queue"],
+                "avg_wait_ms": round(self._counts["wait_ms_total"] / commands, 2) if commands else None,
+            }
+
+
+mailboxes = GameMailboxes()
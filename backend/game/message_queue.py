@@ -0,0 +1,150 @@
+import atexit
+import glob
+import os
+import queue
+import socket
+import socketio
+import threading
+from .wire import wire_json
+
+MESSAGE_QUEUE = os.getenv("MAFAI_MESSAGE_QUEUE", "")  # unset = single worker, no queue
+QUEUE_POLL_INTERVAL = float(os.getenv("MAFAI_QUEUE_POLL_INTERVAL", 0.005))
+QUEUE_SEND_TIMEOUT = float(os.getenv("MAFAI_QUEUE_SEND_TIMEOUT", 1.0))
+
+
+class ListenOnce:
+    """
+    Makes initialize() (which starts the queue listener) safe to call twice.
+
+    python-socketio only initializes the client manager on the first local
+    connect, but a worker whose players all connected elsewhere still has to
+    hear the queue, so init_socketio() initializes it up front as well.
+    """
+
+    _listening = False
+
+    def initialize(self):
+        if self._listening:
+            return
+        self._listening = True
+        super().initialize()
+
+
+class RedisManager(ListenOnce, socketio.RedisManager):
+    pass
+
+
+class KombuManager(ListenOnce, socketio.KombuManager):
+    pass
+
+
+class LocalManager(ListenOnce, socketio.PubSubManager):
+    """
+    Message queue between Socket.IO servers in the same process.
+
+    Stand-in for Redis in tests and benchmarks: every LocalManager created in
+    the process shares one bus, so several apps can talk to each other
+    without any broker running.
+    """
+
+    name = "local"
+    _subscribers = []
+
+    def __init__(self, channel="socketio", write_only=False, logger=None, json=wire_json):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self._inbox = queue.Queue()
+        LocalManager._subscribers.append(self._inbox)
+
+    def _publish(self, data):
+        message = self.json.dumps(data)
+        for inbox in LocalManager._subscribers:
+            inbox.put(message)
+
+    def _listen(self):
+        while True:
+            try:
+                yield self._inbox.get_nowait()
+            except queue.Empty:
+                # sleep through the server so this also works under eventlet
+                self.server.sleep(QUEUE_POLL_INTERVAL)
+
+
+class UnixSocketManager(ListenOnce, socketio.PubSubManager):
+    """
+    Message queue between worker processes on one host, without a broker.
+
+    Each worker binds a datagram socket in a shared directory and publishes
+    by sending the message to every other socket found there. Sends block
+    (up to QUEUE_SEND_TIMEOUT) while a receiver's queue is full.
+    """
+
+    name = "unix"
+
+    def __init__(self, directory, channel="socketio", write_only=False, logger=None, json=wire_json):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{channel}-{self.host_id}.sock")
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.setblocking(False)
+        self._send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._send_sock.settimeout(QUEUE_SEND_TIMEOUT)
+        # one sender at a time: eventlet refuses two green threads writing one socket
+        self._send_lock = threading.Lock()
+
+    def _publish(self, data):
+        message = self.json.dumps(data).encode("utf-8")
+        with self._send_lock:
+            self._send_all(message)
+
+    def _send_all(self, message):
+        for path in glob.glob(os.path.join(self.directory, f"{self.channel}-*.sock")):
+            if path == self.path:
+                continue  # this server already handled the message
+            try:
+                self._send_sock.sendto(message, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # socket left behind by a worker that is gone
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except socket.timeout:
+                print(f"Message queue: {path} is not reading, dropped a message")
+
+    def _listen(self):
+        while True:
+            try:
+                message = self._sock.recv(1 << 20)
+            except BlockingIOError:
+                self.server.sleep(QUEUE_POLL_INTERVAL)
+                continue
+            yield message.decode("utf-8")
+
+    def close(self):
+        self._sock.close()
+        self._send_sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def create_client_manager(url=MESSAGE_QUEUE):
+    """
+    Returns the Socket.IO client manager for a queue URL, or None for a single
+    worker. Accepts local:// (in-process), unix:///dir (one host, no broker),
+    redis:// and anything Kombu understands (e.g. amqp://).
+    """
+    if not url:
+        return None
+    if url.startswith("local://"):
+        return LocalManager()
+    if url.startswith("unix://"):
+        manager = UnixSocketManager(url[len("unix://"):])
+        atexit.register(manager.close)
+        return manager
+    if url.startswith(("redis://", "rediss://")):
+        return RedisManager(url, json=wire_json)
+    return KombuManager(url, json=wire_json)
@@ -0,0 +1,199 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("MAFAI_METRICS", "1") == "1"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """One metric family: a name, help text, label names and a value per label set."""
+
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}   # label values tuple -> value
+        self._lock = threading.Lock()
+
+    def samples(self):
+        """Yields (suffix, label values, extra label text, value) for the exposition."""
+        with self._lock:
+            items = list(self._values.items())
+        for values, value in items:
+            yield "", values, "", value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labels, values, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. With collect, the values are read when the
+    metrics are scraped: collect() returns {label values tuple: value}, which
+    keeps hot paths free of gauge updates.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), collect=None):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def samples(self):
+        if self.collect is None:
+            yield from super().samples()
+            return
+        for values, value in self.collect().items():
+            yield "", values, "", value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # [count per bucket (the last one is +Inf)..., sum]
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(values, list(series)) for values, series in self._values.items()]
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                yield "_bucket", values, f'le="{_format_value(float(bound))}"', cumulative
+            yield "_sum", values, "", series[-1]
+            yield "_count", values, "", cumulative
+
+
+class MetricsRegistry:
+    """
+    The process's metrics, rendered in the Prometheus text format for /metrics.
+
+    Recording is a dict update under the metric's own lock (plus a bisect for
+    histograms), cheap enough to leave on in production; MAFAI_METRICS=0
+    turns it off.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=(), collect=None):
+        gauge = self._register(Gauge(name, help, labels, collect))
+        if collect is not None:
+            gauge.collect = collect  # the latest owner wins, e.g. after init_socketio runs again
+        return gauge
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"Could not collect metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# ------------------- Metrics -------------------
+
+socket_handler_seconds = metrics.histogram(
+    "mafai_socket_handler_seconds", "Time spent in Socket.IO event handlers.", ("event",))
+socket_handler_errors = metrics.counter(
+    "mafai_socket_handler_errors_total", "Socket.IO handlers that raised.", ("event",))
+http_request_seconds = metrics.histogram(
+    "mafai_http_request_seconds", "Time spent serving /api requests.", ("endpoint", "method"))
+http_errors = metrics.counter(
+    "mafai_http_errors_total", "/api responses with a 4xx or 5xx status.", ("endpoint", "status"))
+socket_emits = metrics.counter(
+    "mafai_socket_emits_total", "Socket.IO event packets encoded, by event.", ("event",))
+socket_emit_bytes = metrics.counter(
+    "mafai_socket_emit_bytes_total", "Bytes of encoded Socket.IO event packets, by event.", ("event",))
+socket_emits_coalesced = metrics.counter(
+    "mafai_socket_emits_coalesced_total", "Broadcasts folded into one already waiting to go out.", ("event",))
+socket_emit_bytes_saved = metrics.counter(
+    "mafai_socket_emit_bytes_saved_total", "Bytes deflate took off payloads for clients that asked for it.",
+    ("event",))
+llm_call_seconds = metrics.histogram(
+    "mafai_llm_call_seconds", "Narrator calls that missed the cache.", ("kind", "narrator", "outcome"),
+    buckets=LLM_BUCKETS)
+llm_tokens = metrics.counter(
+    "mafai_llm_tokens_total", "Tokens reported by the model.", ("model", "direction"))
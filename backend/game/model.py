@@ -1,13 +1,21 @@
 import uuid
 
 class Player:
-    def __init__(self, name):
-        """Initialize a player object."""
-        self.player_id = str(uuid.uuid4())[:8]
+    """
+    One player in one game. MafiaGame.players maps player_id -> Player, and
+    this record is the only copy of the player's role and alive flag.
+    """
+
+    __slots__ = ("player_id", "name", "role", "is_alive", "ready", "eliminated_in_round")
+
+    def __init__(self, name, player_id=None):
+        """Initialize a player object (player_id is given when a game is replayed)."""
+        self.player_id = player_id or str(uuid.uuid4())[:8]
         self.name = name
         self.role = None
         self.is_alive = True
         self.ready = False
+        self.eliminated_in_round = None  # set when killed at night
 
     def get_info(self):
         """Return player information."""
@@ -33,4 +41,3 @@ class Player:
 
     def set_ready(self, ready=True):
         self.ready = ready
-   
\ No newline at end of file
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from .tracing import tracer
+
+NARRATION_WORKERS = int(os.getenv("MAFAI_NARRATION_WORKERS", 4))
+NARRATION_TIMEOUT = float(os.getenv("MAFAI_NARRATION_TIMEOUT", 30))
+NARRATION_STREAMING = os.getenv("MAFAI_STREAM_NARRATION", "1") == "1"
+
+
+class NarrationJob:
+    def __init__(self, game_id, kind, fallback, on_ready, round_number=None):
+        """A single queued narration request for one game."""
+        self.id = str(uuid.uuid4())[:8]
+        self.game_id = game_id
+        self.kind = kind
+        self.round = round_number
+        self.fallback = fallback
+        self.on_ready = on_ready
+        self.status = "queued"
+        self.streamed = False
+        self.chunks = 0
+        self.text = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.span = tracer.current()  # the span that queued the job; the job's own span is its child
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "game_id": self.game_id,
+            "kind": self.kind,
+            "round": self.round,
+            "status": self.status,
+            "chunks": self.chunks,
+            "text": self.text,
+        }
+
+
+class NarrationPipeline:
+    """
+    Runs AI narration off the socket handler thread.
+
+    Handlers submit a job and get its id back immediately. A bounded pool of
+    workers calls the model; when text is available (or the job times out and
+    falls back to deterministic narration) the job's on_ready callback fires.
+    """
+
+    def __init__(self, workers=NARRATION_WORKERS, timeout=NARRATION_TIMEOUT, max_finished=256):
+        self.timeout = timeout
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="narration")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._finished = []
+        self._latest = {}
+        self._counts = {"submitted": 0, "completed": 0, "timed_out": 0, "failed": 0}
+
+    def submit(self, game_id, kind, fn, args=(), fallback="", on_ready=None, round_number=None, on_chunk=None):
+        """
+        Queues fn(*args) and returns the job id without waiting for it.
+
+        If on_chunk is given, fn is also called with an on_chunk keyword and
+        every piece of text it reports is passed on as on_chunk(job, seq, text).
+        """
+        job = NarrationJob(game_id, kind, fallback, on_ready, round_number)
+        job.streamed = on_chunk is not None
+        with self._lock:
+            self._jobs[job.id] = job
+            self._counts["submitted"] += 1
+
+        kwargs = {}
+        if on_chunk is not None:
+            kwargs["on_chunk"] = lambda text: self._chunk(job, on_chunk, text)
+
+        timer = threading.Timer(self.timeout, self._expire, args=(job,))
+        timer.daemon = True
+        timer.start()
+        self._executor.submit(self._run, job, fn, args, kwargs, timer)
+        return job.id
+
+    def _chunk(self, job, on_chunk, text):
+        with self._lock:
+            # Chunks from a job that already timed out would contradict the fallback
+            if job.status != "running":
+                return
+            job.chunks += 1
+            seq = job.chunks
+        try:
+            on_chunk(job, seq, text)
+        except Exception as e:
+            print(f"Narration chunk callback for job {job.id} failed: {e}")
+
+    def _run(self, job, fn, args, kwargs, timer):
+        with self._lock:
+            if job.status != "queued":
+                return
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            with tracer.span("narration:" + job.kind, job.game_id, job.round, parent=job.span,
+                             job=job.id, queued_ms=round((job.started_at - job.submitted_at) * 1000, 3)):
+                text = fn(*args, **kwargs)
+        except Exception as e:
+            print(f"Narration job {job.id} ({job.kind}) failed: {e}")
+            timer.cancel()
+            job.error = str(e)
+            self._finish(job, "failed", job.fallback)
+            return
+        timer.cancel()
+        self._finish(job, "done", text)
+
+    def _expire(self, job):
+        print(f"Narration job {job.id} ({job.kind}) timed out after {self.timeout}s")
+        self._finish(job, "timed_out", job.fallback)
+
+    def _finish(self, job, status, text):
+        """Completes a job exactly once; late results from timed out jobs are dropped."""
+        with self._lock:
+            if job.status in ("done", "timed_out", "failed"):
+                return
+            job.status = status
+            job.text = text
+            job.finished_at = time.time()
+            self._counts["completed" if status == "done" else status] += 1
+            self._finished.append(job.id)
+            self._latest[job.game_id] = job
+            while len(self._finished) > self.max_finished:
+                self._jobs.pop(self._finished.pop(0), None)
+
+        if job.on_ready:
+            try:
+                job.on_ready(job)
+            except Exception as e:
+                print(f"Narration callback for job {job.id} failed: {e}")
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def latest(self, game_id):
+        """Returns the most recently finished job for a game, if any."""
+        with self._lock:
+            return self._latest.get(game_id)
+
+    def forget(self, game_id):
+        with self._lock:
+            self._latest.pop(game_id, None)
+
+    def queue_depth(self):
+        """Number of jobs waiting for a free worker."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == "queued")
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == "running")
+            queued = sum(1 for job in self._jobs.values() if job.status == "queued")
+            return {"queue_depth": queued, "running": running, **self._counts}
+
+
+narration = NarrationPipeline()
@@ -0,0 +1,327 @@
+import hashlib
+import json
+import os
+import random
+import threading
+from .governor import governor, PRIORITY_DAY
+from .metrics import llm_tokens
+from .tracing import tracer
+from .prompts import background_prompt, mafia_story_prompt, vote_results_prompt
+
+LLM_TIMEOUT = float(os.getenv("MAFAI_LLM_TIMEOUT", 20))
+# gRPC (the SDK's default) blocks eventlet's hub for the whole call, so green
+# workers talk to the model over REST, whose sockets monkey patching makes green
+GEMINI_TRANSPORT = os.getenv("MAFAI_GEMINI_TRANSPORT") or (
+    "rest" if os.getenv("MAFAI_ASYNC_MODE") == "eventlet" else None)
+
+
+class Narrator:
+    """
+    Turns game events into narration text.
+
+    Every method takes the same inputs as the matching generate_* function in
+    game/ai.py and returns the full text; if on_chunk is given, pieces of the
+    text are also passed to it as they become available.
+    """
+
+    name = "base"
+
+    def cache_config(self):
+        """Everything besides the inputs that changes the output (part of the cache key)."""
+        return {"narrator": self.name}
+
+    def background_story(self, theme, priority=PRIORITY_DAY, on_chunk=None):
+        raise NotImplementedError
+
+    def mafia_story(self, night_actions, special_actions, round_number, theme=None, priority=PRIORITY_DAY, on_chunk=None):
+        raise NotImplementedError
+
+    def vote_results(self, votes_cast, eliminated_name, round_number, theme=None, priority=PRIORITY_DAY, on_chunk=None):
+        raise NotImplementedError
+
+
+# ------------------- Gemini -------------------
+
+class GeminiNarrator(Narrator):
+    name = "gemini"
+    MODEL_NAME = "gemini-2.5-flash"
+    GENERATION_CONFIG = {
+        "temperature": 0.7,
+        "top_p": 0.9
+    }
+
+    def __init__(self, api_key):
+        # The SDK takes most of the backend's import time, so only load it once
+        # a worker actually needs to narrate
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key, transport=GEMINI_TRANSPORT)
+        self.model = genai.GenerativeModel(self.MODEL_NAME)
+
+    def cache_config(self):
+        return {"model": self.MODEL_NAME, **self.GENERATION_CONFIG}
+
+    def background_story(self, theme, priority=PRIORITY_DAY, on_chunk=None):
+        with tracer.span("prompt"):
+            prompt = background_prompt(theme)
+        return self._generate(prompt, priority, on_chunk)
+
+    def mafia_story(self, night_actions, special_actions, round_number, theme=None, priority=PRIORITY_DAY, on_chunk=None):
+        with tracer.span("prompt"):
+            prompt = mafia_story_prompt(night_actions, special_actions, round_number, theme)
+        return self._generate(prompt, priority, on_chunk)
+
+    def vote_results(self, votes_cast, eliminated_name, round_number, theme=None, priority=PRIORITY_DAY, on_chunk=None):
+        with tracer.span("prompt"):
+            prompt = vote_results_prompt(votes_cast, eliminated_name, round_number, theme)
+        return self._generate(prompt, priority, on_chunk)
+
+    def _generate(self, prompt, priority, on_chunk):
+        """
+        Calls the model through the governor.
+
+        With on_chunk the response is streamed and each piece of text is passed to
+        on_chunk as it arrives; the full text is still returned at the end.
+        Raises LLMUnavailable when the governor refuses the call.
+        """
+        def call():
+            if on_chunk is None:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=self.GENERATION_CONFIG,
+                    request_options={"timeout": LLM_TIMEOUT}
+                )
+                self._count_tokens(response)
+                return response.text
+
+            parts = []
+            response = self.model.generate_content(
+                prompt,
+                generation_config=self.GENERATION_CONFIG,
+                request_options={"timeout": LLM_TIMEOUT},
+                stream=True
+            )
+            for chunk in response:
+                try:
+                    piece = chunk.text
+                except ValueError:
+                    # chunk without text parts (e.g. only safety metadata)
+                    continue
+                if piece:
+                    parts.append(piece)
+                    on_chunk(piece)
+            self._count_tokens(response)
+            return "".join(parts)
+
+        with tracer.span("model_call", model=self.MODEL_NAME):
+            return governor.call(call, priority).strip()
+
+    def _count_tokens(self, response):
+        """Adds the response's usage metadata (when the SDK reports it) to mafai_llm_tokens_total."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        llm_tokens.inc(self.MODEL_NAME, "prompt", amount=getattr(usage, "prompt_token_count", 0) or 0)
+        llm_tokens.inc(self.MODEL_NAME, "completion", amount=getattr(usage, "candidates_token_count", 0) or 0)
+
+
+# ------------------- Offline -------------------
+
+# Short per-setting corpora for the Markov chain; the key is matched against the theme
+CORPORA = {
+    "space": [
+        "The engines hummed through the long dark shift while the crew slept in their pods.",
+        "Red warning lights blinked along the corridor and the air recyclers hissed softly.",
+        "Somewhere near the cargo bay a hatch opened and closed without a sound.",
+        "The stars outside the viewport did not move, but something inside the ship did.",
+        "The crew woke to cold coffee and a quiet that felt wrong.",
+    ],
+    "medieval": [
+        "Torches burned low along the castle walls while the guards changed watch.",
+        "Whispers moved through the great hall long after the feast had ended.",
+        "A cloaked figure crossed the courtyard under a pale moon.",
+        "The bells of the chapel rang once, though no one admitted to ringing them.",
+        "By dawn the court gathered in the hall, each noble watching the others.",
+    ],
+    "west": [
+        "The saloon piano went quiet and the wind pushed dust down the main street.",
+        "A horse stamped in the stable while the sheriff's lamp burned late.",
+        "Boots creaked on the boardwalk long after the town had gone to bed.",
+        "Coyotes howled beyond the ridge and the jail door swung in the wind.",
+        "At sunrise the townsfolk gathered outside the general store, eyeing each other.",
+    ],
+    "haunted": [
+        "Fog rolled in from the marsh and covered the village in grey.",
+        "A lantern flickered in the window of the old mill, then went out.",
+        "Dogs barked at nothing and the church gate creaked open on its own.",
+        "Footsteps crossed the square, though the snow showed no tracks.",
+        "When the sun rose the villagers met by the well, afraid to speak first.",
+    ],
+    "default": [
+        "The town fell quiet as the lights went out one by one.",
+        "A door creaked somewhere in the dark and no one went to check.",
+        "The wind carried strange sounds through the empty streets.",
+        "By morning everyone gathered in the square, watching their neighbors closely.",
+        "Shadows moved where no shadows should have been.",
+    ],
+}
+
+
+class MarkovChain:
+    """Tiny word-level Markov chain (order 1) built from a list of sentences."""
+
+    def __init__(self, sentences):
+        self.starts = []
+        self.transitions = {}
+        for sentence in sentences:
+            words = sentence.split()
+            self.starts.append(words[0])
+            for a, b in zip(words, words[1:]):
+                self.transitions.setdefault(a, []).append(b)
+
+    def sentence(self, rng, max_words=20):
+        word = rng.choice(self.starts)
+        words = [word]
+        while not word.endswith(".") and len(words) < max_words and word in self.transitions:
+            word = rng.choice(self.transitions[word])
+            words.append(word)
+        text = " ".join(words)
+        return text if text.endswith(".") else text + "."
+
+
+class OfflineNarrator(Narrator):
+    """
+    Local template + Markov narrator with no network access.
+
+    Output is seeded from the inputs, so the same inputs always give the same
+    text. Used for CI, benchmarks and load tests, and as a degradation path
+    when Gemini is not configured.
+    """
+
+    name = "offline"
+
+    def __init__(self):
+        self.chains = {key: MarkovChain(sentences) for key, sentences in CORPORA.items()}
+
+    def _setting(self, theme):
+        """Returns (setting name, Markov chain) for a theme."""
+        lowered = (theme or "").lower()
+        setting = theme.split(":")[0].strip() if theme else "the town"
+        for key, chain in self.chains.items():
+            if key in lowered:
+                return setting, chain
+        return setting, self.chains["default"]
+
+    @staticmethod
+    def _rng(*inputs):
+        seed = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).digest()
+        return random.Random(seed)
+
+    @staticmethod
+    def _emit(sentences, on_chunk):
+        if on_chunk:
+            for i, sentence in enumerate(sentences):
+                on_chunk(sentence if i == 0 else " " + sentence)
+        return " ".join(sentences)
+
+    def background_story(self, theme, priority=PRIORITY_DAY, on_chunk=None):
+        rng = self._rng("background", theme)
+        setting, chain = self._setting(theme)
+        sentences = [
+            f"Welcome, everyone, to {setting}.",
+            chain.sentence(rng),
+            rng.choice([
+                "Some of you are not who you claim to be.",
+                "A killer hides among you, wearing a friendly face.",
+                "Trust carefully, because not everyone here is innocent.",
+            ]),
+            "Good luck!",
+        ]
+        return self._emit(sentences, on_chunk)
+
+    def mafia_story(self, night_actions, special_actions, round_number, theme=None, priority=PRIORITY_DAY, on_chunk=None):
+        rng = self._rng("night", night_actions, special_actions, round_number, theme)
+        _, chain = self._setting(theme)
+        deaths = special_actions.get("deaths", [])
+        revivals = special_actions.get("revivals", [])
+
+        sentences = [f"Night {round_number} fell.", chain.sentence(rng)]
+
+        # Hint at one activity without saying who did it; it may or may not be the killer's
+        activities = [act.get("action", "").strip().rstrip(".") for act in night_actions.values()]
+        activities = [a for a in activities if a]
+        if activities:
+            hint = rng.choice(activities)
+            sentences.append(f"Someone was seen doing this in the dark: {hint[0].lower() + hint[1:]}.")
+
+        if deaths:
+            verb = "was" if len(deaths) == 1 else "were"
+            sentences.append(f"By morning, {', '.join(deaths)} {verb} found dead.")
+        else:
+            sentences.append("By morning, everyone was still alive, but no one felt safe.")
+        if revivals:
+            sentences.append(f"Somehow, {', '.join(revivals)} came back from the brink.")
+        sentences.append(rng.choice([
+            "Who was really where they said they were?",
+            "The clues are there for anyone who looks closely.",
+            "Someone in this town is lying.",
+        ]))
+        return self._emit(sentences, on_chunk)
+
+    def vote_results(self, votes_cast, eliminated_name, round_number, theme=None, priority=PRIORITY_DAY, on_chunk=None):
+        rng = self._rng("votes", sorted(votes_cast), eliminated_name, round_number, theme)
+        sentences = [f"On Day {round_number} the town gathered to vote."]
+        if eliminated_name:
+            sentences.append(f"When the votes were counted, {eliminated_name} was sent away.")
+        else:
+            sentences.append("The town could not agree, and no one was eliminated.")
+        sentences.append(rng.choice([
+            "Night is coming again.",
+            "Not everyone was happy with the result.",
+            "The real danger may still be among them.",
+        ]))
+        return self._emit(sentences, on_chunk)
+
+
+# ------------------- Selection -------------------
+
+_narrator = None
+_narrator_lock = threading.Lock()
+
+
+def get_narrator():
+    """
+    Returns the process-wide narrator, creating it on first use.
+
+    MAFAI_NARRATOR picks the backend: "gemini", "offline", or "auto" (the
+    default: Gemini when GEMINI_API_KEY is set, offline otherwise).
+    """
+    global _narrator
+    if _narrator is not None:
+        return _narrator
+
+    with _narrator_lock:
+        if _narrator is None:
+            from dotenv import load_dotenv
+            load_dotenv()
+
+            choice = os.getenv("MAFAI_NARRATOR", "auto").lower()
+            api_key = os.getenv("GEMINI_API_KEY")
+            if choice == "gemini":
+                if not api_key:
+                    raise ValueError("GEMINI_API_KEY not found in .env")
+                _narrator = GeminiNarrator(api_key)
+            elif choice == "offline" or not api_key:
+                if choice != "offline":
+                    print("GEMINI_API_KEY not set, using the offline narrator")
+                _narrator = OfflineNarrator()
+            else:
+                _narrator = GeminiNarrator(api_key)
+    return _narrator
+
+
+def set_narrator(narrator):
+    """Swaps the narrator (e.g. OfflineNarrator() in tests and benchmarks)."""
+    global _narrator
+    with _narrator_lock:
+        _narrator = narrator
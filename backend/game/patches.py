@@ -0,0 +1,75 @@
+"""
+Compact patches between two versions of MafiaGame.get_state().
+
+A patch is a list of ops applied in order:
+    {"op": "set", "path": [...], "value": ...}      set a (possibly nested) key or list index
+    {"op": "del", "path": [...]}                    remove a key
+    {"op": "append", "path": ["story_log"], "value": entry}
+
+story_log is treated as append-only (plus explicitly dirtied indexes), so the
+cost of a diff depends on what changed, not on how long the game has run.
+"""
+
+LOG_KEY = "story_log"
+
+
+def snapshot_for_diff(state):
+    """
+    Copies get_state() output deep enough that later in-place mutations of the
+    game don't leak into it. story_log is kept as its current length only.
+    """
+    shadow = {}
+    for key, value in state.items():
+        if key == LOG_KEY:
+            shadow[key] = len(value)
+        elif isinstance(value, dict):
+            shadow[key] = {k: dict(v) if isinstance(v, dict) else v for k, v in value.items()}
+        else:
+            shadow[key] = value
+    return shadow
+
+
+def _diff_dict(old, new, path, ops):
+    for key, value in new.items():
+        if key not in old:
+            ops.append({"op": "set", "path": path + [key], "value": value})
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            _diff_dict(old[key], value, path + [key], ops)
+        elif old[key] != value:
+            ops.append({"op": "set", "path": path + [key], "value": value})
+    for key in old:
+        if key not in new:
+            ops.append({"op": "del", "path": path + [key]})
+
+
+def diff_state(old_shadow, new_state, log_dirty=()):
+    """Returns the ops that turn the state old_shadow was taken from into new_state."""
+    ops = []
+    old_log_len = old_shadow.get(LOG_KEY, 0) if old_shadow else 0
+    old = {k: v for k, v in (old_shadow or {}).items() if k != LOG_KEY}
+    new = {k: v for k, v in new_state.items() if k != LOG_KEY}
+    _diff_dict(old, new, [], ops)
+
+    log = new_state.get(LOG_KEY, [])
+    for index in sorted(log_dirty):
+        if index < old_log_len:
+            ops.append({"op": "set", "path": [LOG_KEY, index], "value": log[index]})
+    for entry in log[old_log_len:]:
+        ops.append({"op": "append", "path": [LOG_KEY], "value": entry})
+    return ops
+
+
+def apply_patch(state, ops):
+    """Applies ops to a state dict in place (reference implementation for clients)."""
+    for op in ops:
+        *parents, last = op["path"]
+        target = state
+        for key in parents:
+            target = target[key]
+        if op["op"] == "set":
+            target[last] = op["value"]
+        elif op["op"] == "del":
+            target.pop(last, None)
+        elif op["op"] == "append":
+            target[last].append(op["value"])
+    return state
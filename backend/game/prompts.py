@@ -0,0 +1,79 @@
+def background_prompt(theme: str):
+    """Builds the Gemini prompt for the intro story."""
+    prompt = f"""Given the {theme}:
+                - briefly and explicitly welcome the players
+                - write a background narrative for a Mafia game
+                - keep it engaging, but don't use too many adjectives or any complicated vocabulary
+                - briefly and explicitly wish the players good luck
+                - keep it concise (2-3 sentences)"""
+    return prompt
+
+
+def mafia_story_prompt(night_actions: dict, special_actions: dict, round_number: int, theme: str = None):
+    """Builds the Gemini prompt for the day story (see generate_mafia_story for the arguments)."""
+    theme_text = f"Theme: {theme}.\n" if theme else ""
+
+    # Build a readable description of night actions
+    actions_text = ""
+    for player, act in night_actions.items():
+        role = act.get("role", "unknown")
+        action = act.get("action", "")
+        actions_text += f"- {role} {player} performed {action}\n"
+
+    # Include deaths and revivals
+    deaths = special_actions.get("deaths", [])
+    revivals = special_actions.get("revivals", [])
+    special_text = ""
+    if deaths:
+        special_text += "Deaths occurred: " + ", ".join(deaths) + ".\n"
+    if revivals:
+        special_text += "Players revived: " + ", ".join(revivals) + ".\n"
+
+    prompt = f"""
+        You are a creative storyteller narrating a Mafia game.
+        {theme_text}
+        It was Night {round_number}. Players performed the following actions:
+        {actions_text}
+        {special_text}
+        Write a narrative that:
+        - Story should not reveal the exact roles and names of the players when describing actions
+        - The story should not hint at the roles of players who are still alive
+        - The only players mentioned by name should be those who died or were revived
+        - If there was a revival, the doctor's action should not be mentioned. Just briefly mention the revival in the story.
+        - Summarizes the night in an engaging way without complicating the story 
+        - If there are deaths, describe them and include a hint about what the murderer was doing during their nighttime actions, but add one or two subtle random twists to mislead players (i.e. hint at another player's action)
+        - Leaves hints for alive players to discuss during the day
+        - Mentions deaths if any, but keeps suspense
+        - Don't use overly complicated vocabulary or too much adjectives, but keep it suspenseful
+        Return the story in one paragraph maximum suitable for all players.
+    """
+    return prompt
+
+
+def vote_results_prompt(votes_cast: list, eliminated_name: str, round_number: int, theme: str = None):
+    """
+    Builds the Gemini prompt for the voting summary.
+
+    Args:
+        votes_cast: Lines like "Alice voted against Bob" or "Carol chose to skip voting"
+        eliminated_name: Name of the player voted out, or None
+    """
+    theme_text = f"Theme: {theme}.\n" if theme else ""
+    votes_text = "\n".join(f"- {line}" for line in votes_cast)
+
+    prompt = f"""
+        You are narrating the Mafia game's daytime events.
+        {theme_text}
+        It was Day {round_number}. The town gathered to vote.
+        Voting summary:
+        {votes_text}
+        Outcome: {"No elimination" if not eliminated_name else f"{eliminated_name} was voted out"}.
+
+        Write a short narrative that:
+        - Describe the voting outcome very briefly and don't add extra, unnecessary details
+        - Does NOT mention any player roles
+        - Only mention names of players who were eliminated (if any) but do not mention their roles at all 
+        - Keep it concise and suspenseful, no more than 3 sentences
+        - Keep vocabulary simple, avoid excessive adjectives
+    """
+    return prompt
@@ -0,0 +1,133 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from .archive import game_archive
+from .mailbox import mailboxes
+from .state_machine import GameState
+from .timers import timer_wheel
+
+REAPER_INTERVAL = float(os.getenv("MAFAI_REAPER_INTERVAL", 60))     # seconds between sweeps
+ENDED_GAME_TTL = float(os.getenv("MAFAI_ENDED_GAME_TTL", 600))      # finished games
+LOBBY_TTL = float(os.getenv("MAFAI_LOBBY_TTL", 1800))               # lobbies that never started
+IDLE_GAME_TTL = float(os.getenv("MAFAI_IDLE_GAME_TTL", 3600))       # games nobody plays any more
+
+
+def approx_size(obj, _seen=None):
+    """Rough number of bytes obj and everything it references take in memory."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, _seen) + approx_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(approx_size(item, _seen) for item in obj)
+    elif hasattr(obj, "__dict__") and not callable(obj):
+        size += approx_size(vars(obj), _seen)
+    elif hasattr(obj, "__slots__"):
+        size += sum(approx_size(getattr(obj, name), _seen)
+                    for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+class GameReaper:
+    """
+    Frees games nobody is using any more.
+
+    Every interval it looks at how long each game has gone without activity
+    (MafiaGame.last_active, moved forward by every event except narration
+    and phases ending on their timer). Finished games are archived (see game/archive.py)
+    and dropped after ended_ttl, lobbies after lobby_ttl, and any other game
+    after idle_ttl. The store deletes the game, and on_evict(game) lets the
+    socket layer drop its sessions and rooms. Each eviction runs on the
+    game's mailbox, so it never races a command for the same game.
+    """
+
+    def __init__(self, archive=game_archive, interval=REAPER_INTERVAL,
+                 ended_ttl=ENDED_GAME_TTL, lobby_ttl=LOBBY_TTL, idle_ttl=IDLE_GAME_TTL):
+        self.archive = archive
+        self.interval = interval
+        self.ttls = {"ended": ended_ttl, "lobby": lobby_ttl, "idle": idle_ttl}
+        self.games = None
+        self.on_evict = None
+        self._lock = threading.Lock()
+        self._counts = {
+            "sweeps": 0, "evicted_ended": 0, "evicted_lobby": 0, "evicted_idle": 0,
+            "archived": 0, "archive_failures": 0, "reclaimed_bytes": 0, "archived_bytes": 0,
+        }
+
+    def start(self, games, on_evict=None):
+        """Starts sweeping a GameStore every interval seconds."""
+        self.games = games
+        self.on_evict = on_evict
+        if self.interval > 0:
+            timer_wheel.schedule("reaper", self.interval, self._tick)
+
+    def _tick(self):
+        try:
+            self.sweep()
+        finally:
+            timer_wheel.schedule("reaper", self.interval, self._tick)
+
+    def _kind(self, game):
+        if game.state == GameState.END:
+            return "ended"
+        if game.state == GameState.LOBBY:
+            return "lobby"
+        return "idle"
+
+    def _expired(self, game, now):
+        return now - game.last_active > self.ttls[self._kind(game)]
+
+    def sweep(self):
+        """Queues an eviction for every game past its TTL; returns how many."""
+        now = time.monotonic()
+        expired = [game for game in self.games.values() if self._expired(game, now)]
+        for game in expired:
+            mailboxes.submit(game.id, self._evict, game)
+        with self._lock:
+            self._counts["sweeps"] += 1
+        return len(expired)
+
+    def _evict(self, game):
+        # Something may have happened to the game while this was queued
+        if self.games.get(game.id) is not game or not self._expired(game, time.monotonic()):
+            return
+
+        kind = self._kind(game)
+        size = approx_size(game)
+        archived_bytes = 0
+        if kind == "ended":
+            try:
+                archived_bytes = self.archive.put(game)
+            except Exception as e:
+                # Keep the game in memory rather than lose it; the next sweep retries
+                print(f"Could not archive game {game.id}: {e}")
+                with self._lock:
+                    self._counts["archive_failures"] += 1
+                return
+
+        del self.games[game.id]
+        if self.on_evict:
+            self.on_evict(game)
+
+        with self._lock:
+            self._counts["evicted_" + kind] += 1
+            self._counts["reclaimed_bytes"] += size
+            if archived_bytes:
+                self._counts["archived"] += 1
+                self._counts["archived_bytes"] += archived_bytes
+        archived = f", archived in {archived_bytes}" if archived_bytes else ""
+        print(f"Reaped {kind} game {game.id} (~{size} bytes{archived})")
+
+    def stats(self):
+        with self._lock:
+            return {"interval": self.interval, "ttls": self.ttls, **self._counts}
+
+
+reaper = GameReaper()
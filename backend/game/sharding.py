@@ -0,0 +1,74 @@
+import hmac
+import os
+import uuid
+import zlib
+
+WORKER_COUNT = int(os.getenv("MAFAI_WORKERS", 1))
+WORKER_INDEX = int(os.getenv("MAFAI_WORKER_INDEX", 0))
+# Base URL of every worker in index order, e.g. "http://127.0.0.1:5001,http://127.0.0.1:5002"
+WORKER_URLS = [url.rstrip("/") for url in os.getenv("MAFAI_WORKER_URLS", "").split(",") if url]
+INTERNAL_TOKEN = os.getenv("MAFAI_INTERNAL_TOKEN", "")
+FORWARD_TIMEOUT = float(os.getenv("MAFAI_FORWARD_TIMEOUT", 10))
+
+# Set on requests one worker sends another, so they are never forwarded twice
+FORWARDED_HEADER = "X-MafAI-Forwarded"
+
+# event name -> handler(data, sid); filled in by sockets.init_socketio()
+socket_handlers = {}
+
+
+def sharded():
+    return WORKER_COUNT > 1
+
+
+def owner_of(game_id):
+    """Index of the worker that owns a game (stable across restarts)."""
+    return zlib.crc32(game_id.encode("utf-8")) % WORKER_COUNT
+
+
+def is_local(game_id):
+    """True if this worker owns game_id (or there is nothing to route on)."""
+    return not sharded() or not game_id or owner_of(game_id) == WORKER_INDEX
+
+
+def new_game_id():
+    """Returns a fresh game id that hashes to this worker."""
+    while True:
+        game_id = str(uuid.uuid4())[:6]
+        if is_local(game_id):
+            return game_id
+
+
+def owner_url(game_id):
+    index = owner_of(game_id)
+    if index >= len(WORKER_URLS):
+        raise Exception(f"No URL configured for worker {index} (MAFAI_WORKER_URLS)")
+    return WORKER_URLS[index]
+
+
+def forward(game_id, method, path, json=None, params=None):
+    """Sends an HTTP request to the game's owner; returns the requests.Response."""
+    import requests
+
+    return requests.request(
+        method,
+        owner_url(game_id) + path,
+        json=json,
+        params=params,
+        headers={FORWARDED_HEADER: "1", "X-MafAI-Internal": INTERNAL_TOKEN},
+        timeout=FORWARD_TIMEOUT,
+    )
+
+
+def forward_socket_event(event, data, sid):
+    """Runs a socket event's handler on the owner of data["game_id"]."""
+    response = forward(data["game_id"], "POST", f"/api/internal/socket/{event}", json={"data": data, "sid": sid})
+    if response.status_code != 200:
+        raise Exception(f"Worker {owner_of(data['game_id'])} failed to handle {event}: {response.status_code}")
+
+
+def is_internal_request(headers):
+    """True if another worker sent the request. Always False without MAFAI_INTERNAL_TOKEN."""
+    if not INTERNAL_TOKEN or headers.get(FORWARDED_HEADER) != "1":
+        return False
+    return hmac.compare_digest(headers.get("X-MafAI-Internal", "").encode("utf-8"), INTERNAL_TOKEN.encode("utf-8"))
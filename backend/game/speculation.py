@@ -0,0 +1,105 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .ai import generate_mafia_story
+from .governor import PRIORITY_SPECULATIVE
+
+SPECULATIVE_NIGHT = os.getenv("MAFAI_SPECULATIVE_NIGHT", "1") == "1"
+SPECULATION_MAX_CANDIDATES = int(os.getenv("MAFAI_SPECULATION_MAX_CANDIDATES", 3))
+SPECULATION_WORKERS = int(os.getenv("MAFAI_SPECULATION_WORKERS", 2))
+
+
+class NightSpeculator:
+    """
+    Writes candidate day stories before the last night action arrives.
+
+    Once only one required actor is pending, each outcome the night can still
+    end with (e.g. "target killed" vs. "target saved") gets its own story.
+    When the night resolves, the candidate matching the real deaths is claimed
+    and the others are cancelled. Candidates are written from the actions known
+    at the time, so the last actor's activity text is not in the prompt.
+    """
+
+    def __init__(self, generate, enabled=SPECULATIVE_NIGHT,
+                 max_candidates=SPECULATION_MAX_CANDIDATES, workers=SPECULATION_WORKERS):
+        self.generate = generate
+        self.enabled = enabled
+        self.max_candidates = max_candidates
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speculation")
+        self._lock = threading.Lock()
+        self._games = {}  # game_id -> {"signature": ..., "round": int, "candidates": {deaths: Future}}
+        self._counts = {"rounds": 0, "candidates": 0, "hits": 0, "misses": 0, "cancelled": 0}
+
+    @staticmethod
+    def _signature(game):
+        actions = tuple(sorted((pid, act["type"], act["target"]) for pid, act in game.pending_actions.items()))
+        return game.round, actions
+
+    def maybe_start(self, game):
+        """Starts candidate stories if the game has exactly one night actor left."""
+        if not self.enabled:
+            return
+
+        outcomes = game.possible_night_deaths(self.max_candidates)
+        if not outcomes:
+            return
+
+        signature = self._signature(game)
+        with self._lock:
+            current = self._games.get(game.id)
+            if current and current["signature"] == signature:
+                return
+            if current:
+                # An action changed since we speculated; those candidates are stale
+                self._cancel(current["candidates"].values())
+
+            night_activities = game.night_activities()
+            candidates = {}
+            for deaths in outcomes:
+                special_actions = {"deaths": deaths, "revivals": []}
+                candidates[tuple(sorted(deaths))] = self._executor.submit(
+                    self.generate, night_activities, special_actions, game.round, game.theme,
+                    priority=PRIORITY_SPECULATIVE,
+                )
+            self._games[game.id] = {"signature": signature, "round": game.round, "candidates": candidates}
+            self._counts["rounds"] += 1
+            self._counts["candidates"] += len(candidates)
+
+        print(f"Speculating {len(outcomes)} night stories for game {game.id}, round {game.round}")
+
+    def claim(self, game_id, round_number, special_actions):
+        """
+        Returns the Future of the candidate matching the real outcome (or None)
+        and cancels every other candidate for the game.
+        """
+        with self._lock:
+            current = self._games.pop(game_id, None)
+            if not current:
+                return None
+
+            candidates = current["candidates"]
+            match = None
+            if current["round"] == round_number and not special_actions.get("revivals"):
+                match = candidates.pop(tuple(sorted(special_actions.get("deaths", []))), None)
+            self._cancel(candidates.values())
+            self._counts["hits" if match else "misses"] += 1
+            return match
+
+    def discard(self, game_id):
+        with self._lock:
+            current = self._games.pop(game_id, None)
+            if current:
+                self._cancel(current["candidates"].values())
+
+    def _cancel(self, futures):
+        """Cancels candidates that haven't started; running ones finish and are dropped."""
+        for future in futures:
+            if future.cancel():
+                self._counts["cancelled"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"enabled": self.enabled, "pending_games": len(self._games), **self._counts}
+
+
+speculator = NightSpeculator(generate_mafia_story)
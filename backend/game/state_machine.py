@@ -1,7 +1,22 @@
 from enum import Enum, auto
+from collections import deque
+import json
+import os
 import uuid
 import random, time
-from .ai import generate_mafia_story, generate_background_story, generate_vote_results
+from .ai import (generate_mafia_story, generate_background_story, generate_vote_results,
+                 fallback_background_story, fallback_mafia_story, fallback_vote_results)
+from .story_pool import story_pool
+from .patches import snapshot_for_diff, diff_state
+from .model import Player
+from .tally import VoteTally
+from .tracing import traced
+
+PATCH_HISTORY = int(os.getenv("MAFAI_PATCH_HISTORY", 64))
+SNAPSHOT_EVERY = int(os.getenv("MAFAI_SNAPSHOT_EVERY", 50))  # events between compact snapshots
+NIGHT_ROLES = ("mafia", "doctor", "detective")
+# Narration recorded after the fact; it comes back on its own, so it is not activity
+NARRATION_EVENT_TYPES = frozenset({"background_story", "day_story", "vote_story"})
 
 THEMES = [
     "Space Crew vs. Aliens: A spaceship floating in deep space...",
@@ -21,14 +36,143 @@ class GameState(Enum):
 
 
 class MafiaGame:
-    def __init__(self, host_player, theme=None):
+    """
+    One game, kept as an event-sourced state machine.
+
+    Public methods validate the request, make any random choice (role shuffle,
+    tie-breaks) and then call apply() with an event describing what happened.
+    Reducers (_apply_<type>) are the only code that changes game state, so a
+    game can be rebuilt exactly from a snapshot plus the events after it; see
+    restore().
+    """
+
+    def __init__(self, host_player, theme=None, game_id=None):
         """Initializes a new Mafia game instance."""
-        self.id = str(uuid.uuid4())[:6]
-        self.state = GameState.LOBBY
-        self.host_id = host_player.get_info()['player_id']
-        self.theme = theme or random.choice(THEMES)
+        self._init_runtime()
+        self.apply({
+            "type": "game_created",
+            "game_id": game_id or str(uuid.uuid4())[:6],
+            "theme": theme or random.choice(THEMES),
+            "host_id": host_player.get_info()['player_id'],
+        })
+        self.add_player(host_player)
 
+    def _init_runtime(self):
+        """State that is not part of the game itself and is never replayed."""
+        # Event sourcing: events applied since the last snapshot
+        self.seq = 0
+        self.events = []
+        self.snapshot = None      # (seq, JSON text) taken every SNAPSHOT_EVERY events
+        self.listener = None      # called as listener(game, seq, event) after each event
+        self.last_active = time.monotonic()  # moved by every event but narration; the reaper frees idle games
+
+        # Versioned state: commit_state() turns changes into patches for clients
+        self.version = 0
+        self._patches = deque(maxlen=PATCH_HISTORY)
+        self._published = None
+        self._log_dirty = set()
+        self._views = {}          # (viewer_id, part) -> JSON text for self._views_version
+        self._views_version = 0
+
+    # ------------------- Events, Snapshots & Replay -------------------
+
+    def apply(self, event):
+        """Applies one event, records it, and snapshots the game every SNAPSHOT_EVERY events."""
+        getattr(self, "_apply_" + event["type"])(event)
+        self.seq += 1
+        if event["type"] not in NARRATION_EVENT_TYPES:
+            self.last_active = time.monotonic()
+        self.events.append(event)
+        if self.listener:
+            self.listener(self, self.seq, event)
+        if len(self.events) >= SNAPSHOT_EVERY:
+            self.take_snapshot()
+
+    def take_snapshot(self):
+        """Stores a compact snapshot of the game and drops the events it covers."""
+        self.snapshot = (self.seq, json.dumps(self.to_snapshot(), separators=(",", ":")))
+        self.events = []
+        return self.snapshot
+
+    def to_snapshot(self):
+        """Returns the game as plain JSON-ready data (everything restore() needs)."""
+        return {
+            "seq": self.seq,
+            "id": self.id,
+            "state": self.state.name,
+            "host_id": self.host_id,
+            "theme": self.theme,
+            "round": self.round,
+            "settings": self.settings,
+            "players": {
+                pid: [p.name, p.role, p.is_alive, p.ready, p.eliminated_in_round]
+                for pid, p in self.players.items()
+            },
+            "story_log": self.story_log,
+            "pending_actions": self.pending_actions,
+            "detective_results": self.detective_results,
+            "votes": self.votes,
+            "players_continued": sorted(self.players_continued),
+            "last_night_activities": getattr(self, "_last_night_activities", {}),
+            "last_special_actions": getattr(self, "_last_special_actions", None),
+            "last_vote_summary": getattr(self, "_last_vote_summary", None),
+            "last_vote_index": getattr(self, "_last_vote_index", None),
+        }
+
+    def _load_snapshot(self, snapshot):
+        data = json.loads(snapshot)
+        self.seq = data["seq"]
+        self.id = data["id"]
+        self.state = GameState[data["state"]]
+        self.host_id = data["host_id"]
+        self.theme = data["theme"]
+        self.round = data["round"]
+        self.settings = data["settings"]
         self.players = {}
+        for pid, (name, role, alive, ready, eliminated_in_round) in data["players"].items():
+            player = Player(name, pid)
+            player.role, player.is_alive, player.ready = role, alive, ready
+            player.eliminated_in_round = eliminated_in_round
+            self.players[pid] = player
+        self._reindex()
+        self.story_log = data["story_log"]
+        self.pending_actions = data["pending_actions"]
+        self.detective_results = data["detective_results"]
+        self.tally = VoteTally(data["votes"])
+        self.players_continued = set(data["players_continued"])
+        self._last_night_activities = data["last_night_activities"]
+        self._last_special_actions = data["last_special_actions"]
+        self._last_vote_summary = data["last_vote_summary"]
+        self._last_vote_index = data["last_vote_index"]
+
+    @classmethod
+    def restore(cls, snapshot=None, events=()):
+        """
+        Rebuilds a game from a snapshot (the JSON text of take_snapshot()) and
+        the events applied after it. Without a snapshot, events must start
+        with the game's game_created event.
+        """
+        game = cls.__new__(cls)
+        game._init_runtime()
+        if snapshot:
+            game._load_snapshot(snapshot)
+            game.snapshot = (game.seq, snapshot)
+        for event in events:
+            game.apply(event)
+        return game
+
+    def history(self):
+        """Returns (snapshot, events since it); restore(*game.history()) forks the game."""
+        return (self.snapshot[1] if self.snapshot else None), list(self.events)
+
+    def _apply_game_created(self, event):
+        self.id = event["game_id"]
+        self.state = GameState.LOBBY
+        self.host_id = event["host_id"]
+        self.theme = event["theme"]
+
+        self.players = {}         # player_id -> Player
+        self._reindex()
         self.story_log = []
         self.round = 0
 
@@ -44,33 +188,43 @@ class MafiaGame:
         
         self.pending_actions = {}
         self.detective_results = {}
-
-        self.add_player(host_player)
+        self.tally = VoteTally()  # this day's votes, counted as they come in
+        self.players_continued = set()  # players who clicked continue on the current narration
 
     # ------------------- Game Setup & Player Management -------------------
 
+    @traced
     def add_player(self, player):
         """Adds a player to the game lobby."""
         if self.state != GameState.LOBBY:
             raise Exception("Game already started")
         info = player.get_info()
-        self.players[info["player_id"]] = {
-            "player_obj": player,
-            "name": info["name"],
-            "role": info["role"],
-            "alive": info["is_alive"]
-        }
+        self.apply({"type": "player_joined", "player_id": info["player_id"], "name": info["name"]})
+
+    def _apply_player_joined(self, event):
+        player = Player(event["name"], event["player_id"])
+        self.players[player.player_id] = player
+        self._index(player)
+
+    def set_ready(self, player_id, ready=True):
+        """Marks a player as ready (or not) in the lobby."""
+        if player_id not in self.players:
+            raise Exception("Player not found")
+        self.apply({"type": "player_ready", "player_id": player_id, "ready": bool(ready)})
+
+    def _apply_player_ready(self, event):
+        self.players[event["player_id"]].set_ready(event["ready"])
 
     def _serializable_players(self):
         """Returns a serializable version of players info for JSON responses."""
         return {
             pid: {
-                "name": info["name"],
-                "role": info["role"],    # frontend should hide role from non-owners
-                "alive": info["alive"],
-                "ready": info["player_obj"].ready
+                "name": p.name,
+                "role": p.role,    # get_view() hides it from non-owners
+                "alive": p.is_alive,
+                "ready": p.ready
             }
-            for pid, info in self.players.items()
+            for pid, p in self.players.items()
         }
 
     def get_state(self):
@@ -88,6 +242,104 @@ class MafiaGame:
             "detective_results": self.detective_results,
         }
 
+    # ------------------- Client Views -------------------
+
+    def _role_visible(self, pid, viewer_id):
+        """True if viewer_id (None for spectators) may see pid's role."""
+        if self.state == GameState.END or pid == viewer_id:
+            return True
+        viewer = self.players.get(viewer_id)
+        return bool(viewer) and viewer.role == "mafia" and self.players[pid].role == "mafia"
+
+    def get_view(self, viewer_id=None):
+        """
+        Returns get_state() reduced to what viewer_id may see.
+
+        Roles are hidden except the viewer's own (mafia also see each other, and
+        everyone sees all roles once the game is over), detective results and
+        detective story log entries only go to the detective they belong to.
+        viewer_id=None gives the spectator view.
+        """
+        state = self.get_state()
+        for pid, info in state["players"].items():
+            if not self._role_visible(pid, viewer_id):
+                info["role"] = None
+
+        result = self.detective_results.get(viewer_id)
+        state["detective_results"] = {viewer_id: result} if result else {}
+        state["story_log"] = [
+            {"event": "The detective investigated someone."}
+            if "result_for" in entry and entry["result_for"] != viewer_id else entry
+            for entry in self.story_log
+        ]
+        return state
+
+    def private_view(self, player_id):
+        """What player_id sees on top of the spectator view."""
+        player = self.players.get(player_id)
+        if not player:
+            return {}
+        teammates = []
+        if player.role == "mafia":
+            teammates = [pid for pid in self.alive_by_role("mafia") if pid != player_id]
+        return {
+            "player_id": player_id,
+            "role": player.role,
+            "teammates": teammates,
+            "detective_result": self.detective_results.get(player_id),
+        }
+
+    def view_json(self, viewer_id=None, part="state"):
+        """
+        Returns get_view(viewer_id) encoded as JSON ("state"), or only its player
+        list in the [{..., "player_id"}] form the lobby events use ("players").
+
+        Each view is encoded once per version, so callers commit_state() first
+        to make sure the cached text matches the game.
+        """
+        if self._views_version != self.version:
+            self._views = {}
+            self._views_version = self.version
+
+        key = (viewer_id, part)
+        text = self._views.get(key)
+        if text is None:
+            view = self.get_view(viewer_id)
+            if part == "players":
+                view = [{**v, "player_id": k} for k, v in view["players"].items()]
+            text = self._views[key] = json.dumps(view, separators=(",", ":"))
+        return text
+
+    @traced
+    def commit_state(self):
+        """
+        Publishes everything that changed since the last commit as a new version.
+
+        Patches are taken from the spectator view; what only one player may see
+        comes from private_view(). Returns the patch {"from_version",
+        "to_version", "ops"}, or None if nothing changed.
+        """
+        state = self.get_view()
+        ops = diff_state(self._published, state, self._log_dirty)
+        if not ops:
+            return None
+
+        self._published = snapshot_for_diff(state)
+        self._log_dirty = set()
+        self.version += 1
+        patch = {"game_id": self.id, "from_version": self.version - 1, "to_version": self.version, "ops": ops}
+        self._patches.append(patch)
+        return patch
+
+    def patches_since(self, version):
+        """Returns the patches after version, or None if they are no longer kept."""
+        if version == self.version:
+            return []
+        patches = [p for p in self._patches if p["from_version"] >= version]
+        if not patches or patches[0]["from_version"] != version:
+            return None
+        return patches
+
     def update_settings(self, host_id, new_settings):
         if host_id != self.host_id:
             raise Exception("Only host can change settings")
@@ -109,9 +361,13 @@ class MafiaGame:
             if not isinstance(new_settings["night_duration"], int) or new_settings["night_duration"] <= 0:
                 raise ValueError("night_duration must be a positive integer")
 
-        self.settings.update(new_settings)
+        self.apply({"type": "settings_updated", "settings": dict(new_settings)})
         return self.settings
 
+    def _apply_settings_updated(self, event):
+        self.settings.update(event["settings"])
+
+    @traced
     def assign_roles(self):
         """Randomly assigns roles to players based on current settings."""
         pids = list(self.players.keys())
@@ -128,35 +384,94 @@ class MafiaGame:
 
         random.shuffle(roles)
 
-        for pid, role in zip(pids, roles):
-            self.players[pid]["player_obj"].assign_role(role)
-            self.players[pid]["role"] = role
+        self.apply({"type": "roles_assigned", "roles": dict(zip(pids, roles))})
+        return self._serializable_players()
+
+    def _apply_roles_assigned(self, event):
+        for pid, role in event["roles"].items():
+            player = self.players[pid]
+            self._unindex(player)
+            player.assign_role(role)
+            self._index(player)
 
         self.state = GameState.ROLE_ASSIGNMENT
-        self.story_log.append({"event": "Roles assigned.", "roles_count": self.settings})
-        return self._serializable_players()
+        self.story_log.append({"event": "Roles assigned.", "roles_count": dict(self.settings)})
+
+    @traced
+    def start_game(self, narrate=True):
+        """
+        Allow starting from LOBBY or ROLE_ASSIGNMENT states.
 
-    def start_game(self):
-        """Allow starting from LOBBY or ROLE_ASSIGNMENT states."""
+        With narrate=False the intro is left to the caller (e.g. the narration
+        pipeline), which records it later via record_background_story().
+        """
         if self.state not in (GameState.LOBBY, GameState.ROLE_ASSIGNMENT):
             raise Exception("Game already started")
 
-        self.state = GameState.NIGHT
-        self.round = 1
+        self.apply({"type": "game_started"})
 
         # Generate intro narrative
-        background = generate_background_story(self.theme)
-        self.story_log.append({"event": "Game Start", "story": background})
+        background = None
+        if narrate:
+            background = story_pool.take(self.theme) or generate_background_story(self.theme, self.id)
+            self.record_background_story(background)
 
         return {"background_story": background}
 
+    def _apply_game_started(self, event):
+        self.state = GameState.NIGHT
+        self.round = 1
+
+    def record_background_story(self, story):
+        """Saves the intro narrative in the story log."""
+        self.apply({"type": "background_story", "story": story})
+
+    def _apply_background_story(self, event):
+        self.story_log.append({"event": "Game Start", "story": event["story"]})
+
+    def fallback_background_story(self):
+        return fallback_background_story(self.theme)
+
+    # ------------------- Player Indexes -------------------
+    # Kept up to date by the reducers so that lookups don't scan every player.
+    # Dicts (player_id -> Player) are used as sets that keep join order.
+
+    def _reindex(self):
+        self._alive = {}
+        self._alive_by_role = {}  # role -> {player_id: Player}, alive players only
+        for player in self.players.values():
+            self._index(player)
+
+    def _index(self, player):
+        if player.is_alive:
+            self._alive[player.player_id] = player
+            self._alive_by_role.setdefault(player.role, {})[player.player_id] = player
+
+    def _unindex(self, player):
+        self._alive.pop(player.player_id, None)
+        self._alive_by_role.get(player.role, {}).pop(player.player_id, None)
+
+    def _kill(self, player):
+        self._unindex(player)
+        player.eliminate()
+
+    def is_alive(self, player_id):
+        """True if player_id is in the game and alive."""
+        return isinstance(player_id, str) and player_id in self._alive
+
+    def alive_count(self, role=None):
+        """Number of alive players, or of alive players with role."""
+        if role is None:
+            return len(self._alive)
+        return len(self._alive_by_role.get(role, ()))
+
     def alive_players(self):
         """Returns a list of player IDs who are currently alive."""
-        return [pid for pid, info in self.players.items() if info["alive"]]
+        return list(self._alive)
 
     def alive_by_role(self, role):
         """Returns a list of alive player IDs with the specified role."""
-        return [pid for pid, info in self.players.items() if info["alive"] and info["role"] == role]
+        return list(self._alive_by_role.get(role, ()))
     
     def remove_player(self, player_id):
         """Removes a player from the game (only allowed in LOBBY state)."""
@@ -164,39 +479,61 @@ class MafiaGame:
             raise Exception("Players can only leave during lobby phase")
         
         if player_id in self.players:
-            player_name = self.players[player_id]["name"]
-            del self.players[player_id]
-            self.story_log.append({"event": f"{player_name} left the game"})
-            
-            # If the host leaves, transfer host to another player or end game
-            if player_id == self.host_id and self.players:
-                new_host_id = next(iter(self.players.keys()))
-                self.host_id = new_host_id
-                self.story_log.append({"event": f"{self.players[new_host_id]['name']} is now the host"})
-            elif player_id == self.host_id:
-                # No players left, game should be cleaned up
-                pass
-                
+            self.apply({"type": "player_left", "player_id": player_id})
             return True
         return False
+
+    def _apply_player_left(self, event):
+        player_id = event["player_id"]
+        player_name = self.players[player_id].name
+        self._unindex(self.players.pop(player_id))
+        self.players_continued.discard(player_id)
+        self.story_log.append({"event": f"{player_name} left the game"})
+
+        # If the host leaves, transfer host to another player or end game
+        if player_id == self.host_id and self.players:
+            new_host_id = next(iter(self.players.keys()))
+            self.host_id = new_host_id
+            self.story_log.append({"event": f"{self.players[new_host_id].name} is now the host"})
+        elif player_id == self.host_id:
+            # No players left, game should be cleaned up
+            pass
+
+    def record_continue(self, player_id):
+        """Notes that a player clicked continue on the current narration."""
+        self.apply({"type": "player_continued", "player_id": player_id})
+
+    def _apply_player_continued(self, event):
+        self.players_continued.add(event["player_id"])
+
+    def reset_continues(self):
+        self.apply({"type": "continues_reset"})
+
+    def _apply_continues_reset(self, event):
+        self.players_continued = set()
     
     # ------------------- Night Phase -------------------
 
+    @traced
     def start_night(self):
         """Transitions the game to the NIGHT phase."""
+        self.apply({"type": "night_started"})
+
+    def _apply_night_started(self, event):
         self.state = GameState.NIGHT
         self.round += 1
         self.pending_actions = {}
         self.story_log.append({"event": f"Night {self.round} begins."})
 
+    @traced
     def record_action(self, player_id, action):
         """Records a player's night action."""
         if self.state != GameState.NIGHT:
             raise Exception("Not in NIGHT phase")
-        if player_id not in self.players or not self.players[player_id]["alive"]:
+        if not self.is_alive(player_id):
             raise Exception("Player not found or not alive")
 
-        role = self.players[player_id]["role"]
+        role = self.players[player_id].role
         atype = action.get("type")
         if role == "mafia" and atype != "kill":
             raise Exception("Mafia must send kill action")
@@ -211,64 +548,121 @@ class MafiaGame:
         if target not in self.players:
             raise Exception("Invalid action target")
 
-        self.pending_actions[player_id] = {
-            "type": atype,
-            "target": target,
-            "activity": action.get("activity", "")
-        }
-
+        self.apply({
+            "type": "action_recorded",
+            "player_id": player_id,
+            "action": {"type": atype, "target": target, "activity": action.get("activity", "")},
+        })
         return True
 
+    def _apply_action_recorded(self, event):
+        self.pending_actions[event["player_id"]] = dict(event["action"])
+
+    def pending_night_actors(self):
+        """Returns the IDs of alive players whose night action is still missing."""
+        needed = {pid for role in NIGHT_ROLES for pid in self._alive_by_role.get(role, ())}
+        return needed - self.pending_actions.keys()
+
     def all_night_actions_received(self):
         """Checks if all required night actions have been received."""
-        needed = {pid for role in ("mafia", "doctor", "detective") for pid in self.alive_by_role(role)}
-        return needed.issubset(self.pending_actions.keys())
+        # Only alive night actors can record an action, so counting is enough
+        return len(self.pending_actions) >= sum(self.alive_count(role) for role in NIGHT_ROLES)
 
-    def resolve_night(self):
-        """Resolves all night actions and transitions to DAY phase."""
-        if self.state != GameState.NIGHT:
-            raise Exception("Can only resolve during NIGHT")
-
-        # Store night activities before processing actions
+    def night_activities(self):
+        """Returns player_name -> {role, action} for the night actions received so far."""
         night_activities = {}
         for pid, act in self.pending_actions.items():
             player = self.players[pid]
-            night_activities[player["name"]] = {
-                "role": player["role"],
+            night_activities[player.name] = {
+                "role": player.role,
                 "action": act.get("activity", "")
             }
+        return night_activities
 
+    def _tally_night(self, actions):
+        """Returns (top mafia targets, doctor targets) for a set of night actions."""
         mafia_votes = {}
-        for pid, act in self.pending_actions.items():
-            if act["type"] == "kill" and self.players[pid]["role"] == "mafia":
+        for pid, act in actions.items():
+            if act["type"] == "kill" and self.players[pid].role == "mafia":
                 tgt = act["target"]
                 mafia_votes[tgt] = mafia_votes.get(tgt, 0) + 1
 
-        mafia_target = None
+        top_targets = []
         if mafia_votes:
             max_votes = max(mafia_votes.values())
             top_targets = [t for t, v in mafia_votes.items() if v == max_votes]
-            mafia_target = random.choice(top_targets)
 
-        doctor_targets = [act["target"] for pid, act in self.pending_actions.items()
-                        if act["type"] == "save" and self.players[pid]["role"] == "doctor"]
+        doctor_targets = [act["target"] for pid, act in actions.items()
+                        if act["type"] == "save" and self.players[pid].role == "doctor"]
+        return top_targets, doctor_targets
+
+    def possible_night_deaths(self, max_outcomes=3):
+        """
+        Predicts how the night can still end when exactly one actor is pending.
+
+        Returns a list of possible death lists (player names), or None if more
+        than one actor is pending or there are more than max_outcomes outcomes.
+        """
+        missing = self.pending_night_actors()
+        if len(missing) != 1:
+            return None
+
+        pid = next(iter(missing))
+        atype = {"mafia": "kill", "doctor": "save", "detective": "investigate"}[self.players[pid].role]
+
+        outcomes = []
+        for target in self.alive_players():
+            actions = {**self.pending_actions, pid: {"type": atype, "target": target}}
+            top_targets, doctor_targets = self._tally_night(actions)
+            for mafia_target in top_targets or [None]:
+                deaths = []
+                if mafia_target and mafia_target not in doctor_targets:
+                    deaths = [self.players[mafia_target].name]
+                if deaths not in outcomes:
+                    outcomes.append(deaths)
+                if len(outcomes) > max_outcomes:
+                    return None
+        return outcomes
+
+    @traced
+    def resolve_night(self):
+        """Resolves all night actions and transitions to DAY phase."""
+        if self.state != GameState.NIGHT:
+            raise Exception("Can only resolve during NIGHT")
+
+        top_targets, doctor_targets = self._tally_night(self.pending_actions)
+        mafia_target = random.choice(top_targets) if top_targets else None
         saved = mafia_target in doctor_targets if mafia_target else False
+        self.apply({"type": "night_resolved", "mafia_target": mafia_target, "saved": saved})
+
+        # check game over and end if necessary
+        game_over, winners = self.check_game_over()
+        if game_over:
+            self.end_game()
+        return {"mafia_target": mafia_target, "saved": saved, "detective_results": self.detective_results}
+
+    def _apply_night_resolved(self, event):
+        mafia_target, saved = event["mafia_target"], event["saved"]
+
+        # Store night activities before processing actions
+        night_activities = self.night_activities()
 
         for pid, act in self.pending_actions.items():
-            if act["type"] == "investigate" and self.players[pid]["role"] == "detective":
+            if act["type"] == "investigate" and self.players[pid].role == "detective":
                 target = act["target"]
-                self.detective_results[pid] = {"target": target, "role": self.players[target]["role"]}
-                self.story_log.append({"event": f"Detective {self.players[pid]['name']} investigated {self.players[target]['name']}.",
+                self.detective_results[pid] = {"target": target, "role": self.players[target].role}
+                self.story_log.append({"event": f"Detective {self.players[pid].name} investigated {self.players[target].name}.",
                                     "result_for": pid})
 
         if mafia_target and not saved:
-            self.players[mafia_target]["player_obj"].eliminate()
-            self.players[mafia_target]["alive"] = False
-            self.players[mafia_target].setdefault("eliminated_in_round", self.round)
-            self.story_log.append({"event": f"{self.players[mafia_target]['name']} was killed during Night {self.round}.",
+            victim = self.players[mafia_target]
+            self._kill(victim)
+            if victim.eliminated_in_round is None:
+                victim.eliminated_in_round = self.round
+            self.story_log.append({"event": f"{victim.name} was killed during Night {self.round}.",
                                 "player_id": mafia_target})
         elif mafia_target:
-            self.story_log.append({"event": f"{self.players[mafia_target]['name']} was targeted but saved during Night {self.round}."})
+            self.story_log.append({"event": f"{self.players[mafia_target].name} was targeted but saved during Night {self.round}."})
 
         # Clear pending actions after storing activities
         self.pending_actions = {}
@@ -280,166 +674,214 @@ class MafiaGame:
         
         # Build special actions for story generation
         special_actions = {"deaths": [], "revivals": []}
-        for pid, info in self.players.items():
-            if not info["alive"] and info.get("eliminated_in_round") == self.round:
-                special_actions["deaths"].append(info["name"])
+        for pid, p in self.players.items():
+            if not p.is_alive and p.eliminated_in_round == self.round:
+                special_actions["deaths"].append(p.name)
 
         # Store special actions too
         self._last_special_actions = special_actions
-
-        # check game over and end if necessary
-        game_over, winners = self.check_game_over()
-        if game_over:
-            self.end_game()
-        return {"mafia_target": mafia_target, "saved": saved, "detective_results": self.detective_results}
     
     # ------------------- Day Phase -------------------
 
-    def start_day(self):
-        """Generate day story using stored night activities."""
+    @traced
+    def start_day(self, narrate=True):
+        """
+        Generate day story using stored night activities.
+
+        With narrate=False the game moves straight to DISCUSSION and the story
+        is recorded later via record_day_story().
+        """
         if self.state != GameState.DAY:
             raise Exception("Not in DAY phase")
 
+        night_activities, special_actions = self.day_story_inputs()
+
+        story_text = None
+        if narrate:
+            story_text = generate_mafia_story(night_activities, special_actions, self.round, self.theme)
+            print(story_text[:10])
+            self.record_day_story(story_text, self.round)
+
+        self.apply({"type": "day_started"})
+
+        return {"story": story_text, "night_activities": night_activities}
+
+    def _apply_day_started(self, event):
+        self.state = GameState.DISCUSSION
+
+    def day_story_inputs(self):
+        """Returns (night_activities, special_actions) for the current day story."""
         # Use stored activities from resolve_night
         night_activities = getattr(self, '_last_night_activities', {})
-        special_actions = getattr(self, '_last_special_actions', {"deaths": [], "revivals": []})
 
         # Build special actions
         special_actions = {"deaths": [], "revivals": []}
-        for pid, info in self.players.items():
-            if not info["alive"] and info.get("eliminated_in_round") == self.round:
-                special_actions["deaths"].append(info["name"])
+        for pid, p in self.players.items():
+            if not p.is_alive and p.eliminated_in_round == self.round:
+                special_actions["deaths"].append(p.name)
             # (If you add revival logic later, populate special_actions["revivals"])
 
-        # Generate story
-        story_text = generate_mafia_story(night_activities, special_actions, self.round, self.theme)
-        print(story_text[:10])
+        return night_activities, special_actions
 
-        # Save story in log
+    def record_day_story(self, story_text, round_number):
+        """Saves a day story in the log."""
+        self.apply({"type": "day_story", "story": story_text, "round": round_number})
+
+    def _apply_day_story(self, event):
         self.story_log.append({
-            "event": f"Day {self.round} AI story",
-            "story": story_text
+            "event": f"Day {event['round']} AI story",
+            "story": event["story"]
         })
 
-        self.state = GameState.DISCUSSION
-
-        return {"story": story_text, "night_activities": night_activities}
+    def fallback_day_story(self):
+        _, special_actions = self.day_story_inputs()
+        return fallback_mafia_story(special_actions, self.round)
 
+    @traced
     def record_vote(self, voter_id, target_id):
-        """Records a vote. Only alive players can vote."""
+        """Records a vote. Only alive players can vote, for an alive player or "skip"."""
         if self.state != GameState.DISCUSSION:
             raise Exception("Not in DISCUSSION phase")
-        if voter_id not in self.players or not self.players[voter_id]["alive"]:
+        if not self.is_alive(voter_id):
             raise Exception("Only alive players can vote")
+        if target_id != "skip" and not self.is_alive(target_id):
+            raise Exception("Votes must be for an alive player or skip")
 
-        if not hasattr(self, "votes"):
-            self.votes = {}
+        self.apply({"type": "vote_cast", "voter_id": voter_id, "target_id": target_id})
+        # {target_id: new count} for the targets this vote changed, for live tallies
+        return self._last_tally_delta
 
-        self.votes[voter_id] = target_id
-        return True
+    def _apply_vote_cast(self, event):
+        self._last_tally_delta = self.tally.cast(event["voter_id"], event["target_id"])
+
+    @property
+    def votes(self):
+        """voter_id -> target_id for the current day (read-only; see record_vote())."""
+        return self.tally.votes
 
     def all_votes_received(self):
         """Check if all alive players have voted."""
-        if not hasattr(self, "votes"):
-            return False
-        alive_count = len(self.alive_players())
-        return len(self.votes) == alive_count
+        return len(self.tally) == self.alive_count()
 
     from .ai import generate_vote_results
 
-    def resolve_votes(self):
-        """Counts votes, applies elimination, and generates AI narration."""
+    @traced
+    def resolve_votes(self, narrate=True, force=False):
+        """
+        Counts votes, applies elimination, and generates AI narration.
+
+        With narrate=False the result carries no story; the caller generates it
+        from vote_story_inputs() and saves it with record_vote_story(). With
+        force=True (the day timed out) the vote resolves even if nobody voted,
+        which eliminates no one.
+        """
         if self.state != GameState.DISCUSSION:
             raise Exception("Not in DISCUSSION phase")
-        if not hasattr(self, "votes") or not self.votes:
+        if not self.tally and not force:
             return {"message": "No votes cast"}
 
-        # Count votes
-        vote_counts = {}
-        for v in self.votes.values():
-            vote_counts[v] = vote_counts.get(v, 0) + 1
-
-        num_alive = len(self.alive_players())
-        majority = num_alive // 2 + 1
+        vote_counts = dict(self.tally.counts)
+        majority = self.alive_count() // 2 + 1
 
         eliminated = None
-        outcome = "no_elimination"
 
-        # Check if skip had majority
-        if "skip" in vote_counts and vote_counts["skip"] >= majority:
-            outcome = "no_elimination"
-        else:
-            # Find top-voted player(s)
-            top_votes = [pid for pid, cnt in vote_counts.items() if cnt == max(vote_counts.values())]
+        # Check if skip had majority; otherwise a random top-voted player goes
+        leaders = self.tally.leaders()
+        if leaders and self.tally.count("skip") < majority:
+            eliminated = random.choice(leaders)
+            if eliminated == "skip":
+                eliminated = None  # skip tied for the lead and won the draw
+
+        self.apply({"type": "votes_resolved", "eliminated": eliminated})
+        outcome = self._last_vote_summary["outcome"]
+
+        # Generate AI narration
+        narration = None
+        if narrate:
+            try:
+                narration = generate_vote_results(
+                    self._last_vote_summary,
+                    self.players,
+                    self.round,
+                    self.theme
+                )
+            except Exception:
+                # Fallback narration in case AI call fails
+                narration = self.fallback_vote_story()
+            self.record_vote_story(narration)
 
-            if top_votes:
-                eliminated = random.choice(top_votes)
-                self.eliminate_player(eliminated)
-                outcome = "player_eliminated"
+        # Check game over
+        game_over, winners = self.check_game_over()
+        if game_over:
+            self.end_game()
+
+        return {
+            "outcome": outcome,
+            "eliminated": eliminated,
+            "vote_counts": vote_counts,
+            "story": narration,
+            "game_over": self.state == GameState.END
+        }
+
+
+    def vote_story_inputs(self):
+        """Returns the generate_vote_results() arguments for the last vote."""
+        return self._last_vote_summary, self.players, self.round, self.theme
+
+    def _apply_votes_resolved(self, event):
+        eliminated = event["eliminated"]
+        outcome = "player_eliminated" if eliminated else "no_elimination"
+        if eliminated:
+            self.eliminate_player(eliminated)
 
         # Build vote_summary for AI
-        vote_summary = {
+        game_over, _ = self.check_game_over()
+        self._last_vote_summary = {
             "outcome": outcome,
             "eliminated": eliminated,
             "votes": self.votes.copy(),
-            "game_over": False  # will update after check_game_over
+            "game_over": game_over
         }
 
-        # Generate AI narration
-        try:
-            narration = generate_vote_results(
-                vote_summary,
-                self.players,
-                self.round_number,
-                self.theme
-            )
-        except Exception:
-            # Fallback narration in case AI call fails
-            if outcome == "player_eliminated" and eliminated:
-                eliminated_name = self.players[eliminated]["name"]
-                narration = f"The town voted, and {eliminated_name} was eliminated."
-            else:
-                narration = "The town voted, but no one was eliminated."
-
-        # Save narration in story log
+        # Save the result in the story log; the narration is filled in by record_vote_story()
+        self._last_vote_index = len(self.story_log)
         self.story_log.append({
             "event": "Vote Results",
-            "story": narration,
+            "story": None,
             "outcome": outcome,
             "eliminated": eliminated,
             "votes": self.votes.copy()
         })
 
         # Reset votes & advance state
-        self.votes = {}
+        self.tally.reset()
         self.state = GameState.NIGHT
 
-        # Check game over
-        game_over, winners = self.check_game_over()
-        vote_summary["game_over"] = game_over
-        if game_over:
-            self.end_game()
+    def record_vote_story(self, story):
+        """Fills in the story of the last vote once it has been generated."""
+        self.apply({"type": "vote_story", "story": story})
 
-        return {
-            "outcome": outcome,
-            "eliminated": eliminated,
-            "vote_counts": vote_counts,
-            "story": narration,
-            "game_over": self.state == GameState.END
-        }
+    def _apply_vote_story(self, event):
+        self.story_log[self._last_vote_index]["story"] = event["story"]
+        self._log_dirty.add(self._last_vote_index)
 
+    def fallback_vote_story(self):
+        eliminated = self._last_vote_summary["eliminated"]
+        # .get(): games stored before targets were checked may have voted for a non-player
+        player = self.players.get(eliminated) if eliminated else None
+        eliminated_name = player.name if player else None
+        return fallback_vote_results(self._last_vote_summary["outcome"], eliminated_name)
 
     def eliminate_player(self, player_id):
-        """Eliminates a player from the game (used for voting and killer)."""
+        """Eliminates a player from the game (called by the vote reducer)."""
         if player_id in self.players:
-            self.players[player_id]["player_obj"].eliminate()
-            self.players[player_id]["alive"] = False
-            self.story_log.append({"event": f"Player Eliminated: {self.players[player_id]['name']}", "player_id": player_id})
+            self._kill(self.players[player_id])
+            self.story_log.append({"event": f"Player Eliminated: {self.players[player_id].name}", "player_id": player_id})
     
     def check_game_over(self):
         """Return (game_over: bool, winner: str|None)."""
-        alive_mafia = sum(1 for p in self.players.values() if p["alive"] and p["role"] == "mafia")
-        alive_town = sum(1 for p in self.players.values() if p["alive"] and p["role"] != "mafia")
+        alive_mafia = self.alive_count("mafia")
+        alive_town = self.alive_count() - alive_mafia
 
         if alive_mafia == 0:
             return True, "town"
@@ -447,14 +889,17 @@ class MafiaGame:
             return True, "mafia"
         return False, None
 
+    @traced
     def end_game(self):
         """Ends the game and records the winners."""
         game_over, winners = self.check_game_over()
         if not game_over:
             raise Exception("Game is not over yet")
-        else:
-            self.state = GameState.END
-            mafias = [p["name"] for p in self.players.values() if p["role"] == "mafia"]
-            doctor = [p["name"] for p in self.players.values() if p["role"] == "doctor"]
-            detective = [p["name"] for p in self.players.values() if p["role"] == "detective"]
-            self.story_log.append({"event": "Game Over", "winners": winners, "mafia(s)": mafias, "doctor": doctor, "detective": detective})
\ No newline at end of file
+        self.apply({"type": "game_ended", "winners": winners})
+
+    def _apply_game_ended(self, event):
+        self.state = GameState.END
+        mafias = [p.name for p in self.players.values() if p.role == "mafia"]
+        doctor = [p.name for p in self.players.values() if p.role == "doctor"]
+        detective = [p.name for p in self.players.values() if p.role == "detective"]
+        self.story_log.append({"event": "Game Over", "winners": event["winners"], "mafia(s)": mafias, "doctor": doctor, "detective": detective})
\ No newline at end of file
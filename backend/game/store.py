@@ -0,0 +1,263 @@
+import json
+import os
+import threading
+import time
+
+GAME_STORE = os.getenv("MAFAI_GAME_STORE", "memory")            # "memory" or "sqlite"
+GAME_STORE_DB = os.getenv("MAFAI_GAME_STORE_DB", "mafai_games.db")
+GAME_STORE_FLUSH_INTERVAL = float(os.getenv("MAFAI_GAME_STORE_FLUSH_INTERVAL", 1.0))
+
+
+class GameStore:
+    """
+    Where live games are kept, keyed by game id. This base class keeps them
+    in memory only.
+
+    Behaves like the dict it replaces (games[game_id], game_id in games, del
+    games[game_id], ...).
+    """
+
+    def __init__(self):
+        self._games = {}
+
+    def __contains__(self, game_id):
+        return self.get(game_id) is not None
+
+    def __getitem__(self, game_id):
+        game = self.get(game_id)
+        if game is None:
+            raise KeyError(game_id)
+        return game
+
+    def __setitem__(self, game_id, game):
+        self._games[game_id] = game
+
+    def __delitem__(self, game_id):
+        del self._games[game_id]
+
+    def __len__(self):
+        return len(self._games)
+
+    def __iter__(self):
+        return iter(list(self._games))
+
+    def get(self, game_id, default=None):
+        return self._games.get(game_id, default)
+
+    def values(self):
+        return list(self._games.values())
+
+    def flush(self):
+        pass
+
+    def stats(self):
+        return {"backend": "memory", "hot_games": len(self._games)}
+
+
+class SQLiteGameStore(GameStore):
+    """
+    GameStore that survives restarts, backed by a SQLite file in WAL mode.
+
+    Each game's events are appended to game_events and its periodic compact
+    snapshot (MafiaGame.take_snapshot()) replaces the previous one in
+    game_snapshots. Writes stay off the hot path: the game's listener only
+    buffers the event, and a background thread writes everything buffered
+    once per flush interval in one transaction. Only the stored game ids are
+    loaded on boot; a game is rebuilt from its snapshot and later events the
+    first time it is asked for, and ids that were never stored are answered
+    without touching the disk.
+    """
+
+    def __init__(self, db_path=GAME_STORE_DB, flush_interval=GAME_STORE_FLUSH_INTERVAL):
+        super().__init__()
+        import sqlite3
+
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._events = []               # [(game_id, seq, event)] not yet written
+        self._deleted = set()
+        self._stored = set()            # ids of every game on disk or about to be, live or not
+        self._snapshot_seq = {}         # game_id -> seq of the snapshot last written
+        self._counts = {
+            "flushes": 0, "events_written": 0, "snapshots_written": 0, "bytes_written": 0,
+            "games_deleted": 0, "games_restored": 0, "events_replayed": 0,
+        }
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS game_snapshots ("
+            "game_id TEXT PRIMARY KEY, seq INTEGER NOT NULL, snapshot TEXT NOT NULL, updated_at REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS game_events ("
+            "game_id TEXT NOT NULL, seq INTEGER NOT NULL, type TEXT NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (game_id, seq))"
+        )
+        self._db.commit()
+        self._stored.update(game_id for (game_id,) in self._db.execute(
+            "SELECT game_id FROM game_snapshots UNION SELECT game_id FROM game_events"
+        ))
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._run, name="game-store-flush", daemon=True)
+        self._flusher.start()
+
+    def get(self, game_id, default=None):
+        game = self._games.get(game_id)
+        if game is not None:
+            return game
+        if not game_id:
+            return default
+
+        with self._lock:
+            if game_id not in self._stored:
+                return default  # unknown or deleted: no query for ids that were never stored
+        game = self._restore(game_id)
+        if game is None:
+            return default
+        self._track(game)
+        return self._games.setdefault(game_id, game)
+
+    def _restore(self, game_id):
+        from .state_machine import MafiaGame
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT seq, snapshot FROM game_snapshots WHERE game_id = ?", (game_id,)
+            ).fetchone()
+            seq, snapshot = row if row else (0, None)
+            rows = self._db.execute(
+                "SELECT data FROM game_events WHERE game_id = ? AND seq > ? ORDER BY seq", (game_id, seq)
+            ).fetchall()
+        if snapshot is None and not rows:
+            return None
+
+        game = MafiaGame.restore(snapshot, [json.loads(data) for (data,) in rows])
+        self._snapshot_seq[game_id] = seq
+        self._counts["games_restored"] += 1
+        self._counts["events_replayed"] += len(rows)
+        print(f"Restored game {game_id} from {self.db_path} ({len(rows)} events after the snapshot)")
+        return game
+
+    def __setitem__(self, game_id, game):
+        with self._lock:
+            self._deleted.discard(game_id)
+            self._stored.add(game_id)
+            # A new game's history so far (at least its game_created event)
+            first = game.seq - len(game.events) + 1
+            self._events.extend((game_id, first + i, event) for i, event in enumerate(game.events))
+        self._track(game)
+        super().__setitem__(game_id, game)
+
+    def __delitem__(self, game_id):
+        self._games.pop(game_id, None)
+        with self._lock:
+            self._deleted.add(game_id)
+            self._stored.discard(game_id)
+            self._snapshot_seq.pop(game_id, None)
+
+    def _track(self, game):
+        game.listener = self._on_event
+
+    def _on_event(self, game, seq, event):
+        with self._lock:
+            self._events.append((game.id, seq, event))
+
+    # ------------------- Flushing -------------------
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Game store flush failed: {e}")
+
+    def flush(self):
+        """Writes buffered events, new snapshots and deletions in one transaction."""
+        with self._lock:
+            events, self._events = self._events, []
+            deleted, self._deleted = self._deleted, set()
+
+            snapshot_rows = []
+            now = time.time()
+            for game_id in {game_id for game_id, _, _ in events} - deleted:
+                game = self._games.get(game_id)
+                snapshot = game.snapshot if game else None
+                if snapshot and snapshot[0] > self._snapshot_seq.get(game_id, 0):
+                    snapshot_rows.append((game_id, snapshot[0], snapshot[1], now))
+                    self._snapshot_seq[game_id] = snapshot[0]
+
+            # Events already covered by a snapshot being written are skipped
+            event_rows = [
+                (game_id, seq, event["type"], json.dumps(event, separators=(",", ":")))
+                for game_id, seq, event in events
+                if game_id not in deleted and seq > self._snapshot_seq.get(game_id, 0)
+            ]
+
+            if not (event_rows or snapshot_rows or deleted):
+                return
+
+            with self._db:
+                if event_rows:
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO game_events (game_id, seq, type, data) VALUES (?, ?, ?, ?)",
+                        event_rows,
+                    )
+                if snapshot_rows:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO game_snapshots (game_id, seq, snapshot, updated_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        snapshot_rows,
+                    )
+                    # Events a snapshot covers are no longer needed to rebuild the game
+                    self._db.executemany(
+                        "DELETE FROM game_events WHERE game_id = ? AND seq <= ?",
+                        [(row[0], row[1]) for row in snapshot_rows],
+                    )
+                if deleted:
+                    ids = [(game_id,) for game_id in deleted]
+                    self._db.executemany("DELETE FROM game_snapshots WHERE game_id = ?", ids)
+                    self._db.executemany("DELETE FROM game_events WHERE game_id = ?", ids)
+
+            self._counts["flushes"] += 1
+            self._counts["events_written"] += len(event_rows)
+            self._counts["snapshots_written"] += len(snapshot_rows)
+            self._counts["bytes_written"] += sum(len(row[3]) for row in event_rows)
+            self._counts["bytes_written"] += sum(len(row[2]) for row in snapshot_rows)
+            self._counts["games_deleted"] += len(deleted)
+
+    def events(self, game_id):
+        """Returns the game's flushed events after its last snapshot, for auditing and debugging."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, data FROM game_events WHERE game_id = ? ORDER BY seq", (game_id,)
+            ).fetchall()
+        return [(seq, json.loads(data)) for seq, data in rows]
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "db_path": self.db_path,
+                "hot_games": len(self._games),
+                "stored_games": len(self._stored),
+                "buffered_events": len(self._events),
+                **self._counts,
+            }
+
+
+def create_game_store():
+    """Builds the store picked by MAFAI_GAME_STORE ("memory" or "sqlite")."""
+    if GAME_STORE == "sqlite":
+        import atexit
+        store = SQLiteGameStore()
+        atexit.register(store.close)
+        return store
+    return GameStore()
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from .ai import generate_background_story
+
+STORY_POOL_DEPTH = int(os.getenv("MAFAI_STORY_POOL_DEPTH", 2))
+STORY_POOL_TTL = float(os.getenv("MAFAI_STORY_POOL_TTL", 6 * 60 * 60))
+STORY_POOL_CUSTOM_THEMES = int(os.getenv("MAFAI_STORY_POOL_CUSTOM_THEMES", 16))
+STORY_POOL_WORKERS = int(os.getenv("MAFAI_STORY_POOL_WORKERS", 1))
+
+
+class StoryPool:
+    """
+    Pre-generated background stories, keyed by theme.
+
+    Built-in themes are always kept warm. Custom themes are tracked in LRU
+    order and dropped once there are too many of them or they go unused for
+    longer than the TTL. Stories older than the TTL are never handed out.
+    """
+
+    def __init__(self, generate, depth=STORY_POOL_DEPTH, ttl=STORY_POOL_TTL,
+                 max_custom_themes=STORY_POOL_CUSTOM_THEMES, workers=STORY_POOL_WORKERS):
+        self.generate = generate
+        self.depth = depth
+        self.ttl = ttl
+        self.max_custom_themes = max_custom_themes
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="story-pool")
+        self._lock = threading.Lock()
+        self._pinned = set()
+        self._ready = {}                 # theme -> deque[(created_at, story)]
+        self._in_flight = {}             # theme -> number of stories being generated
+        self._custom = OrderedDict()     # theme -> last used, in LRU order
+        self._counts = {"hits": 0, "misses": 0, "generated": 0, "expired": 0, "evicted_themes": 0}
+
+    def warm(self, themes):
+        """Pins the given themes and starts filling them up to depth."""
+        with self._lock:
+            for theme in themes:
+                self._pinned.add(theme)
+                self._ready.setdefault(theme, deque())
+        for theme in themes:
+            self._refill(theme)
+
+    def note_theme(self, theme):
+        """Marks a (possibly custom) theme as recently used so it gets warmed."""
+        if not theme or self.depth <= 0:
+            return
+        with self._lock:
+            self._touch(theme)
+        self._refill(theme)
+
+    def take(self, theme):
+        """Pops a ready story for the theme in O(1), or returns None on a miss."""
+        if self.depth <= 0:
+            return None
+
+        story = None
+        now = time.time()
+        with self._lock:
+            self._touch(theme)
+            ready = self._ready[theme]
+            while ready and now - ready[0][0] > self.ttl:
+                ready.popleft()
+                self._counts["expired"] += 1
+            if ready:
+                story = ready.popleft()[1]
+                self._counts["hits"] += 1
+            else:
+                self._counts["misses"] += 1
+
+        self._refill(theme)
+        return story
+
+    def _touch(self, theme):
+        """Records use of a theme and evicts stale or least recently used custom themes.
+
+        Caller must hold the lock.
+        """
+        self._ready.setdefault(theme, deque())
+        if theme in self._pinned:
+            return
+
+        now = time.time()
+        self._custom[theme] = now
+        self._custom.move_to_end(theme)
+
+        while self._custom:
+            oldest, last_used = next(iter(self._custom.items()))
+            if oldest == theme:
+                break
+            if len(self._custom) <= self.max_custom_themes and now - last_used <= self.ttl:
+                break
+            del self._custom[oldest]
+            self._ready.pop(oldest, None)
+            self._in_flight.pop(oldest, None)
+            self._counts["evicted_themes"] += 1
+
+    def _refill(self, theme):
+        with self._lock:
+            if theme not in self._ready:
+                return
+            missing = self.depth - len(self._ready[theme]) - self._in_flight.get(theme, 0)
+            if missing <= 0:
+                return
+            self._in_flight[theme] = self._in_flight.get(theme, 0) + missing
+
+        for _ in range(missing):
+            self._executor.submit(self._generate_one, theme)
+
+    def _generate_one(self, theme):
+        story = None
+        try:
+            story = self.generate(theme)
+        except Exception as e:
+            print(f"Story pool refill failed for theme {theme[:20]}...: {e}")
+        finally:
+            with self._lock:
+                self._release(theme)
+                # The theme may have been evicted while we were generating
+                if story and theme in self._ready:
+                    self._ready[theme].append((time.time(), story))
+                    self._counts["generated"] += 1
+
+    def _release(self, theme):
+        """Counts one refill of the theme as finished. Caller must hold the lock."""
+        # Evicting a theme drops its count, so refills still running for it find none
+        left = self._in_flight.get(theme, 0) - 1
+        if left > 0:
+            self._in_flight[theme] = left
+        else:
+            self._in_flight.pop(theme, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "depth": self.depth,
+                "themes": {theme[:40]: len(ready) for theme, ready in self._ready.items()},
+                "in_flight": sum(self._in_flight.values()),
+                **self._counts,
+            }
+
+
+story_pool = StoryPool(generate_background_story)
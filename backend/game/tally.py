@@ -0,0 +1,69 @@
+class VoteTally:
+    """
+    Running vote counts for one day, updated as each vote is cast or changed.
+
+    Targets are bucketed by their count, so the leaders (everyone tied for
+    the most votes) are known at any time without recounting: casting a vote
+    and reading the result are O(1) however many players the room has.
+    """
+
+    __slots__ = ("votes", "counts", "_buckets", "top")
+
+    def __init__(self, votes=None):
+        self.votes = {}      # voter_id -> target_id ("skip" to skip)
+        self.counts = {}     # target_id -> votes, targets with at least one vote
+        self._buckets = {}   # count -> {target_id: None}, a set that keeps the order targets got there
+        self.top = 0
+        for voter, target in (votes or {}).items():
+            self.cast(voter, target)
+
+    def cast(self, voter, target):
+        """
+        Records (or changes) voter's vote. Returns the delta: {target: new count}
+        for every target whose count changed, empty if the vote didn't change.
+        """
+        old = self.votes.get(voter)
+        if voter in self.votes and old == target:
+            return {}
+
+        delta = {}
+        if voter in self.votes:
+            delta[old] = self._move(old, -1)
+        self.votes[voter] = target
+        delta[target] = self._move(target, 1)
+        return delta
+
+    def _move(self, target, step):
+        count = self.counts.get(target, 0)
+        if count:
+            bucket = self._buckets[count]
+            del bucket[target]
+            if not bucket:
+                del self._buckets[count]
+
+        count += step
+        if count:
+            self.counts[target] = count
+            self._buckets.setdefault(count, {})[target] = None
+        else:
+            del self.counts[target]
+
+        # A count only moves by one, so the top does too
+        if count > self.top:
+            self.top = count
+        elif self.top and self.top not in self._buckets:
+            self.top -= 1
+        return count
+
+    def count(self, target):
+        return self.counts.get(target, 0)
+
+    def leaders(self):
+        """Targets tied for the most votes (empty before the first vote)."""
+        return list(self._buckets.get(self.top, ()))
+
+    def reset(self):
+        self.votes, self.counts, self._buckets, self.top = {}, {}, {}, 0
+
+    def __len__(self):
+        return len(self.votes)
@@ -0,0 +1,126 @@
+import math
+import os
+import threading
+import time
+
+TIMER_RESOLUTION = float(os.getenv("MAFAI_TIMER_RESOLUTION", 0.5))  # seconds per wheel slot
+TIMER_SLOTS = int(os.getenv("MAFAI_TIMER_SLOTS", 512))
+PHASE_TIMERS = os.getenv("MAFAI_PHASE_TIMERS", "1") == "1"
+PHASE_TICK_INTERVAL = int(os.getenv("MAFAI_PHASE_TICK_INTERVAL", 5))  # seconds between countdown ticks
+EMIT_COALESCE_WINDOW = float(os.getenv("MAFAI_EMIT_COALESCE_MS", 40)) / 1000  # 0 sends lobby updates right away
+
+
+class TimerWheel:
+    """
+    One scheduler thread for every timer in the process (a hashed timing wheel).
+
+    Timers are put in the slot their deadline falls into, modulo the number of
+    slots; each resolution step the thread visits one slot and fires the
+    timers that are due, leaving the ones due on a later turn of the wheel.
+    Timers fire at most one resolution step late, never early. Scheduling and
+    cancelling are O(1), and the thread does the same small amount of work per
+    step whether there are ten timers or ten thousand. With no timers at all
+    the thread sleeps until the next one is scheduled.
+
+    Each timer has a key (scheduling a key again replaces its timer) and a
+    callback that runs on the wheel thread, so callbacks should only hand work
+    off, e.g. to a game's mailbox.
+    """
+
+    def __init__(self, resolution=TIMER_RESOLUTION, slots=TIMER_SLOTS):
+        self.resolution = resolution
+        self._slots = [dict() for _ in range(slots)]
+        self._timers = {}   # key -> (tick, callback)
+        self._lock = threading.Lock()
+        self._scheduled = threading.Condition(self._lock)
+        self._started = 0.0
+        self._tick = 0      # the next tick the thread will visit
+        self._thread = None
+        self._counts = {"scheduled": 0, "fired": 0, "cancelled": 0, "failed": 0}
+
+    def _ensure_running(self):
+        if self._thread is None:
+            self._started = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+            self._thread.start()
+
+    def schedule(self, key, delay, callback):
+        """Runs callback() after delay seconds, replacing any timer already under key."""
+        with self._lock:
+            self._ensure_running()
+            self._remove(key)
+            elapsed = time.monotonic() - self._started
+            if not self._timers:
+                # The wheel is idle and every slot empty, so the thread can
+                # skip ahead to now before this timer goes in
+                self._tick = max(self._tick, math.floor(elapsed / self.resolution))
+            # The first slot at or after the deadline, and never one already visited
+            tick = max(self._tick, math.ceil((elapsed + delay) / self.resolution))
+            self._slots[tick % len(self._slots)][key] = (tick, callback)
+            self._timers[key] = (tick, callback)
+            self._counts["scheduled"] += 1
+            self._scheduled.notify()
+
+    def cancel(self, key):
+        """Cancels the timer under key; returns True if there was one."""
+        with self._lock:
+            if self._remove(key):
+                self._counts["cancelled"] += 1
+                return True
+            return False
+
+    def _remove(self, key):
+        entry = self._timers.pop(key, None)
+        if entry is None:
+            return False
+        self._slots[entry[0] % len(self._slots)].pop(key, None)
+        return True
+
+    def remaining(self, key):
+        """Seconds until the timer under key fires, or None."""
+        with self._lock:
+            entry = self._timers.get(key)
+            if entry is None:
+                return None
+            return max(0.0, self._started + entry[0] * self.resolution - time.monotonic())
+
+    def _run(self):
+        while True:
+            delay = self._started + self._tick * self.resolution - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            with self._lock:
+                if not self._timers:
+                    # Idle: wait for a timer (schedule() moves the tick up to
+                    # now), then visit every slot from there on in turn
+                    self._scheduled.wait()
+                    continue
+                slot = self._slots[self._tick % len(self._slots)]
+                due = [(key, callback) for key, (tick, callback) in slot.items() if tick <= self._tick]
+                for key, _ in due:
+                    del slot[key]
+                    del self._timers[key]
+                self._tick += 1
+
+            for key, callback in due:
+                self._counts["fired"] += 1
+                try:
+                    callback()
+                except Exception as e:
+                    self._counts["failed"] += 1
+                    print(f"Timer {key} failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._timers),
+                "resolution": self.resolution,
+                "slots": len(self._slots),
+                **self._counts,
+            }
+
+
+timer_wheel = TimerWheel()
+# Timers of a few milliseconds (emit coalescing) on a finer wheel of their own
+short_timer_wheel = TimerWheel(resolution=0.01, slots=64)
@@ -0,0 +1,147 @@
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+TRACING = os.getenv("MAFAI_TRACING", "0") == "1"  # off unless asked for
+TRACE_BUFFER = int(os.getenv("MAFAI_TRACE_BUFFER", 20000))  # finished spans kept in memory
+TRACE_FILE = os.getenv("MAFAI_TRACE_FILE")  # also append every span here as a JSON line
+
+_CURRENT = object()  # parent=_CURRENT: the span open on this thread, if any
+
+
+class Span:
+    __slots__ = ("trace", "round", "id", "parent", "name", "attrs", "started", "_t0")
+
+    def __init__(self, trace, round_number, span_id, parent, name, attrs):
+        self.trace = trace
+        self.round = round_number
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+
+
+class Tracer:
+    """
+    Span tracing for games: the trace id is the game id, and every span carries
+    the round it started in, so a round's spans can be read as one tree.
+
+    A span's parent is the span open on the same thread (handler -> state
+    machine call -> broadcast), or one passed in explicitly to continue a
+    trace on another thread, e.g. from the handler that queued a narration job
+    to the job itself. Spans without a trace (no game and no parent) are not
+    recorded. Finished spans go to a ring buffer of TRACE_BUFFER spans and,
+    with MAFAI_TRACE_FILE, to a JSON lines file; trace_report.py prints the
+    slowest rounds from either.
+    """
+
+    def __init__(self, buffer=TRACE_BUFFER, path=TRACE_FILE, enabled=TRACING):
+        self.enabled = enabled
+        self._spans = deque(maxlen=buffer)
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._prefix = f"{os.getpid():x}-"
+        self._file_lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path and enabled else None
+        self._counts = {"spans": 0}
+
+    def current(self):
+        """The span open on this thread, or None."""
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, trace=None, round_number=None, parent=_CURRENT, **attrs):
+        """
+        Times the block as a span and yields it (None when nothing is recorded);
+        attributes can be added to span.attrs before the block ends.
+        """
+        if not self.enabled:
+            yield None
+            return
+        if parent is _CURRENT:
+            parent = self.current()
+        if parent is not None and parent.trace != trace and trace is not None:
+            parent = None  # another game's span is open on this thread
+        if trace is None:
+            if parent is None:
+                yield None
+                return
+            trace = parent.trace
+        if round_number is None:
+            round_number = parent.round if parent is not None else 0
+
+        span = Span(trace, round_number, self._prefix + format(next(self._ids), "x"),
+                    parent.id if parent is not None else None, name, attrs)
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(span)
+        try:
+            yield span
+        except Exception as e:
+            span.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            stack.pop()
+            self._finish(span)
+
+    def _finish(self, span):
+        record = {
+            "trace": span.trace,
+            "round": span.round,
+            "span": span.id,
+            "parent": span.parent,
+            "name": span.name,
+            "start": span.started,
+            "ms": round((time.perf_counter() - span._t0) * 1000, 3),
+            "thread": threading.current_thread().name,
+        }
+        if span.attrs:
+            record["attrs"] = span.attrs
+        self._spans.append(record)
+        self._counts["spans"] += 1
+        if self._file is not None:
+            line = json.dumps(record, default=str) + "\n"
+            with self._file_lock:
+                self._file.write(line)
+                self._file.flush()
+
+    def spans(self, trace=None, limit=None):
+        """Finished spans in the order they ended, optionally for one game only (the last limit)."""
+        spans = list(self._spans)
+        if trace is not None:
+            spans = [s for s in spans if s["trace"] == trace]
+        return spans[-limit:] if limit else spans
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "buffered": len(self._spans),
+            "buffer_size": self._spans.maxlen,
+            "file": self._file.name if self._file else None,
+            **self._counts,
+        }
+
+
+tracer = Tracer()
+
+
+def traced(method):
+    """Traces a MafiaGame method as a span named after it, in the game's trace."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not tracer.enabled:
+            return method(self, *args, **kwargs)
+        with tracer.span(name, self.id, self.round):
+            return method(self, *args, **kwargs)
+    return wrapper
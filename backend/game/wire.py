@@ -0,0 +1,86 @@
+import json
+import os
+import uuid
+import zlib
+from .metrics import socket_emit_bytes, socket_emit_bytes_saved, socket_emits
+
+WIRE_DEFLATE_MIN = int(os.getenv("MAFAI_WIRE_DEFLATE_MIN", 512))  # smaller payloads stay plain JSON
+WIRE_DEFLATE_LEVEL = int(os.getenv("MAFAI_WIRE_DEFLATE_LEVEL", 6))
+ENCODINGS = ("json", "deflate")  # what clients may ask for at join
+
+# Random per process so text sent by players can't pose as a placeholder
+_PLACEHOLDER = "\x00raw-" + uuid.uuid4().hex + "-{}\x00"
+
+
+class RawJSON:
+    """Text that is already JSON; wire_json.dumps() splices it in as-is."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class wire_json:
+    """
+    json module for Socket.IO packets (SocketIO(json=wire_json)).
+
+    Works like the standard json module, except that RawJSON values are
+    inserted without being encoded again. Views cached by MafiaGame.view_json()
+    are sent this way, so a state is encoded once per version no matter how
+    many sockets receive it. Each event packet is counted (with its size)
+    in the emit metrics; encode() is the same without counting, for
+    payloads that are not packets.
+    """
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        text = wire_json.encode(obj, **kwargs)
+        # Event packets are encoded as [event, *args], once per emit. A deflated
+        # payload is a binary attachment, so only its placeholder is in the text;
+        # encode_payload() counts the attachment.
+        if isinstance(obj, list) and obj and isinstance(obj[0], str):
+            socket_emits.inc(obj[0])
+            socket_emit_bytes.inc(obj[0], amount=len(text))
+        return text
+
+    @staticmethod
+    def encode(obj, **kwargs):
+        raws = []
+
+        def default(value):
+            if isinstance(value, RawJSON):
+                raws.append(value.text)
+                return _PLACEHOLDER.format(len(raws) - 1)
+            raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+        text = json.dumps(obj, default=default, **kwargs)
+        for i, raw in enumerate(raws):
+            text = text.replace(json.dumps(_PLACEHOLDER.format(i)), raw, 1)
+        return text
+
+    @staticmethod
+    def loads(text, **kwargs):
+        return json.loads(text, **kwargs)
+
+
+# ------------------- Encodings -------------------
+# A client that joins with {"encoding": "deflate"} gets payloads of
+# WIRE_DEFLATE_MIN bytes or more as zlib-deflated JSON in a binary attachment
+# (frontend/src/api/socket.js inflates them). Everyone else, and every
+# smaller payload, gets plain JSON. This is for clients whose transport
+# doesn't compress: long-polling responses under Engine.IO's 1 KB
+# compression threshold, or WebSockets without permessage-deflate.
+
+def encode_payload(event, payload, encoding=None):
+    """payload ready to emit to a client that asked for encoding."""
+    if encoding != "deflate":
+        return payload
+    text = wire_json.encode(payload, separators=(",", ":"))
+    if len(text) < WIRE_DEFLATE_MIN:
+        return RawJSON(text)  # already encoded, don't do it twice; the packet counts it
+    data = zlib.compress(text.encode("utf-8"), WIRE_DEFLATE_LEVEL)
+    # Sent as an attachment next to the packet's placeholder text, which dumps() counts
+    socket_emit_bytes.inc(event, amount=len(data))
+    socket_emit_bytes_saved.inc(event, amount=len(text) - len(data))
+    return data
@@ -1,9 +1,127 @@
-from flask import Blueprint, request, jsonify
+import functools
+import time
+from flask import Blueprint, Response, copy_current_request_context, current_app, g, request, jsonify
 from game.state_machine import MafiaGame
 from game.model import Player
+from game.narration import narration
+from game.story_pool import story_pool
+from game.speculation import speculator
+from game.cache import narration_cache
+from game.governor import governor
+from game.store import create_game_store
+from game.mailbox import mailboxes
+from game.timers import timer_wheel, short_timer_wheel
+from game.reaper import reaper
+from game.archive import game_archive
+from game.metrics import http_request_seconds, http_errors
+from game.tracing import tracer
+from game import sharding
+from routes.metrics_routes import is_operator_request, operator_only
 
 game_bp = Blueprint("game", __name__)
-games = {}   # in-memory game store {game_id: MafiaGame}
+games = create_game_store()   # {game_id: MafiaGame}, memory or SQLite (MAFAI_GAME_STORE)
+
+
+# ------------------- Metrics -------------------
+# Registered before route_to_owner so forwarded requests are timed too
+
+@game_bp.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@game_bp.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        # The route pattern, not the path, so game ids don't become labels
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        http_request_seconds.observe(time.perf_counter() - started, endpoint, request.method)
+        if response.status_code >= 400:
+            http_errors.inc(endpoint, str(response.status_code))
+    return response
+
+
+# ------------------- Operator Routes -------------------
+# Checked before route_to_owner, so a request is judged by where it came
+# from, not by the worker that forwarded it
+@game_bp.before_request
+def require_operator():
+    """Refuses routes marked operator_only to anyone but operators (see routes/metrics_routes.py)."""
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, "operator_only", False):
+        return None
+    if is_operator_request() or sharding.is_internal_request(request.headers):
+        return None
+    return jsonify({"error": "Forbidden"}), 403
+
+
+# ------------------- Worker Routing -------------------
+@game_bp.before_request
+def route_to_owner():
+    """With several workers, forwards requests for a game to the worker that owns it."""
+    if not sharding.sharded() or request.headers.get(sharding.FORWARDED_HEADER):
+        return None
+
+    game_id = (request.view_args or {}).get("game_id")
+    if game_id is None and request.is_json:
+        game_id = (request.get_json(silent=True) or {}).get("game_id")
+    if sharding.is_local(game_id):
+        return None
+
+    response = sharding.forward(game_id, request.method, request.path,
+                                json=request.get_json(silent=True), params=request.args)
+    return Response(response.content, status=response.status_code,
+                    content_type=response.headers.get("Content-Type"))
+
+
+def internal_socket_event(event):
+    """Runs a socket event forwarded by the worker holding the client's connection."""
+    if not sharding.is_internal_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    handler = sharding.socket_handlers.get(event)
+    if not handler:
+        return jsonify({"error": "Unknown event"}), 404
+    body = request.json or {}
+    data = body.get("data") or {}
+    # Queued like a local event; the handler answers the client over the socket
+    mailboxes.submit(data.get("game_id"), handler, data, body.get("sid"))
+    return jsonify({"status": "ok"})
+
+
+# Only workers talk to this route, so a single worker doesn't have it at all
+if sharding.sharded():
+    if not sharding.INTERNAL_TOKEN:
+        print("MAFAI_INTERNAL_TOKEN is not set; socket events forwarded by other workers will be refused")
+    game_bp.route("/internal/socket/<event>", methods=["POST"])(internal_socket_event)
+
+
+def _sockets():
+    # sockets.py imports this module (for games), so it is imported on first use
+    import sockets
+    return sockets
+
+
+def serialized(view):
+    """
+    Runs a route that changes a game on that game's mailbox, after any commands
+    already queued, then publishes what it changed to the game's socket clients.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        game_id = kwargs.get("game_id") or (request.get_json(silent=True) or {}).get("game_id")
+        if not game_id:
+            return view(*args, **kwargs)
+
+        @copy_current_request_context
+        def run():
+            response = view(*args, **kwargs)
+            game = games.get(game_id)
+            if game:
+                _sockets().publish_state(game)
+            return response
+        return mailboxes.run(game_id, run)
+    return wrapper
 
 
 @game_bp.route("/create", methods=["POST"])
@@ -18,18 +136,23 @@ def create_game():
     # Create host as a Player
     host_player = Player(name=host_name)
 
-    game = MafiaGame(host_player, theme)
+    # The id is picked so that this worker owns the new game
+    game = MafiaGame(host_player, theme, game_id=sharding.new_game_id())
     games[game.id] = game
 
+    # Start warming intros for custom themes while the lobby fills up
+    story_pool.note_theme(game.theme)
+
     return jsonify({
         "game_id": game.id,
         "host_id": host_player.player_id,
         "player_id": host_player.player_id,
-        "game_state": game.get_state()
+        "game_state": game.get_view(host_player.player_id)
     })
 
 
 @game_bp.route("/join", methods=["POST"])
+@serialized
 def join_game():
     data = request.json or {}
     print("Join request received:", data)
@@ -49,7 +172,7 @@ def join_game():
         return jsonify({
             "status": "ok",
             "player_id": new_player.player_id,
-            "game_state": game.get_state()
+            "game_state": game.get_view(new_player.player_id)
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -60,9 +183,11 @@ def get_state(game_id):
     game = games.get(game_id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
-    return jsonify(game.get_state())
+    # ?player_id=... returns that player's view, otherwise the spectator view
+    return jsonify(game.get_view(request.args.get("player_id")))
 
 @game_bp.route("/settings", methods=["POST"])
+@serialized
 def update_settings():
     data = request.json or {}
     game_id = data.get("game_id")
@@ -81,6 +206,7 @@ def update_settings():
 
 
 @game_bp.route("/start", methods=["POST"])
+@serialized
 def start_game():
     data = request.json or {}
     game_id = data.get("game_id")
@@ -94,17 +220,19 @@ def start_game():
         return jsonify({"error": "Only host can start"}), 403
 
     try:
-        result = game.start_game()
+        # The intro is queued; without a pooled one it follows as narration_ready
+        result = _sockets().start_game(game)
         return jsonify({
             "status": "ok",
-            "result": result,  # includes background_story now
-            "game_state": game.get_state()
+            "result": result,
+            "game_state": game.get_view(host_id)
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 # ------------------- Player Night Action -------------------
 @game_bp.route("/action", methods=["POST"])
+@serialized
 def player_action():
     data = request.json or {}
     game_id = data.get("game_id")
@@ -116,8 +244,7 @@ def player_action():
         return jsonify({"error": "Game not found"}), 404
 
     # Only alive players can perform night actions
-    player_info = game.players.get(player_id)
-    if not player_info or not player_info["alive"]:
+    if not game.is_alive(player_id):
         return jsonify({"error": "Only alive players can perform night actions"}), 403
 
     try:
@@ -125,29 +252,32 @@ def player_action():
 
         if game.all_night_actions_received():
             result = game.resolve_night()  # resolves night, includes collected activities
+            result.pop("detective_results", None)  # the detective's own result is in their view
             return jsonify({
                 "status": "resolved",
                 "result": result,
-                "game_state": game.get_state()
+                "game_state": game.get_view(player_id)
             })
 
-        return jsonify({"status": "recorded", "game_state": game.get_state()})
+        return jsonify({"status": "recorded", "game_state": game.get_view(player_id)})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 
 @game_bp.route("/day/<game_id>", methods=["GET"])
+@serialized
 def start_day(game_id):
     game = games.get(game_id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
     try:
-        result = game.start_day()
-        return jsonify({"status": "ok", "result": result, "game_state": game.get_state()})
+        result = _sockets().start_day(game)  # the story is queued, see start_game()
+        return jsonify({"status": "ok", "result": result, "game_state": game.get_view(request.args.get("player_id"))})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 @game_bp.route("/vote", methods=["POST"])
+@serialized
 def vote():
     data = request.json or {}
     game_id = data.get("game_id")
@@ -159,17 +289,17 @@ def vote():
         return jsonify({"error": "Game not found"}), 404
 
     # Only alive players can vote
-    voter_info = game.players.get(voter_id)
-    if not voter_info or not voter_info["alive"]:
+    if not game.is_alive(voter_id):
         return jsonify({"error": "Only alive players can vote"}), 403
 
     try:
         game.record_vote(voter_id, target_id)
-        return jsonify({"status": "recorded", "game_state": game.get_state()})
+        return jsonify({"status": "recorded", "game_state": game.get_view(voter_id)})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 @game_bp.route("/resolve_votes", methods=["POST"])
+@serialized
 def resolve_votes():
     data = request.json or {}
     game_id = data.get("game_id")
@@ -179,12 +309,13 @@ def resolve_votes():
         return jsonify({"error": "Game not found"}), 404
 
     try:
-        result = game.resolve_votes()
-        return jsonify({"status": "resolved", "result": result, "game_state": game.get_state()})
+        result = _sockets().resolve_votes(game)  # the story is queued, see start_game()
+        return jsonify({"status": "resolved", "result": result, "game_state": game.get_view(data.get("player_id"))})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 @game_bp.route("/ready", methods=["POST"])
+@serialized
 def player_ready():
     data = request.json or {}
     game_id = data.get("game_id")
@@ -199,5 +330,98 @@ def player_ready():
     if not player_info:
         return jsonify({"error": "Player not found"}), 404
 
-    player_info["player_obj"].set_ready(ready_status)
-    return jsonify({"status": "ok", "players": game._serializable_players()})
\ No newline at end of file
+    game.set_ready(player_id, ready_status)
+    return jsonify({"status": "ok", "players": game.get_view(player_id)["players"]})
+
+# ------------------- Game Store -------------------
+@game_bp.route("/store/stats", methods=["GET"])
+@operator_only
+def game_store_stats():
+    return jsonify(games.stats())
+
+
+@game_bp.route("/mailbox/stats", methods=["GET"])
+@operator_only
+def mailbox_stats():
+    return jsonify(mailboxes.stats())
+
+
+@game_bp.route("/timers/stats", methods=["GET"])
+@operator_only
+def timer_stats():
+    return jsonify({**timer_wheel.stats(), "short": short_timer_wheel.stats()})
+
+
+# ------------------- Reaper & Archive -------------------
+@game_bp.route("/reaper/stats", methods=["GET"])
+@operator_only
+def reaper_stats():
+    return jsonify({**reaper.stats(), "archive": game_archive.stats()})
+
+
+@game_bp.route("/archive/<game_id>", methods=["GET"])
+@operator_only
+def archived_game(game_id):
+    """Final state of a finished game after the reaper moved it out of memory."""
+    game = game_archive.get(game_id)
+    if not game:
+        return jsonify({"error": "Game not found in the archive"}), 404
+    return jsonify(game.get_view())
+
+# ------------------- Tracing -------------------
+@game_bp.route("/traces", methods=["GET"])
+@operator_only
+def traces():
+    """Finished spans on this worker (the last ?limit=), for trace_report.py --url."""
+    return jsonify({"spans": tracer.spans(limit=request.args.get("limit", type=int))})
+
+
+@game_bp.route("/traces/stats", methods=["GET"])
+@operator_only
+def trace_stats():
+    return jsonify(tracer.stats())
+
+
+@game_bp.route("/traces/<game_id>", methods=["GET"])
+@operator_only
+def game_traces(game_id):
+    return jsonify({"spans": tracer.spans(game_id)})
+
+# ------------------- Narration Jobs -------------------
+@game_bp.route("/narration/stats", methods=["GET"])
+@operator_only
+def narration_stats():
+    return jsonify(narration.stats())
+
+
+@game_bp.route("/narration/pool", methods=["GET"])
+@operator_only
+def story_pool_stats():
+    return jsonify(story_pool.stats())
+
+
+@game_bp.route("/narration/speculation", methods=["GET"])
+@operator_only
+def speculation_stats():
+    return jsonify(speculator.stats())
+
+
+@game_bp.route("/narration/cache", methods=["GET"])
+@operator_only
+def narration_cache_stats():
+    return jsonify(narration_cache.stats())
+
+
+@game_bp.route("/narration/governor", methods=["GET"])
+@operator_only
+def governor_stats():
+    return jsonify(governor.stats())
+
+
+@game_bp.route("/narration/<job_id>", methods=["GET"])
+@operator_only
+def narration_job(job_id):
+    job = narration.get(job_id)
+    if not job:
+        return jsonify({"error": "Narration job not found"}), 404
+    return jsonify(job)
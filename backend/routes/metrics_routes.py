@@ -0,0 +1,34 @@
+import ipaddress
+import os
+from flask import Blueprint, Response, request, jsonify
+from game.metrics import metrics
+
+METRICS_PUBLIC = os.getenv("MAFAI_METRICS_PUBLIC", "0") == "1"  # serve /metrics and operator routes beyond loopback
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+def _is_local(address):
+    try:
+        return ipaddress.ip_address(address or "").is_loopback
+    except ValueError:
+        return False
+
+
+def is_operator_request():
+    """True for requests from this host, or from anywhere with MAFAI_METRICS_PUBLIC=1."""
+    return METRICS_PUBLIC or _is_local(request.remote_addr)
+
+
+def operator_only(view):
+    """Marks an /api route (stats, job details) as answering operators only, like /metrics."""
+    view.operator_only = True
+    return view
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """This worker's metrics in the Prometheus text format, for a local scraper."""
+    if not is_operator_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,10 @@
+"""
+Headless game simulator and load generator.
+
+Bots play whole games either against MafiaGame directly (inprocess) or
+through the real backend's /api routes and Socket.IO events (server), with
+the offline narrator so no network is needed. See __main__.py for the CLI.
+"""
+from .bots import Bot, RandomBot, CoordinatedBot, STRATEGIES, make_bots
+from .metrics import LatencyStats
+from .runner import ramp_offsets, run_load
@@ -0,0 +1,108 @@
+"""
+Headless game simulator and load generator.
+
+Bots play complete games and the simulator reports per-phase latency
+percentiles and throughput. Narration always uses the offline narrator.
+
+    # MafiaGame directly, no server: state machine, narration and view encoding
+    python -m simulator inprocess --games 500 --players 8 --concurrency 16
+
+    # The real backend over /api and Socket.IO (--url to use a running server)
+    python -m simulator server --games 50 --ramp-seconds 10 --spawn
+
+    # Capacity: hold thousands of WebSockets open, then time a broadcast to all
+    python -m simulator connections --connections 5000 --players 10 --spawn --serve
+
+Strategies: random, coordinated. --afk-rate makes that share of bots never
+act, so phases end on the server's timers (shorten them with
+--night-duration/--day-duration). --seed makes bot decisions repeatable.
+--serve spawns serve.py (eventlet) instead of app.py; the server mode's
+client needs long-polling, which is then left on.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("MAFAI_NARRATOR", "offline")
+os.environ.setdefault("MAFAI_STORY_POOL_DEPTH", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.bots import STRATEGIES  # noqa: E402
+from simulator.metrics import LatencyStats, format_summary  # noqa: E402
+from simulator.runner import run_load  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m simulator", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=("inprocess", "server", "connections"))
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--players", type=int, default=6, help="players per game (min 4)")
+    parser.add_argument("--concurrency", type=int, default=8, help="games in flight at once (connections: handshakes)")
+    parser.add_argument("--ramp-seconds", type=float, default=0.0, help="spread game starts over this long")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="random")
+    parser.add_argument("--afk-rate", type=float, default=0.0, help="share of bots that never act")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--theme", default=None)
+    parser.add_argument("--no-narration", dest="narrate", action="store_false",
+                        help="inprocess: skip story generation")
+    parser.add_argument("--url", default="http://127.0.0.1:5001", help="server: backend to drive")
+    parser.add_argument("--spawn", action="store_true", help="server: start app.py on a free port")
+    parser.add_argument("--serve", action="store_true", help="with --spawn, start serve.py (eventlet) instead of app.py")
+    parser.add_argument("--connections", type=int, default=1000, help="connections: sockets to open")
+    parser.add_argument("--hold", type=float, default=30.0, help="connections: seconds to keep them idle")
+    parser.add_argument("--night-duration", type=int, default=None, help="server: night timer for each game")
+    parser.add_argument("--day-duration", type=int, default=None, help="server: day timer for each game")
+    parser.add_argument("--timeout", type=float, default=30.0, help="server: seconds to wait for an event")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the summary here")
+    options = parser.parse_args()
+    if options.players < 4:
+        parser.error("--players must be at least 4")
+
+    import random
+    random.seed(options.seed)  # role shuffles and tie-breaks (repeatable with --concurrency 1)
+
+    stats = LatencyStats()
+    server = None
+    extra = {}
+    if options.mode == "inprocess":
+        from simulator.inprocess import play_game
+    else:
+        from simulator.server import play_game, spawn_server
+        if options.spawn:
+            script = "serve.py" if options.serve else "app.py"
+            env = {"MAFAI_TRANSPORTS": "websocket,polling"} if options.serve and options.mode == "server" else {}
+            server, options.url = spawn_server(env, script=script)
+            print(f"Started {script} at {options.url}")
+
+    try:
+        if options.mode == "connections":
+            from simulator.connections import hold_connections
+            start = time.perf_counter()
+            extra = hold_connections(options, stats, server.pid if server else None)
+            elapsed = time.perf_counter() - start
+        else:
+            elapsed = run_load(lambda index: play_game(index, options, stats),
+                               options.games, options.concurrency, options.ramp_seconds, stats)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    summary = stats.summary(elapsed)
+    summary.update(extra)
+    summary["config"] = {k: v for k, v in vars(options).items() if k != "json_path"}
+    print(format_summary(summary))
+    for name, value in extra.items():
+        print(f"  {name:<20}{value:>10}")
+    if options.json_path:
+        with open(options.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+    failed = ("games_failed", "connect_failed", "fanout_missed")
+    return 1 if any(summary["counts"].get(name) for name in failed) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
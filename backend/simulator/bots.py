@@ -0,0 +1,126 @@
+import random
+
+
+class Seat:
+    """What a bot knows when it has to decide: the table as its player sees it."""
+
+    def __init__(self, player_id, role, alive, seats, teammates=(), known_roles=None, votes=None):
+        self.player_id = player_id
+        self.role = role
+        self.alive = list(alive)            # alive player ids, in seat order
+        self.seats = list(seats)            # every player id, in seat order
+        self.teammates = set(teammates)     # other mafia (mafia only)
+        self.known_roles = known_roles or {}  # player_id -> role the detective found
+        self.votes = votes or {}            # voter_id -> target_id so far today
+
+    def others(self):
+        return [pid for pid in self.alive if pid != self.player_id]
+
+
+class Bot:
+    """
+    One simulated player. Subclasses pick night targets and day votes.
+
+    An AFK bot never acts, so its phases only end when the server's phase
+    timers run out (or the simulator forces them, in process).
+    """
+
+    name = "base"
+
+    def __init__(self, player_id, rng, afk=False):
+        self.player_id = player_id
+        self.rng = rng
+        self.afk = afk
+
+    def night_action(self, seat):
+        """Returns the player_action for this night, or None."""
+        if self.afk or seat.role not in ("mafia", "doctor", "detective"):
+            return None
+        target = self.night_target(seat)
+        if target is None:
+            return None
+        atype = {"mafia": "kill", "doctor": "save", "detective": "investigate"}[seat.role]
+        return {"type": atype, "target": target, "activity": f"{self.name} bot {atype}s"}
+
+    def vote(self, seat):
+        """Returns the target to vote for ("skip" allowed), or None to not vote."""
+        if self.afk:
+            return None
+        return self.vote_target(seat)
+
+    def night_target(self, seat):
+        raise NotImplementedError
+
+    def vote_target(self, seat):
+        raise NotImplementedError
+
+
+class RandomBot(Bot):
+    """Picks uniformly among legal targets; skips 10% of votes."""
+
+    name = "random"
+
+    def night_target(self, seat):
+        if seat.role == "mafia":
+            choices = [pid for pid in seat.others() if pid not in seat.teammates]
+        elif seat.role == "doctor":
+            choices = seat.alive
+        else:
+            choices = seat.others()
+        return self.rng.choice(choices) if choices else None
+
+    def vote_target(self, seat):
+        if self.rng.random() < 0.1 or not seat.others():
+            return "skip"
+        return self.rng.choice(seat.others())
+
+
+class CoordinatedBot(Bot):
+    """
+    Plays like a table that talks: mafia agree on the first town player in
+    seat order, the detective works through unchecked players, and the town
+    votes for a found mafia or joins the current leader.
+    """
+
+    name = "coordinated"
+
+    def night_target(self, seat):
+        if seat.role == "mafia":
+            town = [pid for pid in seat.others() if pid not in seat.teammates]
+            return town[0] if town else None
+        if seat.role == "doctor":
+            return self.rng.choice(seat.alive)
+        unchecked = [pid for pid in seat.others() if pid not in seat.known_roles]
+        return unchecked[0] if unchecked else self.rng.choice(seat.others() or [seat.player_id])
+
+    def vote_target(self, seat):
+        others = seat.others()
+        if not others:
+            return "skip"
+        if seat.role == "mafia":
+            town = [pid for pid in others if pid not in seat.teammates]
+            return town[0] if town else "skip"
+        found = [pid for pid in others if seat.known_roles.get(pid) == "mafia"]
+        if found:
+            return found[0]
+
+        counts = {}
+        for target in seat.votes.values():
+            if target != "skip" and target != seat.player_id and target in seat.alive:
+                counts[target] = counts.get(target, 0) + 1
+        if counts:
+            return max(counts, key=counts.get)
+        return self.rng.choice(others)
+
+
+STRATEGIES = {"random": RandomBot, "coordinated": CoordinatedBot}
+
+
+def make_bots(player_ids, strategy, seed, game_index, afk_rate=0.0):
+    """One bot per player; each gets its own RNG derived from (seed, game, seat)."""
+    bots = {}
+    for seat, player_id in enumerate(player_ids):
+        rng = random.Random(f"{seed}:{game_index}:{seat}")
+        afk = rng.random() < afk_rate
+        bots[player_id] = STRATEGIES[strategy](player_id, rng, afk=afk)
+    return bots
@@ -0,0 +1,297 @@
+import json
+import selectors
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+from .server import _http
+
+CONNECT_TIMEOUT = 30
+
+
+class Socket:
+    """
+    A bare Socket.IO client over a WebSocket (Engine.IO v4). It only records
+    when each event arrives; the SocketPool it belongs to does all the I/O.
+    """
+
+    def __init__(self, pool, conn, sock):
+        self.pool = pool
+        self.conn = conn        # wsproto.WSConnection
+        self.sock = sock
+        self.events = {}        # event name -> arrival times (perf_counter)
+        self.connected = None   # perf_counter when the Socket.IO "40" arrived
+        self.closed = False
+        self._text = []
+
+    def emit(self, event, data):
+        self.pool.send(self, "42" + json.dumps([event, data]))
+
+    def wait(self, event, after, timeout):
+        """Returns the arrival time of the first event received at or after after, or None."""
+        return self.pool.wait(lambda: next((t for t in self.events.get(event, ()) if t >= after), None),
+                              self, timeout)
+
+    def wait_connected(self, timeout):
+        return self.pool.wait(lambda: self.connected, self, timeout)
+
+    def close(self):
+        self.pool.close(self)
+
+
+class SocketPool:
+    """
+    Thousands of Sockets driven by one selector thread, so the load generator
+    measures the server rather than its own thread scheduling.
+    """
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.address = (parts.hostname, parts.port or 80)
+        self.target = "/socket.io/?EIO=4&transport=websocket"
+        self.selector = selectors.DefaultSelector()
+        self.changed = threading.Condition()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self.selector.register(self._wake_r, selectors.EVENT_READ)
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def open(self):
+        """Starts the handshake for a new Socket and returns it (use wait_connected)."""
+        from wsproto import ConnectionType, WSConnection
+        from wsproto.events import Request
+
+        sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+        conn = WSConnection(ConnectionType.CLIENT)
+        client = Socket(self, conn, sock)
+        with self.changed:
+            sock.sendall(conn.send(Request(host=f"{self.address[0]}:{self.address[1]}", target=self.target)))
+            self.selector.register(sock, selectors.EVENT_READ, client)
+        self._wake_w.send(b"x")  # so select() picks up the new socket
+        return client
+
+    def send(self, client, text):
+        from wsproto.events import TextMessage
+
+        with self.changed:
+            if client.closed:
+                return
+            try:
+                client.sock.sendall(client.conn.send(TextMessage(data=text)))
+            except OSError:
+                self._drop(client)
+
+    def wait(self, ready, client, timeout):
+        deadline = time.monotonic() + timeout
+        with self.changed:
+            while True:
+                value = ready()
+                if value is not None:
+                    return value
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or client.closed:
+                    return None
+                self.changed.wait(remaining)
+
+    def close(self, client):
+        from wsproto.events import CloseConnection
+
+        with self.changed:
+            if client.closed:
+                return
+            try:
+                client.sock.sendall(client.conn.send(CloseConnection(code=1000)))
+            except Exception:
+                pass
+            self._drop(client)
+
+    def shutdown(self):
+        self._running = False
+        self._wake_w.send(b"x")
+        self._thread.join()
+
+    def _drop(self, client):
+        client.closed = True
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+        self.changed.notify_all()
+
+    def _loop(self):
+        while self._running:
+            for key, _ in self.selector.select(1):
+                if key.fileobj is self._wake_r:
+                    self._wake_r.recv(4096)
+                    continue
+                client = key.data
+                try:
+                    data = client.sock.recv(65536)
+                except OSError:
+                    data = b""
+                with self.changed:
+                    if client.closed:
+                        continue
+                    if not data:
+                        self._drop(client)
+                        continue
+                    client.conn.receive_data(data)
+                    self._handle(client)
+                    self.changed.notify_all()
+
+    def _handle(self, client):
+        """Processes the wsproto events buffered for client (called with the lock held)."""
+        from wsproto.events import CloseConnection, RejectConnection, TextMessage
+
+        replies = []
+        for event in client.conn.events():
+            if isinstance(event, (CloseConnection, RejectConnection)):
+                self._drop(client)
+                return
+            if not isinstance(event, TextMessage):
+                continue
+            client._text.append(event.data)
+            if not event.message_finished:
+                continue
+            packet = "".join(client._text)
+            client._text = []
+            if packet.startswith("0"):
+                replies.append("40")  # Engine.IO open -> Socket.IO connect
+            elif packet == "2":
+                replies.append("3")   # pong
+            elif packet.startswith("40"):
+                client.connected = time.perf_counter()
+            elif packet.startswith("42"):
+                event_name = json.loads(packet[2:])[0]
+                client.events.setdefault(event_name, []).append(time.perf_counter())
+        for text in replies:
+            self.send(client, text)
+
+
+def _rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def hold_connections(options, stats, server_pid=None):
+    """
+    Opens options.connections sockets, options.players per game, holds them
+    for options.hold seconds (the server keeps pinging them) and then starts
+    every game, timing how long game_started takes to reach each socket.
+    Returns extra figures for the summary (server memory when server_pid is given).
+    """
+    import requests
+
+    session = requests.Session()
+    api = options.url.rstrip("/") + "/api"
+    seats = []   # (game_id, player_id, host_id)
+    for _ in range(-(-options.connections // options.players)):
+        created = _http(session, stats, "http_create", "POST", f"{api}/create",
+                        json={"host_name": "bot-0", "theme": options.theme})
+        game_id, host_id = created["game_id"], created["host_id"]
+        seats.append((game_id, host_id, host_id))
+        for seat in range(1, options.players):
+            joined = _http(session, stats, "http_join", "POST", f"{api}/join",
+                           json={"game_id": game_id, "name": f"bot-{seat}"})
+            seats.append((game_id, joined["player_id"], host_id))
+    seats = seats[:options.connections]
+
+    rss_before = _rss_kb(server_pid) if server_pid else None
+    pool = SocketPool(options.url)
+    sockets = [None] * len(seats)
+    step = options.ramp_seconds / len(seats) if options.ramp_seconds else 0
+
+    # Handshakes go out options.concurrency at a time (spread over --ramp-seconds)
+    start = time.perf_counter()
+    for first in range(0, len(seats), options.concurrency):
+        batch = range(first, min(first + options.concurrency, len(seats)))
+        opened = {}
+        for index in batch:
+            delay = start + index * step - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                opened[index] = (pool.open(), time.perf_counter())
+            except OSError as e:
+                stats.count("connect_failed")
+                print(f"Connection for {seats[index][1]} failed: {e!r}")
+        for index, (sock, began) in opened.items():
+            connected = sock.wait_connected(options.timeout)
+            if connected is None:
+                stats.count("connect_failed")
+                print(f"Connection for {seats[index][1]} failed: no Socket.IO connect")
+                sock.close()
+                continue
+            stats.record("ws_connect", connected - began)
+            sockets[index] = sock
+        # Join every game room of the batch, then wait for each first state_update
+        joined = time.perf_counter()
+        for index in batch:
+            if sockets[index]:
+                game_id, player_id, _ = seats[index]
+                sockets[index].emit("join", {"game_id": game_id, "player_id": player_id})
+        for index in batch:
+            if not sockets[index]:
+                continue
+            arrived = sockets[index].wait("state_update", joined, options.timeout)
+            if arrived is None:
+                stats.count("connect_failed")
+                print(f"Join for {seats[index][1]} failed: no state_update")
+                sockets[index].close()
+                sockets[index] = None
+                continue
+            stats.record("join", arrived - joined)
+            stats.count("connected")
+    stats.record("connect_all", time.perf_counter() - start)
+    rss_connected = _rss_kb(server_pid) if server_pid else None
+
+    print(f"{stats.summary(1)['counts'].get('connected', 0)} sockets open, holding for {options.hold:.0f}s")
+    time.sleep(options.hold)
+    dropped = sum(1 for sock in sockets if sock and sock.closed)
+    stats.count("dropped_while_idle", dropped)
+
+    # Fan-out: each host starts its game, every socket in it should get game_started
+    games = {}
+    for (game_id, _, host_id), sock in zip(seats, sockets):
+        games.setdefault(game_id, (host_id, []))[1].append(sock)
+    started = {}
+    for game_id, (host_id, members) in games.items():
+        host = next((s for s in members if s), None)
+        if host:
+            started[game_id] = time.perf_counter()
+            host.emit("start_game", {"game_id": game_id, "host_id": host_id})
+    for game_id, (host_id, members) in games.items():
+        if game_id not in started:
+            continue
+        last = None
+        for sock in members:
+            if not sock:
+                continue
+            arrived = sock.wait("game_started", started[game_id], options.timeout)
+            if arrived is None:
+                stats.count("fanout_missed")
+                continue
+            stats.record("fanout", arrived - started[game_id])
+            last = max(last or arrived, arrived)
+        if last:
+            stats.record("fanout_game_last", last - started[game_id])
+
+    for sock in sockets:
+        if sock:
+            sock.close()
+    pool.shutdown()
+    extra = {}
+    if rss_before and rss_connected:
+        connected = stats.summary(1)["counts"].get("connected", 0)
+        extra = {
+            "server_rss_mb": round(rss_connected / 1024, 1),
+            "server_kb_per_socket": round((rss_connected - rss_before) / max(connected, 1), 1),
+        }
+    return extra
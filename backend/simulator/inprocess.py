@@ -0,0 +1,87 @@
+from game.model import Player
+from game.state_machine import MafiaGame, GameState
+from .bots import Seat, make_bots
+
+MAX_ROUNDS = 50  # stops a game of AFK bots that can never end
+
+
+def _seat(game, player_id, known_roles):
+    player = game.players[player_id]
+    teammates = game.alive_by_role("mafia") if player.role == "mafia" else ()
+    return Seat(player_id, player.role, game.alive_players(), list(game.players),
+                teammates=[pid for pid in teammates if pid != player_id],
+                known_roles=known_roles.get(player_id), votes=dict(game.votes))
+
+
+def _publish(game, stats):
+    """What the server does after each command: commit a version and encode every player's view."""
+    with stats.timer("publish"):
+        game.commit_state()
+        game.view_json()
+        for player_id in game.players:
+            game.view_json(player_id)
+
+
+def play_game(index, options, stats):
+    """
+    Plays one game against MafiaGame in this process and records how long
+    each step took. Phases the bots leave unfinished (AFK players) are
+    resolved the way the server's phase timers would.
+    """
+    with stats.timer("create"):
+        game = MafiaGame(Player("bot-0"), options.theme)
+    with stats.timer("join"):
+        for seat in range(1, options.players):
+            game.add_player(Player(f"bot-{seat}"))
+    _publish(game, stats)
+
+    bots = make_bots(list(game.players), options.strategy, options.seed, index, options.afk_rate)
+    known_roles = {}  # detective id -> {player_id: role}
+
+    with stats.timer("start"):
+        # Same steps as the start_game socket handler
+        game.assign_roles()
+        game.start_game(narrate=options.narrate)
+        game.start_night()
+    _publish(game, stats)
+
+    rounds = 0
+    while game.state != GameState.END and rounds < MAX_ROUNDS:
+        rounds += 1
+        # Night
+        with stats.timer("night_actions"):
+            for player_id in game.alive_players():
+                action = bots[player_id].night_action(_seat(game, player_id, known_roles))
+                if action:
+                    game.record_action(player_id, action)
+                    stats.count("commands")
+        if not game.all_night_actions_received():
+            stats.count("nights_timed_out")
+        with stats.timer("resolve_night"):
+            game.resolve_night()
+        for player_id, result in game.detective_results.items():
+            known_roles.setdefault(player_id, {})[result["target"]] = result["role"]
+        _publish(game, stats)
+        if game.state == GameState.END:
+            break
+
+        with stats.timer("start_day"):
+            game.start_day(narrate=options.narrate)
+        _publish(game, stats)
+
+        # Day
+        with stats.timer("votes"):
+            for player_id in game.alive_players():
+                target = bots[player_id].vote(_seat(game, player_id, known_roles))
+                if target:
+                    game.record_vote(player_id, target)
+                    stats.count("commands")
+        if not game.all_votes_received():
+            stats.count("days_timed_out")
+        with stats.timer("resolve_votes"):
+            game.resolve_votes(narrate=options.narrate, force=True)
+        _publish(game, stats)
+
+    stats.count("events", game.seq)
+    stats.count("rounds", rounds)
+    return game
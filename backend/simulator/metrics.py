@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class LatencyStats:
+    """Latency samples per phase plus plain counters, safe to share between game threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(list)
+        self._counts = defaultdict(int)
+
+    def record(self, phase, seconds):
+        with self._lock:
+            self._samples[phase].append(seconds)
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        yield
+        self.record(phase, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counts[name] += n
+
+    def summary(self, elapsed):
+        """Per-phase percentiles (ms) and throughput over elapsed seconds."""
+        with self._lock:
+            phases = {}
+            for phase, samples in self._samples.items():
+                ms = sorted(s * 1000 for s in samples)
+                phases[phase] = {
+                    "count": len(ms),
+                    "mean_ms": round(sum(ms) / len(ms), 3),
+                    "p50_ms": round(percentile(ms, 50), 3),
+                    "p90_ms": round(percentile(ms, 90), 3),
+                    "p99_ms": round(percentile(ms, 99), 3),
+                    "max_ms": round(ms[-1], 3),
+                }
+            counts = dict(self._counts)
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "phases": phases,
+            "counts": counts,
+            "throughput_per_s": {name: round(n / elapsed, 2) for name, n in counts.items()} if elapsed else {},
+        }
+
+
+def format_summary(summary):
+    lines = [f"{'phase':<22}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for phase, row in sorted(summary["phases"].items()):
+        lines.append(f"{phase:<22}{row['count']:>8}{row['p50_ms']:>10.2f}{row['p90_ms']:>10.2f}"
+                     f"{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}")
+    lines.append("")
+    lines.append(f"elapsed {summary['elapsed_s']:.2f}s")
+    for name, n in sorted(summary["counts"].items()):
+        lines.append(f"  {name:<20}{n:>10}  ({summary['throughput_per_s'].get(name, 0)}/s)")
+    return "\n".join(lines)
@@ -0,0 +1,41 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def ramp_offsets(games, ramp_seconds):
+    """Start times (seconds from the beginning) spreading games evenly over the ramp."""
+    if games <= 1 or ramp_seconds <= 0:
+        return [0.0] * games
+    step = ramp_seconds / games
+    return [i * step for i in range(games)]
+
+
+def run_load(play_game, games, concurrency, ramp_seconds, stats):
+    """
+    Runs play_game(index) for every game, starting them along the ramp with at
+    most concurrency games in flight. Failures are counted, not raised.
+    Returns the elapsed wall time in seconds.
+    """
+    slots = threading.Semaphore(concurrency)
+
+    def play(index):
+        try:
+            play_game(index)
+            stats.count("games_finished")
+        except Exception as e:
+            stats.count("games_failed")
+            print(f"Game {index} failed: {e!r}")
+        finally:
+            slots.release()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="sim-game") as pool:
+        for index, offset in enumerate(ramp_offsets(games, ramp_seconds)):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            slots.acquire()
+            stats.count("games_started")
+            pool.submit(play, index)
+    return time.perf_counter() - start
@@ -0,0 +1,198 @@
+import os
+import queue
+import socket
+import subprocess
+import sys
+import time
+from .bots import Seat, make_bots
+
+MAX_ROUNDS = 50
+
+
+class Table:
+    """
+    A Socket.IO connection that plays every bot of one game.
+
+    It joins as the host, so broadcasts carry the host's view of the game;
+    each bot's own role and detective results come from /api/state with its
+    player_id, as the real client would fetch them.
+    """
+
+    def __init__(self, url, game_id, host_id, timeout):
+        import socketio
+
+        self.url = url
+        self.game_id = game_id
+        self.host_id = host_id
+        self.timeout = timeout
+        self.events = queue.Queue()
+        self.client = socketio.Client(reconnection=False)
+        self.client.on("*", lambda event, data=None: self.events.put((event, data or {})))
+        self.client.connect(url, wait_timeout=timeout)
+
+    def emit(self, event, data):
+        self.client.emit(event, {"game_id": self.game_id, **data})
+
+    def wait(self, event, timeout=None, match=None):
+        """Returns the payload of the next event called event (for which match(payload) holds)."""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No {event} for game {self.game_id}")
+            try:
+                name, data = self.events.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if name == "error":
+                raise RuntimeError(f"Server error in game {self.game_id}: {data.get('msg')}")
+            if name == event and (match is None or match(data)):
+                return data
+
+    def close(self):
+        self.client.disconnect()
+
+
+def _http(session, stats, phase, method, url, **kwargs):
+    with stats.timer(phase):
+        response = session.request(method, url, timeout=30, **kwargs)
+    stats.count("http_requests")
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {url} -> {response.status_code} {response.text[:200]}")
+    return response.json()
+
+
+def _seat(view, player_id, votes=None):
+    players = view["players"]
+    me = players[player_id]
+    alive = [pid for pid, p in players.items() if p["alive"]]
+    teammates = [pid for pid, p in players.items()
+                 if pid != player_id and p["role"] == "mafia"] if me["role"] == "mafia" else ()
+    result = (view.get("detective_results") or {}).get(player_id)
+    known = {result["target"]: result["role"]} if result else {}
+    return Seat(player_id, me["role"], alive, list(players), teammates=teammates,
+                known_roles=known, votes=votes)
+
+
+def play_game(index, options, stats):
+    """
+    Plays one game through the real server: HTTP to create and join, then
+    Socket.IO events for everything else. Each phase's latency is measured
+    from the command that should end it to the event announcing the result.
+    """
+    import requests
+
+    session = requests.Session()
+    api = options.url.rstrip("/") + "/api"
+    created = _http(session, stats, "http_create", "POST", f"{api}/create",
+                    json={"host_name": "bot-0", "theme": options.theme})
+    game_id, host_id = created["game_id"], created["host_id"]
+    player_ids = [host_id]
+    for seat in range(1, options.players):
+        joined = _http(session, stats, "http_join", "POST", f"{api}/join",
+                       json={"game_id": game_id, "name": f"bot-{seat}"})
+        player_ids.append(joined["player_id"])
+    if options.night_duration or options.day_duration:
+        settings = {k: v for k, v in (("night_duration", options.night_duration),
+                                      ("day_duration", options.day_duration)) if v}
+        _http(session, stats, "http_settings", "POST", f"{api}/settings",
+              json={"game_id": game_id, "host_id": host_id, "settings": settings})
+
+    bots = make_bots(player_ids, options.strategy, options.seed, index, options.afk_rate)
+    phase_timeout = max(options.night_duration or 60, options.day_duration or 120) + options.timeout
+    table = Table(options.url, game_id, host_id, options.timeout)
+    try:
+        with stats.timer("socket_join"):
+            table.emit("join", {"player_id": host_id})
+            table.wait("state_update")
+
+        with stats.timer("start"):
+            table.emit("start_game", {"host_id": host_id})
+            state = table.wait("game_started", match=lambda d: d.get("game_state"))["game_state"]
+        stats.count("commands")
+
+        def views():
+            return {pid: _http(session, stats, "http_state", "GET", f"{api}/state/{game_id}",
+                               params={"player_id": pid}) for pid in player_ids}
+
+        rounds = 0
+        while state["state"] != "END" and rounds < MAX_ROUNDS:
+            rounds += 1
+            round_number = state["round"]
+
+            # Night: everyone acts, then the last action (or the timer) ends it
+            player_views = views()
+            everyone_acted = True
+            for pid in [pid for pid, p in state["players"].items() if p["alive"]]:
+                action = bots[pid].night_action(_seat(player_views[pid], pid))
+                if action:
+                    table.emit("player_action", {"player_id": pid, "action": action})
+                    stats.count("commands")
+                elif player_views[pid]["players"][pid]["role"] in ("mafia", "doctor", "detective"):
+                    everyone_acted = False
+            start = time.perf_counter()
+            state = table.wait("night_resolved", timeout=phase_timeout)["game_state"]
+            stats.record("night" if everyone_acted else "night_timed_out", time.perf_counter() - start)
+            if state["state"] == "END":
+                break
+            state = table.wait("day_started",
+                               match=lambda d: d.get("game_state", {}).get("round") == round_number)["game_state"]
+
+            # Day: votes go in one by one so bandwagon bots can follow the leader
+            player_views = views()
+            votes = {}
+            alive = [pid for pid, p in state["players"].items() if p["alive"]]
+            for pid in alive:
+                target = bots[pid].vote(_seat(player_views[pid], pid, votes))
+                if target:
+                    votes[pid] = target
+                    table.emit("cast_vote", {"voter_id": pid, "target_id": target})
+                    stats.count("commands")
+            start = time.perf_counter()
+            resolved = table.wait("votes_resolved", timeout=phase_timeout, match=lambda d: "result" in d)
+            stats.record("votes" if len(votes) == len(alive) else "votes_timed_out", time.perf_counter() - start)
+            if resolved["result"].get("game_over"):
+                break
+            state = _http(session, stats, "http_state", "GET", f"{api}/state/{game_id}")
+        stats.count("rounds", rounds)
+    finally:
+        table.close()
+
+
+# ------------------- Local Server -------------------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(extra_env=None, timeout=30, script="app.py"):
+    """
+    Starts app.py (or serve.py, the eventlet server) on a free port with the
+    offline narrator and returns (process, url) once it accepts connections.
+    """
+    port = _free_port()
+    env = {
+        **os.environ,
+        "MAFAI_PORT": str(port),
+        "MAFAI_DEBUG": "0",
+        "MAFAI_ALLOW_WERKZEUG": "1",
+        "MAFAI_NARRATOR": "offline",
+        "MAFAI_STORY_POOL_DEPTH": "0",
+        **(extra_env or {}),
+    }
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen([sys.executable, script], cwd=backend, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{script} exited with {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError(f"{script} did not start listening in time")
@@ -1,45 +1,629 @@
-from flask_socketio import emit, join_room
+import functools
+import math
+import time
+from flask_socketio import emit
 from flask import request
+from game import sharding
 from game.state_machine import MafiaGame, GameState
-from routes.game_routes import games  # in-memory game store
+from game.ai import generate_background_story, generate_mafia_story, generate_vote_results
+from game.narration import narration, NARRATION_STREAMING
+from game.story_pool import story_pool
+from game.speculation import speculator
+from game.wire import RawJSON, ENCODINGS, encode_payload
+from game.message_queue import ListenOnce
+from game.mailbox import mailboxes
+from game.timers import timer_wheel, short_timer_wheel, PHASE_TIMERS, PHASE_TICK_INTERVAL, EMIT_COALESCE_WINDOW
+from game.reaper import reaper
+from game.metrics import metrics, socket_emits_coalesced, socket_handler_seconds, socket_handler_errors
+from game.tracing import tracer
+from routes.game_routes import games  # GameStore, see game/store.py
 
 # socketio will be injected from app.py
 socketio = None
-player_sessions = {}
-players_continued = {}  # {game_id: set(player_id)}
+# Kept by the worker that owns the game (see game/sharding.py)
+player_sessions = {}  # sid -> {"player_id", "game_id"}; clients re-send join after a reconnect or restart
+game_sids = {}      # game_id -> sids that joined the game, on any worker
+patch_sids = set()  # sids that asked for state_patch events instead of full snapshots
+private_sent = {}   # patch sid -> last private_view() sent to it
+sid_encodings = {}  # sid -> payload encoding it asked for at join, when not plain JSON (game/wire.py)
+phase_deadlines = {}  # game_id -> ((state, round), monotonic deadline) of the running phase timer
+coalesced = {}      # game_id -> [event, payload, state_key, players_key, merged] waiting for its window to end
+
+# Kept by the worker holding the connection
+connections = {}    # sid -> game_id, so a disconnect can be routed to the game's owner
+
+# narration kind -> (phase event older clients listen for, payload key for the text)
+NARRATION_EVENTS = {
+    "background": ("game_started", "background_story"),
+    "day": ("day_started", "story"),
+    "votes": ("votes_resolved", "story"),
+}
+
+
+# ------------------- State Publication -------------------
+# Clients that join with {"patches": true} sit in "<game_id>/patch" and get
+# state_patch events for the spectator view, private_state for what only they
+# may see, and a snapshot on join. Everyone else sits in "<game_id>/full" and
+# keeps receiving their own full view of the game inside each event. Joining
+# with {"encoding": "deflate"} as well gets the larger per-client payloads
+# deflated (see game/wire.py).
+
+def _full_room(game_id):
+    return f"{game_id}/full"
+
+
+def _patch_room(game_id):
+    return f"{game_id}/patch"
+
+
+def _viewer(game, sid):
+    """The player a sid watches the game as, or None for spectators."""
+    session = player_sessions.get(sid)
+    if session and session["game_id"] == game.id:
+        return session["player_id"]
+    return None
+
+
+def _enter_room(sid, room):
+    # Through the server rather than flask_socketio.join_room, so this also
+    # works for connections held by another worker
+    socketio.server.enter_room(sid, room, namespace="/")
+
+
+def _leave_room(sid, room):
+    socketio.server.leave_room(sid, room, namespace="/")
+
+
+def _game_sids(game, patches):
+    """The game's patch clients (patches=True) or full-state clients."""
+    return [sid for sid in game_sids.get(game.id, ()) if (sid in patch_sids) == patches]
+
+
+def _emit_to(sid, event, payload):
+    """Emits to one client, in the encoding it asked for at join."""
+    socketio.emit(event, encode_payload(event, payload, sid_encodings.get(sid)), room=sid)
+
+
+def _send_private(game, sid):
+    """Sends private_state to a patch client if its private view changed."""
+    private = game.private_view(_viewer(game, sid))
+    if private_sent.get(sid) != private:
+        private_sent[sid] = private
+        socketio.emit("private_state", {"game_id": game.id, **private}, room=sid)
+
+
+def _publish_state(game):
+    """Commits the game's pending changes and sends them to patch clients."""
+    with tracer.span("publish_state", game.id, game.round):
+        patch = game.commit_state()
+        if patch:
+            socketio.emit("state_patch", patch, room=_patch_room(game.id))
+            for sid in _game_sids(game, patches=True):
+                _send_private(game, sid)
+    return patch
+
+
+def _send_snapshot(game, sid):
+    private_sent.pop(sid, None)
+    _emit_to(sid, "state_snapshot", {
+        "game_id": game.id,
+        "version": game.version,
+        "state": RawJSON(game.view_json()),
+    })
+    _send_private(game, sid)
+
+
+def _full_payload(game, sid, payload, state_key, players_key):
+    """payload plus the sid's view; the views are encoded once per version."""
+    viewer = _viewer(game, sid)
+    full_payload = dict(payload)
+    if state_key:
+        full_payload[state_key] = RawJSON(game.view_json(viewer))
+    if players_key:
+        full_payload[players_key] = RawJSON(game.view_json(viewer, "players"))
+    return full_payload
+
+
+def _broadcast(game, event, payload, state_key=None, players_key=None, to=None, coalesce=False):
+    """
+    Emits an event for a game after publishing its latest state.
+
+    Full-state clients get their view of the game under state_key and its
+    player list under players_key; patch clients get "state_version" instead,
+    since the state_patch sent just before already brought them up to date.
+    With to=sid only that client gets the event. With coalesce=True the
+    event may wait (see Emit Coalescing below).
+    """
+    if coalesce and EMIT_COALESCE_WINDOW > 0 and to is None:
+        _coalesce(game, event, payload, state_key, players_key)
+        return
+    _flush_coalesced(game)  # whatever led up to this event goes first
+    with tracer.span("emit:" + event, game.id, game.round):
+        _send_event(game, event, payload, state_key, players_key, to)
+
+
+def _send_event(game, event, payload, state_key, players_key, to):
+    _publish_state(game)
+    if not state_key and not players_key:
+        socketio.emit(event, payload, room=to or game.id)
+        return
+
+    patch_payload = {**payload, "state_version": game.version}
+    if to:
+        if to in patch_sids:
+            socketio.emit(event, patch_payload, room=to)
+        else:
+            _emit_to(to, event, _full_payload(game, to, payload, state_key, players_key))
+        return
+
+    for sid in _game_sids(game, patches=False):
+        _emit_to(sid, event, _full_payload(game, sid, payload, state_key, players_key))
+    socketio.emit(event, patch_payload, room=_patch_room(game.id))
+
+
+# ------------------- Emit Coalescing -------------------
+# Every join and ready toggle in the lobby rebroadcasts the player list, so a
+# full lobby pressing ready at once would send players^2 lists. Those events
+# are coalesced instead: the first one waits EMIT_COALESCE_WINDOW, later ones
+# of the same event replace it, and a single broadcast with the latest state
+# goes out when the window ends. Any other event for the game sends the
+# waiting one first, so phase events never overtake it.
+
+def _coalesce(game, event, payload, state_key, players_key):
+    pending = coalesced.get(game.id)
+    if pending and pending[0] != event:
+        _flush_coalesced(game)
+        pending = None
+    if pending:
+        # The views are taken when the broadcast goes out, so only the keys
+        # asked for and the newest payload need keeping
+        pending[1] = payload
+        pending[2] = pending[2] or state_key
+        pending[3] = pending[3] or players_key
+        pending[4] += 1
+        socket_emits_coalesced.inc(event)
+        return
+    coalesced[game.id] = [event, payload, state_key, players_key, 0]
+    short_timer_wheel.schedule(("coalesce", game.id), EMIT_COALESCE_WINDOW,
+                               lambda: mailboxes.submit(game.id, _flush_coalesced, game))
+
+
+def _flush_coalesced(game):
+    """Sends the game's waiting coalesced event, if any."""
+    pending = coalesced.pop(game.id, None)
+    if pending is None:
+        return
+    short_timer_wheel.cancel(("coalesce", game.id))
+    event, payload, state_key, players_key, merged = pending
+    if games.get(game.id) is not game:
+        return  # the game is gone
+    with tracer.span("emit:" + event, game.id, game.round, coalesced=merged):
+        _send_event(game, event, payload, state_key, players_key, None)
+
+
+def _narration_is_current(game, job):
+    """True if a finished narration job still belongs to the game's current phase."""
+    if job is None or job.round != game.round:
+        return False
+    if job.kind == "background":
+        return game.state == GameState.NIGHT
+    if job.kind == "votes":
+        return game.state in (GameState.NIGHT, GameState.END)
+    return job.kind == "day" and game.state == GameState.DISCUSSION
+
+
+def _emit_narration(game, job, to=None):
+    """Sends a finished narration job to the game's room (or a single sid)."""
+    # Streamed jobs close with narration_done; the others arrive whole as narration_ready
+    _broadcast(game, "narration_done" if job.streamed else "narration_ready",
+               job.to_dict(), state_key="game_state", to=to)
+
+    # Older clients only listen for the phase events, so repeat them with the text filled in
+    event, key = NARRATION_EVENTS[job.kind]
+    _broadcast(game, event, {key: job.text, "narration_job": job.id}, state_key="game_state", to=to)
+
+
+def _on_narration_ready(game):
+    def on_ready(job):
+        # Narration finishes on its own threads; the game only changes on its mailbox
+        mailboxes.submit(game.id, _record_narration, game, job)
+    return on_ready
+
+
+def _record_narration(game, job):
+    with tracer.span("narration_ready", game.id, job.round, kind=job.kind, status=job.status):
+        _apply_narration(game, job)
+
+
+def _apply_narration(game, job):
+    if job.kind == "background":
+        game.record_background_story(job.text)
+    elif job.kind == "day":
+        game.record_day_story(job.text, job.round)
+    elif job.kind == "votes":
+        game.record_vote_story(job.text)
+    _emit_narration(game, job)
+
+
+def _on_narration_chunk(game):
+    def on_chunk(job, seq, text):
+        socketio.emit("narration_chunk", {
+            "job_id": job.id,
+            "kind": job.kind,
+            "round": job.round,
+            "seq": seq,
+            "text": text,
+        }, room=game.id)
+    return on_chunk
+
+
+def _submit_narration(game, kind, fn, args, fallback):
+    """Queues a narration job for the game and returns its id."""
+    return narration.submit(
+        game.id, kind, fn, args,
+        fallback=fallback,
+        on_ready=_on_narration_ready(game),
+        round_number=game.round,
+        on_chunk=_on_narration_chunk(game) if NARRATION_STREAMING else None,
+    )
+
+
+def _resolve_votes(game, force=False):
+    """Resolves votes right away and queues the vote narration."""
+    result = game.resolve_votes(narrate=False, force=force)
+    if "outcome" in result:
+        result["narration_job"] = _submit_narration(
+            game, "votes", generate_vote_results, game.vote_story_inputs(), game.fallback_vote_story()
+        )
+    return result
+
+
+def _finish_night(game):
+    """Resolves the night with the actions received so far and starts the day."""
+    # Resolve night phase (this should generate a story)
+    result = game.resolve_night()
+
+    # Detective results travel in each detective's own view of the state
+    public_result = {k: v for k, v in result.items() if k != "detective_results"}
+    _broadcast(game, "night_resolved", {
+        "result": public_result,
+        "story": result.get("story") or "The night has ended...",
+    }, state_key="game_state")
+
+    # Then start day; the story follows as narration_ready
+    story, job_id = _start_day(game)
+    _broadcast(game, "day_started", {
+        "story": story,
+        "narration_job": job_id,
+    }, state_key="game_state")
+    _arm_phase_timer(game)
+
+
+def _start_day(game):
+    """Moves a resolved night to DISCUSSION and queues its story; returns (story, job_id)."""
+    night_activities, special_actions = game.day_story_inputs()
+    fallback = game.fallback_day_story()
+    game.start_day(narrate=False)
+
+    # Prefer a story speculated while the last actor was deciding
+    story, job_id = None, None
+    candidate = speculator.claim(game.id, game.round, special_actions)
+    if candidate and candidate.done() and candidate.exception():
+        candidate = None
+    # Not started yet: write the real story at day priority instead of waiting behind prefetches
+    if candidate and candidate.cancel():
+        candidate = None
+    if candidate and candidate.done():
+        story = candidate.result()
+        game.record_day_story(story, game.round)
+    else:
+        print(f"Queueing daytime story for game {game.id}...")
+        if candidate:
+            fn, args = (lambda on_chunk=None: candidate.result()), ()
+        else:
+            fn, args = generate_mafia_story, (night_activities, special_actions, game.round, game.theme)
+        job_id = _submit_narration(game, "day", fn, args, fallback)
+    return story, job_id
+
+
+def _queue_background_story(game):
+    """Records a pooled intro for a started game, or queues one; returns (story, job_id)."""
+    story = story_pool.take(game.theme)
+    if story:
+        game.record_background_story(story)
+        return story, None
+    print(f"Queueing background story for game {game.id}...")
+    return None, _submit_narration(
+        game, "background", generate_background_story, (game.theme, game.id),
+        game.fallback_background_story(),
+    )
+
+
+def _forget_game(game_id):
+    """Drops everything this worker keeps for a game that no longer exists."""
+    for sid in game_sids.pop(game_id, set()):
+        player_sessions.pop(sid, None)
+        patch_sids.discard(sid)
+        private_sent.pop(sid, None)
+        sid_encodings.pop(sid, None)
+    _stop_phase_timer(game_id)
+    coalesced.pop(game_id, None)
+    short_timer_wheel.cancel(("coalesce", game_id))
+    narration.forget(game_id)
+    speculator.discard(game_id)
+
+
+def _on_game_reaped(game):
+    socketio.emit("game_ended", {"msg": "Game closed after being inactive"}, room=game.id)
+    _forget_game(game.id)
+
+
+# ------------------- Phase Timers -------------------
+# A night ends after settings["night_duration"] seconds with the actions
+# received so far, and the vote resolves after settings["day_duration"]
+# seconds with the votes cast so far. Every game shares the one timer wheel;
+# what a timer does is queued on the game's mailbox like any other command.
+# Clients get phase_timer events with the seconds left every
+# PHASE_TICK_INTERVAL seconds.
+
+def _phase_duration(game):
+    if game.state == GameState.NIGHT:
+        return game.settings["night_duration"]
+    if game.state == GameState.DISCUSSION:
+        return game.settings["day_duration"]
+    return None
+
+
+def _arm_phase_timer(game):
+    """Starts the countdown for the game's current phase, unless it is already running."""
+    if not PHASE_TIMERS:
+        return
+    duration = _phase_duration(game)
+    if duration is None:
+        _stop_phase_timer(game.id)
+        return
+
+    phase = (game.state, game.round)
+    current = phase_deadlines.get(game.id)
+    if current and current[0] == phase:
+        return
+    phase_deadlines[game.id] = (phase, time.monotonic() + duration)
+    _phase_tick(game)
+
+
+def _stop_phase_timer(game_id):
+    phase_deadlines.pop(game_id, None)
+    timer_wheel.cancel(("phase", game_id))
+
+
+def _phase_tick(game):
+    """Sends the countdown and schedules the next tick, or ends the phase at its deadline."""
+    current = phase_deadlines.get(game.id)
+    if not current or current[0] != (game.state, game.round) or games.get(game.id) is not game:
+        return  # the phase moved on (or the game is gone) since this timer was set
+
+    remaining = current[1] - time.monotonic()
+    if remaining <= 0.05:
+        _expire_phase(game)
+        return
+
+    socketio.emit("phase_timer", {
+        "phase": game.state.name.lower(),
+        "round": game.round,
+        "remaining": math.ceil(remaining),
+    }, room=game.id)
+    # Ticks land on whole multiples of the interval before the deadline, then the deadline itself
+    delay = remaining % PHASE_TICK_INTERVAL
+    if delay < timer_wheel.resolution:
+        delay = min(delay + PHASE_TICK_INTERVAL, remaining)
+    timer_wheel.schedule(("phase", game.id), delay, lambda: mailboxes.submit(game.id, _phase_tick, game))
+
+
+def _expire_phase(game):
+    phase_deadlines.pop(game.id, None)
+    print(f"{game.state.name.title()} {game.round} of game {game.id} timed out")
+    # A phase running out is not activity, or abandoned games would never look idle
+    last_active = game.last_active
+    try:
+        with tracer.span("phase_timeout", game.id, game.round, state=game.state.name):
+            _end_phase(game)
+    except Exception as e:
+        print(f"Could not end the phase of game {game.id}: {e}")
+    game.last_active = last_active
+
+
+def _end_phase(game):
+    if game.state == GameState.NIGHT:
+        _finish_night(game)
+    elif game.state == GameState.DISCUSSION:
+        result = _resolve_votes(game, force=True)
+        _broadcast(game, "votes_resolved", {
+            "result": result,
+            "round_number": game.round,
+            "story": result.get("story"),
+            "narration_job": result.get("narration_job"),
+            "timed_out": True,
+        }, state_key="game_state")
+        _arm_phase_timer(game)
+
+
+def _connected_count():
+    # Every connected sid is in its namespace's None room
+    return len(socketio.server.manager.rooms.get("/", {}).get(None, ()))
+
+
+def _games_by_state():
+    counts = {(state.name,): 0 for state in GameState}
+    for game in list(games.values()):
+        counts[(game.state.name,)] += 1
+    return counts
+
+
+def _game_event(event, listen=True):
+    """
+    Registers handler(data, sid) for a socket event about data["game_id"].
+
+    The handler runs on the worker that owns the game: events arriving at any
+    other worker are forwarded to the owner. With listen=False the handler is
+    only reachable that way (the caller listens for the event itself). On the
+    owner it is queued on the game's mailbox, so handlers for one game run one
+    at a time in arrival order (see game/mailbox.py). Every run is timed in
+    mafai_socket_handler_seconds and traced as a span in the game's trace.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def timed(data, sid):
+            start = time.perf_counter()
+            game = games.get(data.get("game_id"))
+            try:
+                with tracer.span("handler:" + event, game and game.id, game and game.round):
+                    return handler(data, sid)
+            except Exception:
+                socket_handler_errors.inc(event)
+                raise
+            finally:
+                socket_handler_seconds.observe(time.perf_counter() - start, event)
+
+        sharding.socket_handlers[event] = timed
+        if listen:
+            socketio.on(event)(lambda data: _dispatch(event, data or {}))
+        return timed
+    return decorator
+
+
+def _dispatch(event, data):
+    if sharding.is_local(data.get("game_id")):
+        mailboxes.submit(data.get("game_id"), sharding.socket_handlers[event], data, request.sid)
+        return
+    try:
+        sharding.forward_socket_event(event, data, request.sid)
+    except Exception as e:
+        emit("error", {"msg": str(e)})
+
+
+# ------------------- HTTP Routes -------------------
+# routes/game_routes.py changes games outside the socket handlers; it calls
+# these (importing this module on first use, since this module imports it)
+# so that its narration and phase timers go through the same pipeline. They
+# run on the game's mailbox, like the handlers.
+
+def start_game(game):
+    """Starts the game and queues its intro; returns {"background_story", "narration_job"}."""
+    game.start_game(narrate=False)
+    story, job_id = _queue_background_story(game)
+    _arm_phase_timer(game)
+    return {"background_story": story, "narration_job": job_id}
+
+
+def start_day(game):
+    """Starts the day and queues its story; returns {"story", "narration_job", "night_activities"}."""
+    night_activities = game.day_story_inputs()[0]
+    story, job_id = _start_day(game)
+    _arm_phase_timer(game)
+    return {"story": story, "narration_job": job_id, "night_activities": night_activities}
+
+
+def resolve_votes(game):
+    """Resolves the votes; the story follows as narration_ready ("narration_job" in the result)."""
+    result = _resolve_votes(game)
+    _arm_phase_timer(game)
+    return result
+
+
+def publish_state(game):
+    """Sends the changes a route made to the game's clients (patches, then a coalesced state_update)."""
+    if socketio is None:
+        return  # routes used without the socket server
+    if _publish_state(game):
+        _broadcast(game, "state_update", {"msg": f"Game {game.id} updated"},
+                   state_key="state", players_key="players", coalesce=True)
+
 
 def init_socketio(sio):
     global socketio
     socketio = sio
+    # Listen to the message queue from the start (see ListenOnce in game/message_queue.py)
+    if isinstance(sio.server.manager, ListenOnce):
+        sio.server.manager.initialize()
+    reaper.start(games, on_evict=_on_game_reaped)
+    metrics.gauge("mafai_games", "Games on this worker, by state.", ("state",), collect=_games_by_state)
+    metrics.gauge("mafai_connected_sids", "Socket.IO clients connected to this worker.",
+                  collect=lambda: {(): _connected_count()})
 
     # ------------------- Join Game -------------------
     @socketio.on("join")
-    def handle_join(data):
+    def on_join(data):
+        data = data or {}
+        connections[request.sid] = data.get("game_id")
+        _dispatch("join", data)
+
+    @_game_event("join", listen=False)
+    def handle_join(data, sid):
         print("Join event received:", data)
         game_id = data.get("game_id")
         player_id = data.get("player_id")
         print(f"{player_id} joining room {game_id}")
 
         if game_id not in games:
-            emit("error", {"msg": "Game not found"})
+            socketio.emit("error", {"msg": "Game not found"}, room=sid)
             return
 
-        join_room(game_id)
-        print(f"Rooms: {socketio.server.manager.rooms}")
         game = games[game_id]
 
-        player_sessions[request.sid] = {"player_id": player_id, "game_id": game_id}
-        emit("state_update", {
+        # Bring existing clients up to date before the newcomer gets a snapshot
+        _publish_state(game)
+
+        player_sessions[sid] = {"player_id": player_id, "game_id": game_id}
+        game_sids.setdefault(game_id, set()).add(sid)
+        # {"encoding": "deflate"} from clients that can inflate; anything else is plain JSON
+        if data.get("encoding") in ENCODINGS[1:]:
+            sid_encodings[sid] = data["encoding"]
+        else:
+            sid_encodings.pop(sid, None)
+        _enter_room(sid, game_id)
+        if data.get("patches"):
+            patch_sids.add(sid)
+            _leave_room(sid, _full_room(game_id))
+            _enter_room(sid, _patch_room(game_id))
+            _send_snapshot(game, sid)
+        else:
+            patch_sids.discard(sid)
+            private_sent.pop(sid, None)
+            _leave_room(sid, _patch_room(game_id))
+            _enter_room(sid, _full_room(game_id))
+
+        _broadcast(game, "state_update", {
             "msg": f"{player_id} joined game {game_id}",
-            "players": [
-                {**v, "player_id": k} for k, v in game._serializable_players().items()
-            ],
-            "state": game.get_state()
-        }, room=game_id)
+        }, state_key="state", players_key="players", coalesce=True)
+
+        # Catch up clients that joined after their phase's narration arrived
+        job = narration.latest(game_id)
+        if _narration_is_current(game, job):
+            _emit_narration(game, job, to=sid)
+
+        # A game restored after a restart has no timer running yet
+        _arm_phase_timer(game)
+
+    # ------------------- State Resync -------------------
+    @_game_event("sync_state")
+    def handle_sync_state(data, sid):
+        """Patch clients that notice a version gap send {"game_id", "version"}."""
+        game = games.get(data.get("game_id"))
+        if not game:
+            socketio.emit("error", {"msg": "Game not found"}, room=sid)
+            return
+
+        _publish_state(game)
+        patches = game.patches_since(data.get("version", -1))
+        if patches is None:
+            _send_snapshot(game, sid)
+            return
+        for patch in patches:
+            _emit_to(sid, "state_patch", patch)
 
     # ------------------- Player Ready Status -------------------
-    @socketio.on("player_ready")
-    def handle_ready(data):
+    @_game_event("player_ready")
+    def handle_ready(data, sid):
         print("Ready event received:", data)
         game_id = data.get("game_id")
         player_id = data.get("player_id")
@@ -47,250 +631,250 @@ def init_socketio(sio):
 
         game = games.get(game_id)
         if not game:
-            emit("error", {"msg": "Game not found"})
+            socketio.emit("error", {"msg": "Game not found"}, room=sid)
             return
 
-        player_info = game.players.get(player_id)
-        if player_info:
-            player_info["player_obj"].set_ready(ready_status)
+        if player_id in game.players:
+            game.set_ready(player_id, ready_status)
 
         # Emit full updated player list to everyone
-        emit("state_update", {
-            "players": [
-                {**v, "player_id": k} for k, v in game._serializable_players().items()
-            ],
+        _broadcast(game, "state_update", {
             "msg": f"{player_id} ready: {ready_status}"
-        }, room=game_id)
+        }, players_key="players", coalesce=True)
 
     # ------------------- Update Settings -------------------
-    @socketio.on("update_settings")
-    def handle_update_settings(data):
+    @_game_event("update_settings")
+    def handle_update_settings(data, sid):
         game_id = data.get("game_id")
         host_id = data.get("host_id")
         new_settings = data.get("settings")
 
         if game_id not in games:
-            emit("error", {"msg": "Game not found"})
+            socketio.emit("error", {"msg": "Game not found"}, room=sid)
             return
 
         game = games[game_id]
         try:
             updated = game.update_settings(host_id, new_settings)
-            emit("settings_updated", {"settings": updated}, room=game_id)
+            _broadcast(game, "settings_updated", {"settings": updated})
         except Exception as e:
-            emit("error", {"msg": str(e)})
+            socketio.emit("error", {"msg": str(e)}, room=sid)
 
     # ------------------- Start Game -------------------
-    @socketio.on("start_game")
-    def handle_start_game(data):
+    @_game_event("start_game")
+    def handle_start_game(data, sid):
         game_id = data.get("game_id")
         host_id = data.get("host_id")
 
         if game_id not in games:
-            emit("error", {"msg": "Game not found"})
+            socketio.emit("error", {"msg": "Game not found"}, room=sid)
             return
 
         game = games[game_id]
 
         if host_id != game.host_id:
-            emit("error", {"msg": "Only host can start"}, room=request.sid)
+            socketio.emit("error", {"msg": "Only host can start"}, room=sid)
             return
 
         try:
             # Assign roles and notify all players
-            players_roles = game.assign_roles()
-            emit("role_assigned", {"players": players_roles}, room=game_id)
-
-            print(f"Generating background story for game {game_id}...") 
+            game.assign_roles()
+            _broadcast(game, "role_assigned", {}, players_key="players")
 
-            # Run state machine start_game (generates background story)
-            result = game.start_game()
-            story = result["background_story"]
-
-            print(f"Background story generated: {story[:10]}...")
+            # Move to night right away; the intro arrives later as narration_ready
+            game.start_game(narrate=False)
 
             # Switch to night phase
             game.start_night()
 
-            # Broadcast game started + background story + state
-            emit("game_started", {
+            # Use a pre-generated intro if the pool has one for this theme
+            story, job_id = _queue_background_story(game)
+
+            # Broadcast game started + state; without a pooled story the intro follows
+            _broadcast(game, "game_started", {
                 "background_story": story,
-                "game_state": game.get_state()
-            }, room=game_id)
+                "narration_job": job_id,
+            }, state_key="game_state")
+            _arm_phase_timer(game)
 
         except Exception as e:
-            emit("error", {"msg": str(e)}, room=request.sid)
+            socketio.emit("error", {"msg": str(e)}, room=sid)
 
     # ------------------- Player Continue Logic -------------------
-    @socketio.on("player_continue")
-    def handle_player_continue(data):
+    @_game_event("player_continue")
+    def handle_player_continue(data, sid):
         game_id = data.get("game_id")
         player_id = data.get("player_id")
 
         if game_id not in games:
-            emit("error", {"msg": "Game not found"})
+            socketio.emit("error", {"msg": "Game not found"}, room=sid)
             return
 
-        if game_id not in players_continued:
-            players_continued[game_id] = set()
-
-        players_continued[game_id].add(player_id)
+        game = games[game_id]
+        game.record_continue(player_id)
 
         # Notify everyone of updated continue status
-        emit("player_continue_update", {
+        socketio.emit("player_continue_update", {
             "player_id": player_id,
-            "players_continued": list(players_continued[game_id])
+            "players_continued": list(game.players_continued)
         }, room=game_id)
 
         # Check if all alive players have continued
-        game = games[game_id]
-        alive_player_ids = set(pid for pid, info in game.players.items() if info["alive"])
+        alive_player_ids = set(game.alive_players())
         
-        if players_continued[game_id] >= alive_player_ids:
+        if game.players_continued >= alive_player_ids:
             current_state = game.state
             print(f"All players continued. Current game state: {current_state}")
             
             # Determine next phase based on current state
             if current_state == GameState.NIGHT:
-                emit("all_players_continued", {
+                socketio.emit("all_players_continued", {
                     "next_phase": "night"
                 }, room=game_id)
             elif current_state == GameState.DAY:
-                emit("all_players_continued", {
+                socketio.emit("all_players_continued", {
                     "next_phase": "discussion"
                 }, room=game_id)
             else:
                 # Fallback
-                emit("all_players_continued", {
+                socketio.emit("all_players_continued", {
                     "next_phase": "night"
                 }, room=game_id)
             
             # Reset for next continue phase
-            players_continued[game_id] = set()
+            game.reset_continues()
 
     # ------------------- Player Night Action -------------------
-    @socketio.on("player_action")
-    def handle_action(data):
+    @_game_event("player_action")
+    def handle_action(data, sid):
         game_id = data.get("game_id")
         player_id = data.get("player_id")
         action = data.get("action")
 
         if game_id not in games:
-            emit("error", {"msg": "Game not found"})
+            socketio.emit("error", {"msg": "Game not found"}, room=sid)
             return
 
         game = games[game_id]
 
         try:
             game.record_action(player_id, action)
-            emit("state_update", {
+            _broadcast(game, "state_update", {
                 "msg": f"Action recorded for {player_id}",
-                "state": game.get_state()
-            }, room=game_id)
+            }, state_key="state")
 
             # Check if all required night actions received
             if game.all_night_actions_received():
                 print(f"All night actions received for game {game_id}, resolving...")
-
-                # Resolve night phase (this should generate a story)
-                result = game.resolve_night()
-
-                emit("night_resolved", {
-                    "result": result,
-                    "story": result.get("story") or "The night has ended...",
-                    "game_state": game.get_state()
-                }, room=game_id)
-
-                # Then start day
-                print(f"Generating daytime story for game {game_id}...")
-                day_info = game.start_day()
-                print(f"Daytime story generated: {day_info['story'][:10]}...")
-                emit("day_started", {
-                    "story": day_info["story"],
-                    "game_state": game.get_state()
-                }, room=game_id)
+                _finish_night(game)
+            else:
+                # Get a head start on the day story while the last actor decides
+                speculator.maybe_start(game)
 
         except Exception as e:
-            emit("error", {"msg": str(e)}, room=request.sid)
+            socketio.emit("error", {"msg": str(e)}, room=sid)
 
     # ------------------- Player Voting -------------------
-    @socketio.on("cast_vote")
-    def handle_cast_vote(data):
+    @_game_event("cast_vote")
+    def handle_cast_vote(data, sid):
         game_id = data.get("game_id")
         voter_id = data.get("voter_id")
         target_id = data.get("target_id")
 
         if game_id not in games:
-            emit("error", {"msg": "Game not found"}, room=request.sid)
+            socketio.emit("error", {"msg": "Game not found"}, room=sid)
             return
 
         game = games[game_id]
 
-        if voter_id not in game.players or not game.players[voter_id]["alive"]:
-            emit("error", {"msg": "Invalid or dead voter"}, room=request.sid)
+        if not game.is_alive(voter_id):
+            socketio.emit("error", {"msg": "Invalid or dead voter"}, room=sid)
             return
 
         if game.state != GameState.DISCUSSION:
-            emit("error", {"msg": "Not in voting phase"}, room=request.sid)
+            socketio.emit("error", {"msg": "Not in voting phase"}, room=sid)
+            return
+
+        if target_id != "skip" and not game.is_alive(target_id):
+            socketio.emit("error", {"msg": "Invalid vote target"}, room=sid)
             return
 
-        # Record vote
-        game.votes[voter_id] = target_id
-        emit("vote_recorded", {"voter": voter_id, "target": target_id}, room=game_id)
+        # Record vote; "tally" carries only the counts this vote changed
+        tally = game.record_vote(voter_id, target_id)
+        socketio.emit("vote_recorded", {
+            "voter": voter_id,
+            "target": target_id,
+            "tally": tally,
+            "votes_cast": len(game.tally),
+            "leaders": game.tally.leaders(),
+        }, room=game_id)
 
         # ✅ Check if all alive players have voted
-        if len(game.votes) == len(game.alive_players()):
-            result = game.resolve_votes()
-            socketio.emit(
-                "votes_resolved",
-                {
-                    "result": result,
-                    "round_number": game.round_number,
-                    "story": result.get("story"),
-                },
-                room=game_id,
-            )
+        if game.all_votes_received():
+            result = _resolve_votes(game)
+            _broadcast(game, "votes_resolved", {
+                "result": result,
+                "round_number": game.round,
+                "story": result.get("story"),
+                "narration_job": result.get("narration_job"),
+            })
+            _arm_phase_timer(game)
 
 
     # ------------------- Manual Vote Resolution (fallback) -------------------
-    @socketio.on("resolve_votes")
-    def handle_resolve_votes(data):
+    @_game_event("resolve_votes")
+    def handle_resolve_votes(data, sid):
         game_id = data.get("game_id")
 
         game = games.get(game_id)
         if not game:
-            emit("error", {"msg": "Game not found"})
+            socketio.emit("error", {"msg": "Game not found"}, room=sid)
             return
 
         try:
-            result = game.resolve_votes()
-            emit("votes_resolved", {
+            result = _resolve_votes(game)
+            _broadcast(game, "votes_resolved", {
                 "result": result,
-                "game_state": game.get_state()
-            }, room=game_id)
+                "narration_job": result.get("narration_job"),
+            }, state_key="game_state")
+            _arm_phase_timer(game)
         except Exception as e:
-            emit("error", {"msg": str(e)}, room=request.sid)
+            socketio.emit("error", {"msg": str(e)}, room=sid)
 
 
     # ------------------- Disconnect Handling -------------------
     @socketio.on("disconnect")
-    def handle_disconnect():
-        session_info = player_sessions.get(request.sid)
+    def on_disconnect():
+        game_id = connections.pop(request.sid, None)
+        if game_id:
+            _dispatch("disconnect", {"game_id": game_id})
+
+    @_game_event("disconnect", listen=False)
+    def handle_disconnect(data, sid):
+        session_info = player_sessions.get(sid)
         if session_info:
             # Auto-leave the player
             handle_leave({
                 "game_id": session_info["game_id"],
                 "player_id": session_info["player_id"]
-            })
-            del player_sessions[request.sid]
+            }, sid)
+            player_sessions.pop(sid, None)
+            sids = game_sids.get(session_info["game_id"], set())
+            sids.discard(sid)
+            if not sids:
+                # Nobody is watching; the countdown restarts when someone joins
+                _stop_phase_timer(session_info["game_id"])
+        patch_sids.discard(sid)
+        private_sent.pop(sid, None)
+        sid_encodings.pop(sid, None)
         
-    @socketio.on("leave_game") 
-    def handle_leave(data):
+    @_game_event("leave_game")
+    def handle_leave(data, sid):
         game_id = data.get("game_id")
         player_id = data.get("player_id")
         
         if game_id not in games:
-            emit("error", {"msg": "Game not found"})
+            socketio.emit("error", {"msg": "Game not found"}, room=sid)
             return
             
         game = games[game_id]
@@ -300,21 +884,15 @@ def init_socketio(sio):
                 # If no players left, clean up the game
                 if not game.players:
                     del games[game_id]
-                    # Clean up continue tracking
-                    if game_id in players_continued:
-                        del players_continued[game_id]
-                    emit("game_ended", {"msg": "Game ended - no players remaining"}, room=game_id)
+                    _forget_game(game_id)
+                    socketio.emit("game_ended", {"msg": "Game ended - no players remaining"}, room=game_id)
                     return
                 
                 # Notify remaining players
-                emit("player_left", {
+                _broadcast(game, "player_left", {
                     "player_id": player_id,
-                    "players": [
-                        {**v, "player_id": k} for k, v in game._serializable_players().items()
-                    ],
                     "new_host_id": game.host_id,
-                    "game_state": game.get_state()
-                }, room=game_id)
+                }, state_key="game_state", players_key="players")
                 
         except Exception as e:
-            emit("error", {"msg": str(e)}, room=request.sid)
\ No newline at end of file
+            socketio.emit("error", {"msg": str(e)}, room=sid)
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Startup profile for the backend.
+
+Imports app.py in a fresh interpreter with `python -X importtime` and prints
+the slowest modules plus a per-package summary. Exits non-zero when the
+total is over the budget, so it can run in CI.
+
+    python startup_profile.py [--top 15] [--budget-ms 600] [--module app]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+def profile_imports(module):
+    """Returns ([(cumulative_us, self_us, name)], total_us) for importing module."""
+    env = {**os.environ, "MAFAI_STORY_POOL_DEPTH": "0"}  # don't start generating stories
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"Importing {module} failed")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    total = next((cum for cum, _, name in rows if name.strip() == module), 0)
+    return rows, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("MAFAI_STARTUP_BUDGET_MS", 600)))
+    args = parser.parse_args()
+
+    rows, total = profile_imports(args.module)
+
+    print(f"Slowest imports (cumulative) for `import {args.module}`:")
+    for cumulative, own, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  (self {own / 1000:6.1f} ms)  {name.strip()}")
+
+    packages = {}
+    for _, own, name in rows:
+        top = name.strip().split(".")[0]
+        packages[top] = packages.get(top, 0) + own
+    print("\nSelf time by top-level package:")
+    for top, own in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {own / 1000:8.1f} ms  {top}")
+
+    total_ms = total / 1000
+    status = "OK" if total_ms <= args.budget_ms else "OVER BUDGET"
+    print(f"\nTotal: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms) {status}")
+    return 0 if total_ms <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The backend imports its modules as top-level packages (game, routes, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Module-level settings are read at import time; keep tests off the network
+os.environ.setdefault("MAFAI_NARRATOR", "offline")
+os.environ.setdefault("MAFAI_STORY_POOL_DEPTH", "0")
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from game.governor import LLMGovernor, LLMUnavailable, PRIORITY_DAY, PRIORITY_PREFETCH
+
+
+def make_governor(**kwargs):
+    settings = {"max_concurrency": 1, "rate": 0, "queue_timeout": 0.05, "failure_threshold": 2, "cooldown": 0.1}
+    settings.update(kwargs)
+    return LLMGovernor(**settings)
+
+
+def fail():
+    raise RuntimeError("model error")
+
+
+def call_failing(governor, times):
+    for _ in range(times):
+        with pytest.raises(RuntimeError):
+            governor.call(fail)
+
+
+def occupy(governor):
+    """Holds the governor's only slot until the returned event is set."""
+    release, started = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait()
+
+    thread = threading.Thread(target=governor.call, args=(hold,))
+    thread.start()
+    started.wait()
+    return release, thread
+
+
+def test_circuit_opens_after_consecutive_failures():
+    governor = make_governor()
+    call_failing(governor, 1)
+    assert governor.stats()["circuit"] == "closed"
+    call_failing(governor, 1)
+    assert governor.stats()["circuit"] == "open"
+
+    with pytest.raises(LLMUnavailable):
+        governor.call(lambda: "never runs")
+    assert governor.stats()["rejected"] == 1
+
+
+def test_success_resets_the_failure_count():
+    governor = make_governor()
+    call_failing(governor, 1)
+    assert governor.call(lambda: "ok") == "ok"
+    call_failing(governor, 1)
+    assert governor.stats()["circuit"] == "closed"
+
+
+def test_half_open_trial_success_closes_the_circuit():
+    governor = make_governor()
+    call_failing(governor, 2)
+    time.sleep(0.15)
+    assert governor.call(lambda: "ok") == "ok"
+    assert governor.stats()["circuit"] == "closed"
+
+
+def test_half_open_trial_failure_reopens_the_circuit():
+    governor = make_governor()
+    call_failing(governor, 2)
+    time.sleep(0.15)
+    call_failing(governor, 1)
+    stats = governor.stats()
+    assert stats["circuit"] == "open"
+    assert stats["circuit_trips"] == 2
+
+
+def test_only_one_trial_runs_while_half_open():
+    governor = make_governor(max_concurrency=2)
+    call_failing(governor, 2)
+    time.sleep(0.15)
+    release, thread = occupy(governor)
+    try:
+        with pytest.raises(LLMUnavailable, match="trial in progress"):
+            governor.call(lambda: "second trial")
+    finally:
+        release.set()
+        thread.join()
+    assert governor.stats()["circuit"] == "closed"
+
+
+def test_queue_timeouts_count_as_failures():
+    governor = make_governor()
+    release, thread = occupy(governor)
+    try:
+        for _ in range(2):
+            with pytest.raises(LLMUnavailable, match="Timed out"):
+                governor.call(lambda: "waits", PRIORITY_DAY)
+        # Read before the slot holder finishes: its success would close the circuit again
+        stats = governor.stats()
+    finally:
+        release.set()
+        thread.join()
+    assert stats["circuit"] == "open"
+    assert stats["queue_timeouts"] == 2
+    assert stats["failures"] == 0  # no call actually failed
+
+
+def test_prefetch_queue_timeouts_leave_the_circuit_closed():
+    governor = make_governor()
+    release, thread = occupy(governor)
+    try:
+        for _ in range(3):
+            with pytest.raises(LLMUnavailable):
+                governor.call(lambda: "waits", PRIORITY_PREFETCH)
+        stats = governor.stats()
+    finally:
+        release.set()
+        thread.join()
+    assert stats["circuit"] == "closed"
+    assert stats["consecutive_failures"] == 0
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from game.mailbox import GameMailboxes
+
+
+@pytest.fixture
+def mailboxes():
+    return GameMailboxes(workers=4, batch=3)
+
+
+def test_commands_for_a_game_run_in_submission_order(mailboxes):
+    seen = []
+    futures = [mailboxes.submit("g1", seen.append, i) for i in range(50)]
+    for future in futures:
+        future.result(timeout=5)
+    assert seen == list(range(50))
+
+
+def test_a_game_never_runs_two_commands_at_once(mailboxes):
+    running, overlaps = [0], []
+
+    def command():
+        running[0] += 1
+        overlaps.append(running[0])
+        time.sleep(0.001)
+        running[0] -= 1
+
+    futures = [mailboxes.submit("g1", command) for _ in range(30)]
+    for future in futures:
+        future.result(timeout=5)
+    assert max(overlaps) == 1
+
+
+def test_games_run_in_parallel(mailboxes):
+    both_running = threading.Barrier(2, timeout=2)
+    futures = [mailboxes.submit(game_id, both_running.wait) for game_id in ("g1", "g2")]
+    for future in futures:
+        future.result(timeout=5)  # a BrokenBarrierError means g2 waited for g1
+
+
+def test_a_busy_game_yields_its_worker_after_a_batch():
+    mailboxes = GameMailboxes(workers=1, batch=2)
+    order = []
+    release = threading.Event()
+    mailboxes.submit("g1", release.wait)
+    futures = [mailboxes.submit("g1", order.append, f"g1-{i}") for i in range(4)]
+    futures.append(mailboxes.submit("g2", order.append, "g2"))
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    # g1's first batch is the wait and g1-0; g2 was queued before g1's next turn
+    assert order == ["g1-0", "g2", "g1-1", "g1-2", "g1-3"]
+
+
+def test_run_returns_the_result_and_raises_errors(mailboxes):
+    assert mailboxes.run("g1", lambda a, b: a + b, 2, b=3) == 5
+    with pytest.raises(ValueError):
+        mailboxes.run("g1", int, "not a number")
+    assert mailboxes.stats()["failed"] == 1
+
+
+def test_a_failed_command_does_not_stop_the_mailbox(mailboxes):
+    seen = []
+    mailboxes.submit("g1", int, "boom")
+    assert mailboxes.run("g1", lambda: seen.append("after") or "ok") == "ok"
+    assert seen == ["after"]
+
+
+def test_run_from_the_games_own_mailbox_runs_inline(mailboxes):
+    # Waiting on the mailbox from inside it would deadlock
+    outer = mailboxes.run("g1", lambda: mailboxes.run("g1", lambda: "inner"))
+    assert outer == "inner"
@@ -0,0 +1,83 @@
+import copy
+import json
+
+from benchmarks.cases import make_game, night_actions
+from game.patches import apply_patch, diff_state, snapshot_for_diff
+
+
+def plain(state):
+    """state as a client sees it after a JSON round trip."""
+    return json.loads(json.dumps(state))
+
+
+def round_trip(old, new, log_dirty=()):
+    ops = diff_state(snapshot_for_diff(old), new, log_dirty)
+    return apply_patch(copy.deepcopy(old), ops), ops
+
+
+def test_unchanged_state_has_no_ops():
+    state = {"round": 1, "players": {"p1": {"name": "Ann"}}, "story_log": [{"event": "a"}]}
+    assert diff_state(snapshot_for_diff(state), copy.deepcopy(state)) == []
+
+
+def test_set_nested_and_delete_round_trip():
+    old = {"round": 1, "players": {"p1": {"name": "Ann", "alive": True}, "p2": {"name": "Bo"}}, "story_log": []}
+    new = {"round": 2, "players": {"p1": {"name": "Ann", "alive": False}, "p3": {"name": "Cy"}}, "story_log": []}
+    patched, ops = round_trip(old, new)
+    assert patched == new
+    assert {"op": "set", "path": ["players", "p1", "alive"], "value": False} in ops
+    assert {"op": "del", "path": ["players", "p2"]} in ops
+
+
+def test_story_log_is_appended_not_resent():
+    old = {"story_log": [{"event": "one"}, {"event": "two"}]}
+    new = {"story_log": old["story_log"] + [{"event": "three"}]}
+    patched, ops = round_trip(old, new)
+    assert patched == new
+    assert ops == [{"op": "append", "path": ["story_log"], "value": {"event": "three"}}]
+
+
+def test_dirty_log_entries_are_set_in_place():
+    old = {"story_log": [{"event": "Vote Results", "story": None}]}
+    new = {"story_log": [{"event": "Vote Results", "story": "The town decided."}]}
+    patched, ops = round_trip(old, new, log_dirty={0})
+    assert patched == new
+    assert ops == [{"op": "set", "path": ["story_log", 0], "value": new["story_log"][0]}]
+
+
+def test_snapshot_is_not_affected_by_later_mutation():
+    state = {"players": {"p1": {"alive": True}}, "story_log": []}
+    shadow = snapshot_for_diff(state)
+    state["players"]["p1"]["alive"] = False
+    assert diff_state(shadow, state) == [{"op": "set", "path": ["players", "p1", "alive"], "value": False}]
+
+
+def test_commit_state_patches_rebuild_the_view_through_a_game():
+    game = make_game(players=8, log_size=0)
+    # Clients start from the state_snapshot sent at join, then apply patches
+    game.commit_state()
+    client = json.loads(game.view_json())
+
+    steps = [lambda p=pid, a=action: game.record_action(p, a) for pid, action in night_actions(game)]
+    steps += [game.resolve_night, lambda: game.start_day(narrate=False),
+              lambda: game.record_day_story("Morning came.", game.round)]
+    for step in steps:
+        step()
+        patch = game.commit_state()
+        assert patch["to_version"] == patch["from_version"] + 1 == game.version
+        apply_patch(client, plain(patch["ops"]))
+        assert client == plain(game.get_view())
+
+
+def test_patches_since_returns_the_missing_versions():
+    game = make_game(players=6, log_size=0)
+    game.commit_state()
+    start = game.version
+    for pid, action in night_actions(game):
+        game.record_action(pid, action)
+        game.commit_state()
+
+    patches = game.patches_since(start)
+    assert [p["from_version"] for p in patches] == list(range(start, game.version))
+    assert game.patches_since(game.version) == []
+    assert game.patches_since(-1) is None  # older than the history kept
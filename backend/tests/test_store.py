@@ -0,0 +1,115 @@
+import pytest
+
+import game.state_machine as state_machine
+from benchmarks.cases import night_actions
+from game.model import Player
+from game.state_machine import MafiaGame
+from game.store import SQLiteGameStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "games.db")
+
+
+def open_store(db_path):
+    # Flushed by hand so each test decides what reached the disk
+    return SQLiteGameStore(db_path, flush_interval=3600)
+
+
+def new_game(store):
+    game = MafiaGame(Player("host", "p0"), "Medieval Village")
+    store[game.id] = game
+    for seat in range(1, 7):
+        game.add_player(Player(f"player-{seat}", f"p{seat}"))
+    return game
+
+
+def play_first_night(game):
+    game.assign_roles()
+    game.start_game(narrate=False)
+    game.start_night()
+    for pid, action in night_actions(game):
+        game.record_action(pid, action)
+    game.resolve_night()
+    game.start_day(narrate=False)
+
+
+def test_restores_a_flushed_game_in_a_new_store(db_path):
+    store = open_store(db_path)
+    game = new_game(store)
+    play_first_night(game)
+    store.flush()
+    store.close()
+
+    restored = open_store(db_path).get(game.id)
+    assert restored is not game
+    assert restored.to_snapshot() == game.to_snapshot()
+    assert restored.get_view() == game.get_view()
+
+
+def test_restores_from_snapshot_plus_later_events(db_path, monkeypatch):
+    monkeypatch.setattr(state_machine, "SNAPSHOT_EVERY", 5)
+    store = open_store(db_path)
+    game = new_game(store)
+    play_first_night(game)
+    game.record_vote("p1", "p2")
+    store.flush()
+
+    # Events a written snapshot covers are dropped from the table
+    assert game.snapshot is not None
+    assert all(seq > game.snapshot[0] for seq, _ in store.events(game.id))
+    store.close()
+
+    reopened = open_store(db_path)
+    restored = reopened.get(game.id)
+    assert restored.to_snapshot() == game.to_snapshot()
+    assert reopened.stats()["events_replayed"] == len(store.events(game.id))
+
+
+def test_unflushed_events_are_not_on_disk(db_path):
+    store = open_store(db_path)
+    game = new_game(store)
+    store.flush()
+    game.set_ready("p1")
+
+    assert open_store(db_path).get(game.id).players["p1"].ready is False
+    store.close()
+    assert open_store(db_path).get(game.id).players["p1"].ready is True
+
+
+def test_deleted_games_are_not_restored(db_path):
+    store = open_store(db_path)
+    game = new_game(store)
+    store.flush()
+    del store[game.id]
+    assert store.get(game.id) is None
+    store.close()
+
+    assert open_store(db_path).get(game.id) is None
+
+
+def test_unknown_game_is_missing(db_path):
+    store = open_store(db_path)
+    assert store.get("nope") is None
+    assert "nope" not in store
+    store.close()
+
+
+def test_unknown_ids_are_answered_without_a_query(db_path):
+    store = open_store(db_path)
+    game = new_game(store)
+    store.flush()
+    store.close()
+
+    reopened = open_store(db_path)
+    assert reopened.stats()["stored_games"] == 1
+    queries = []
+    reopened._db.set_trace_callback(queries.append)
+    for _ in range(3):
+        assert reopened.get("bogus") is None
+    assert queries == []
+
+    assert reopened.get(game.id) is not None
+    assert any("game_snapshots" in query for query in queries)
+    reopened.close()
@@ -0,0 +1,60 @@
+import random
+from collections import Counter
+
+from game.tally import VoteTally
+
+
+def test_cast_returns_the_counts_that_changed():
+    tally = VoteTally()
+    assert tally.cast("a", "x") == {"x": 1}
+    assert tally.cast("b", "x") == {"x": 2}
+    assert tally.cast("a", "y") == {"x": 1, "y": 1}
+
+
+def test_casting_the_same_vote_again_changes_nothing():
+    tally = VoteTally({"a": "x"})
+    assert tally.cast("a", "x") == {}
+    assert tally.count("x") == 1
+    assert len(tally) == 1
+
+
+def test_moving_the_last_vote_away_drops_the_target():
+    tally = VoteTally({"a": "x"})
+    assert tally.cast("a", "skip") == {"x": 0, "skip": 1}
+    assert "x" not in tally.counts
+    assert tally.count("x") == 0
+
+
+def test_leaders_are_everyone_tied_for_the_most_votes():
+    tally = VoteTally()
+    assert tally.leaders() == []
+    tally.cast("a", "x")
+    tally.cast("b", "y")
+    assert tally.leaders() == ["x", "y"]  # in the order they got there
+    tally.cast("c", "y")
+    assert tally.leaders() == ["y"]
+    tally.cast("c", "x")
+    assert tally.top == 2 and tally.leaders() == ["x"]
+    tally.cast("c", "z")
+    assert tally.top == 1 and sorted(tally.leaders()) == ["x", "y", "z"]
+
+
+def test_matches_a_full_recount_after_random_changes():
+    rng = random.Random(3)
+    voters = [f"v{i}" for i in range(12)]
+    targets = ["skip"] + voters[:5]
+    tally = VoteTally()
+    for _ in range(500):
+        tally.cast(rng.choice(voters), rng.choice(targets))
+        counts = Counter(tally.votes.values())
+        top = max(counts.values())
+        assert tally.counts == dict(counts)
+        assert tally.top == top
+        assert set(tally.leaders()) == {target for target, count in counts.items() if count == top}
+
+
+def test_reset_clears_the_day():
+    tally = VoteTally({"a": "x", "b": "y"})
+    tally.reset()
+    assert len(tally) == 0 and tally.leaders() == [] and tally.top == 0
+    assert tally.cast("a", "x") == {"x": 1}
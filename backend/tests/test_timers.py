@@ -0,0 +1,89 @@
+import threading
+import time
+
+from game.timers import TimerWheel
+
+RESOLUTION = 0.01
+
+
+def wheel(slots=16):
+    return TimerWheel(resolution=RESOLUTION, slots=slots)
+
+
+def schedule_recording(timers, key, delay, fired):
+    """Schedules a timer that records (key, seconds late) in fired."""
+    due = time.monotonic() + delay
+    done = threading.Event()
+
+    def callback():
+        fired.append((key, time.monotonic() - due))
+        done.set()
+
+    timers.schedule(key, delay, callback)
+    return done
+
+
+def test_timers_fire_in_deadline_order_and_never_early():
+    timers, fired = wheel(), []
+    events = [schedule_recording(timers, key, delay, fired) for key, delay in (("c", 0.09), ("a", 0.03), ("b", 0.06))]
+    for done in events:
+        assert done.wait(1)
+    assert [key for key, _ in fired] == ["a", "b", "c"]
+    assert all(-0.001 <= late < RESOLUTION + 0.05 for _, late in fired)
+
+
+def test_delays_longer_than_a_wheel_turn_wait_for_their_turn():
+    timers, fired = wheel(slots=4), []  # one turn is 0.04s
+    done = schedule_recording(timers, "long", 0.1, fired)
+    assert done.wait(1)
+    assert fired[0][1] >= -0.001
+
+
+def test_cancel_stops_a_timer():
+    timers, fired = wheel(), []
+    schedule_recording(timers, "gone", 0.03, fired)
+    assert timers.cancel("gone") is True
+    assert timers.cancel("gone") is False
+    time.sleep(0.08)
+    assert fired == []
+    assert timers.stats()["cancelled"] == 1
+
+
+def test_scheduling_a_key_again_replaces_its_timer():
+    timers, fired = wheel(), []
+    schedule_recording(timers, "k", 0.02, fired)
+    done = schedule_recording(timers, "k", 0.06, fired)
+    assert done.wait(1)
+    time.sleep(0.03)
+    assert len(fired) == 1 and fired[0][1] >= -0.001
+    assert timers.stats()["pending"] == 0
+
+
+def test_remaining_counts_down():
+    timers = wheel()
+    timers.schedule("k", 0.5, lambda: None)
+    assert 0.4 < timers.remaining("k") <= 0.51
+    assert timers.remaining("missing") is None
+
+
+def test_a_failing_callback_does_not_stop_the_wheel():
+    timers, fired = wheel(), []
+    timers.schedule("bad", 0.01, lambda: 1 / 0)
+    done = schedule_recording(timers, "good", 0.03, fired)
+    assert done.wait(1)
+    assert timers.stats()["failed"] == 1
+
+
+def test_timer_scheduled_while_idle_fires_on_time_after_a_late_wakeup():
+    timers, fired = wheel(slots=8), []
+    first = schedule_recording(timers, "first", 0, fired)
+    assert first.wait(1)
+    time.sleep(0.2)  # idle for more than a wheel turn
+
+    done = schedule_recording(timers, "late", 0, fired)
+    # Hold the lock so the thread wakes several slots after the timer went in
+    with timers._lock:
+        time.sleep(0.05)
+    assert done.wait(1)
+    # Not a whole wheel turn (0.08s) after the thread got the lock back
+    assert fired[-1][1] < 0.05 + 0.03
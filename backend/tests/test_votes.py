@@ -0,0 +1,45 @@
+import pytest
+
+from benchmarks.cases import make_game, night_actions
+from game.state_machine import GameState
+
+
+@pytest.fixture
+def day():
+    game = make_game(players=7, log_size=0)
+    for pid, action in night_actions(game):
+        game.record_action(pid, action)
+    game.resolve_night()
+    game.start_day(narrate=False)
+    return game
+
+
+def test_votes_for_non_players_are_rejected(day):
+    voter = day.alive_players()[0]
+    for target in ("ghost", None, ["p1"], {"id": "p1"}):
+        with pytest.raises(Exception, match="alive player or skip"):
+            day.record_vote(voter, target)
+    assert len(day.tally) == 0
+
+
+def test_votes_for_dead_players_are_rejected(day):
+    dead = next(pid for pid, p in day.players.items() if not p.is_alive)
+    with pytest.raises(Exception, match="alive player or skip"):
+        day.record_vote(day.alive_players()[0], dead)
+
+
+def test_skip_and_alive_targets_are_accepted(day):
+    voter, target = day.alive_players()[:2]
+    assert day.record_vote(voter, target) == {target: 1}
+    assert day.record_vote(voter, "skip") == {target: 0, "skip": 1}
+
+
+def test_fallback_story_survives_a_non_player_winning_the_vote(day):
+    # A game stored before targets were checked replays its old vote events as-is
+    for pid in day.alive_players():
+        day.apply({"type": "vote_cast", "voter_id": pid, "target_id": "ghost"})
+    result = day.resolve_votes(narrate=False)
+
+    assert result["eliminated"] == "ghost"
+    assert day.state == GameState.NIGHT
+    assert day.fallback_vote_story() == "The town voted, but no one was eliminated."
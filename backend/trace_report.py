@@ -0,0 +1,99 @@
+"""
+Slowest game rounds from the span traces (game/tracing.py).
+
+Reads spans from a running backend's /api/traces (local, or with
+MAFAI_METRICS_PUBLIC=1) or from the JSON lines file a worker writes with
+MAFAI_TRACE_FILE; either way the backend needs MAFAI_TRACING=1. It groups
+them by game and round, and prints the slowest rounds with a breakdown of
+where the time went: handlers, state machine calls, narration, prompt
+building, model calls and emits. Spans with the same name under the same
+parent are added up.
+
+    python trace_report.py --url http://127.0.0.1:5001 [--game ID] [--top 5] [--depth 4]
+    python trace_report.py --file traces.jsonl
+"""
+import argparse
+import json
+import sys
+import urllib.request
+from collections import defaultdict
+
+
+def load_spans(url=None, path=None, game_id=None):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            spans = [json.loads(line) for line in f if line.strip()]
+        return [s for s in spans if game_id is None or s["trace"] == game_id]
+    endpoint = url.rstrip("/") + "/api/traces" + (f"/{game_id}" if game_id else "")
+    with urllib.request.urlopen(endpoint, timeout=30) as response:
+        return json.load(response)["spans"]
+
+
+def group_rounds(spans):
+    """Returns [(wall_ms, game_id, round, spans)], slowest first."""
+    rounds = defaultdict(list)
+    for span in spans:
+        rounds[(span["trace"], span["round"])].append(span)
+    result = []
+    for (game_id, round_number), members in rounds.items():
+        start = min(s["start"] for s in members)
+        end = max(s["start"] + s["ms"] / 1000 for s in members)
+        result.append(((end - start) * 1000, game_id, round_number, members))
+    result.sort(key=lambda r: r[0], reverse=True)
+    return result
+
+
+def breakdown(spans):
+    """
+    Returns [(path, total_ms, count, first_start)] in the order the paths first
+    ran, where path is the span names from the round's top level down.
+    """
+    by_id = {s["span"]: s for s in spans}
+    paths = {}
+
+    def path_of(span):
+        if span["span"] not in paths:
+            parent = by_id.get(span["parent"])
+            paths[span["span"]] = (path_of(parent) if parent else ()) + (span["name"],)
+        return paths[span["span"]]
+
+    totals = {}
+    for span in spans:
+        path = path_of(span)
+        total, count, first = totals.get(path, (0.0, 0, span["start"]))
+        totals[path] = (total + span["ms"], count + 1, min(first, span["start"]))
+    # Children right after their parents, siblings in the order they first ran
+    return sorted(((p, t, c, f) for p, (t, c, f) in totals.items()),
+                  key=lambda row: [totals[row[0][:i + 1]][2] for i in range(len(row[0]))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--url", help="backend to read /api/traces from")
+    source.add_argument("--file", help="JSON lines written with MAFAI_TRACE_FILE")
+    parser.add_argument("--game", default=None, help="only this game")
+    parser.add_argument("--top", type=int, default=5, help="rounds to print")
+    parser.add_argument("--depth", type=int, default=4, help="deepest span level to print")
+    args = parser.parse_args()
+
+    spans = load_spans(args.url, args.file, args.game)
+    if not spans:
+        print("No spans recorded")
+        return 1
+
+    rounds = group_rounds(spans)
+    print(f"{len(spans)} spans in {len(rounds)} rounds of {len({s['trace'] for s in spans})} games\n")
+    for wall_ms, game_id, round_number, members in rounds[:args.top]:
+        print(f"Game {game_id} round {round_number}: {wall_ms:.1f} ms wall, {len(members)} spans")
+        for path, total, count, _ in breakdown(members):
+            if len(path) > args.depth:
+                continue
+            label = "  " * len(path) + path[-1] + (f" x{count}" if count > 1 else "")
+            print(f"{label:<52} {total:>10.2f} ms")
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Runs the backend as several worker processes on one host.
+
+Each game id hashes to one worker (game/sharding.py). HTTP requests and
+socket events for a game are forwarded to its owner, and Socket.IO
+broadcasts travel between workers over MAFAI_MESSAGE_QUEUE. The default
+queue is a directory of Unix sockets, so no broker is needed; pass
+--message-queue redis://... to use Redis instead.
+
+    python workers.py [--workers 4] [--host 127.0.0.1] [--base-port 5001] [--dev]
+
+Worker i listens on base-port + i. Put a load balancer in front with sticky
+sessions (e.g. nginx ip_hash), which Socket.IO's polling transport needs.
+Each worker runs serve.py (eventlet, WebSocket only). --dev runs app.py on
+the Werkzeug development server instead, for local testing only.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1", help="address workers use to reach each other")
+    parser.add_argument("--base-port", type=int, default=5001)
+    parser.add_argument("--message-queue", default=None,
+                        help="queue URL shared by the workers (default: unix sockets in a temp dir)")
+    parser.add_argument("--dev", action="store_true",
+                        help="run workers with app.py on the Werkzeug dev server (local testing only)")
+    args = parser.parse_args()
+
+    queue = args.message_queue or "unix://" + tempfile.mkdtemp(prefix="mafai-mq-")
+    urls = [f"http://{args.host}:{args.base_port + i}" for i in range(args.workers)]
+    token = os.environ.get("MAFAI_INTERNAL_TOKEN") or os.urandom(16).hex()
+
+    script = "app.py" if args.dev else "serve.py"
+    procs = []
+    for i in range(args.workers):
+        env = {
+            **os.environ,
+            "MAFAI_WORKERS": str(args.workers),
+            "MAFAI_WORKER_INDEX": str(i),
+            "MAFAI_WORKER_URLS": ",".join(urls),
+            "MAFAI_MESSAGE_QUEUE": queue,
+            "MAFAI_INTERNAL_TOKEN": token,
+            "MAFAI_PORT": str(args.base_port + i),
+            "MAFAI_DEBUG": "0",
+        }
+        if args.dev:
+            env["MAFAI_ALLOW_WERKZEUG"] = "1"
+        procs.append(subprocess.Popen([sys.executable, script], cwd=os.path.dirname(os.path.abspath(__file__)), env=env))
+        print(f"Worker {i} on {urls[i]}")
+
+    def stop(signum, frame):
+        for proc in procs:
+            proc.terminate()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    sys.exit(max(proc.wait() for proc in procs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import { io } from "socket.io-client";
+
+// Payloads the backend deflated arrive as binary (see backend/game/wire.py).
+// Over a WebSocket, permessage-deflate already compresses across messages,
+// which beats deflating each payload, so only long-polling asks for it.
+const canInflate = typeof DecompressionStream === "function";
+
+const wireEncoding = (socket) =>
+  canInflate && socket.io.engine?.transport?.name === "polling" ? "deflate" : "json";
+
+const inflate = async (buffer) => {
+  const stream = new Blob([buffer]).stream().pipeThrough(new DecompressionStream("deflate"));
+  return JSON.parse(await new Response(stream).text());
+};
+
+const decode = (arg) => (arg instanceof ArrayBuffer ? inflate(arg) : arg);
+
+// WebSocket first; long-polling only if the WebSocket can't be opened
+// (e.g. a proxy that blocks upgrades). Production servers may be WebSocket-only.
+export const connectSocket = () => {
+  const socket = io("http://localhost:5001", {
+    transports: ["websocket", "polling"],
+    tryAllTransports: true,
+  });
+
+  // Handlers run one after another in arrival order, even while an earlier
+  // payload is still being inflated
+  let pending = Promise.resolve();
+  const on = socket.on.bind(socket);
+  socket.on = (event, handler) =>
+    on(event, (...args) => {
+      pending = pending
+        .then(() => Promise.all(args.map(decode)))
+        .then((decoded) => handler(...decoded))
+        .catch((error) => console.error(`Socket handler for ${event} failed:`, error));
+    });
+  return socket;
+};
+
+// Joins (and re-joins after every reconnect) with the encoding the
+// transport in use calls for
+export const joinRoom = (socket, data) => {
+  const join = () => socket.emit("join", { ...data, encoding: wireEncoding(socket) });
+  socket.on("connect", join);
+  if (socket.connected) join();
+};
@@ -1,6 +1,6 @@
 import { useEffect, useState, useRef } from "react";
 import { useLocation, useNavigate } from "react-router-dom";
-import { io } from "socket.io-client";
+import { connectSocket, joinRoom } from "../api/socket";
 import LoadingScreen from "./loading_screen";
 
 export default function Narration() {
@@ -73,10 +73,10 @@ export default function Narration() {
       return;
     }
 
-    const s = io("http://localhost:5001");
+    const s = connectSocket();
     setSocket(s);
 
-    s.emit("join", { game_id: gameId, player_id: playerId });
+    joinRoom(s, { game_id: gameId, player_id: playerId });
 
     // Handle background story (game start)
     s.on("game_started", (data) => {
@@ -1,6 +1,6 @@
 import { useEffect, useState } from "react";
 import { useLocation, useNavigate } from "react-router-dom";
-import { io } from "socket.io-client";
+import { connectSocket, joinRoom } from "../api/socket";
 
 export default function NightPhase() {
   const location = useLocation();
@@ -50,10 +50,10 @@ export default function NightPhase() {
       return;
     }
 
-    const s = io("http://localhost:5001");
+    const s = connectSocket();
     setSocket(s);
 
-    s.emit("join", { game_id: gameId, player_id: playerId });
+    joinRoom(s, { game_id: gameId, player_id: playerId });
 
     // Listen for game state to get player role and other players
     s.on("state_update", (data) => {
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import { io } from "socket.io-client";
+import { connectSocket, joinRoom } from "../api/socket";
 import { useParams, useLocation, useNavigate } from "react-router-dom";
 
 export default function HostRoom() {
@@ -30,7 +30,7 @@ export default function HostRoom() {
       return;
     }
 
-    const s = io("http://localhost:5001");
+    const s = connectSocket();
     setSocket(s);
 
     // Join the room
@@ -38,7 +38,7 @@ export default function HostRoom() {
       game_id: id,
       player_id: playerId,
     });
-    s.emit("join", { game_id: id, player_id: playerId });
+    joinRoom(s, { game_id: id, player_id: playerId });
 
     // Listen for state updates
     s.on("state_update", (data) => {
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import { io } from "socket.io-client";
+import { connectSocket, joinRoom } from "../api/socket";
 import { useParams, useLocation } from "react-router-dom";
 
 export default function Room() {
@@ -9,10 +9,10 @@ export default function Room() {
   const [socket, setSocket] = useState(null);
 
   useEffect(() => {
-    const s = io("http://localhost:5001");
+    const s = connectSocket();
     setSocket(s);
 
-    s.emit("join", { game_id: id, player_id: playerId });
+    joinRoom(s, { game_id: id, player_id: playerId });
 
     s.on("state_update", (data) => {
       if (data.players) setPlayers(data.players);